@@ -22,6 +22,7 @@ a = Analysis(
     datas=[
         (os.path.join(ROOT, 'frontend', 'dist'), 'frontend/dist'),
         (os.path.join(ROOT, 'version.txt'), '.'),
+        (os.path.join(ROOT, 'src', 'plugins'), 'plugins'),   # action handlers, imported lazily by path
         *datas_pycaw,
         *datas_comtypes,
         *datas_webview,
@@ -30,8 +31,12 @@ a = Analysis(
     hiddenimports=[
         'api', 'serial_manager', 'volume_manager', 'macro_manager',
         'profile_manager', 'foreground_watcher', 'utils',
+        'action_registry', 'clipboard', 'key_dispatch', 'keymap', 'scheduler',
+        'persistence', 'settings_store', 'triggers', 'device_shadow', 'profile_view',
+        'bundles', 'data_watcher', 'switch_controller', 'push_queue',
+        'state_store', 'ipc', 'daemon', 'remote_api', 'local_tools',
         'serial', 'serial.tools', 'serial.tools.list_ports',
-        'psutil', 'ctypes', 'winreg', 'subprocess',
+        'psutil', 'ctypes', 'winreg', 'subprocess', 'shlex',
         *hidden_pycaw,
         *hidden_comtypes,
         *hidden_webview,
@@ -3,6 +3,19 @@
 #include <FastLED.h>
 #include <EEPROM.h>
 
+// ─── Protocol / capabilities ──────────────────────────────────────────────────
+// After setup() the pad prints READY and its CAPS line; "CAPS?" repeats it.
+//   CAPS:v=1;fw=1.1;keys=12;enc=4;leds=10;rate=200;rx=256;line=64;cmds=...
+// rate = command lines per second the loop keeps up with, rx = serial receive
+// buffer in bytes, line = longest command line. The host sizes its batches to these.
+#define PROTOCOL_VERSION 1
+#define FW_VERSION       "1.1"
+#define MAX_LINE_RATE    200
+#define RX_BUFFER_SIZE   256
+#define MAX_LINE_LEN     64
+#define LINES_PER_LOOP   8      // commands handled per loop() pass, so keys and encoders stay responsive
+#define CAPS_CMDS        "PING,CAPS?,BRIGHT,ENC_TIMEOUT,EFFECT_SPEED,EFFECT,color,colorfade,colorvolume,rgbpointer,pct"
+
 // ─── LED config ───────────────────────────────────────────────────────────────
 #define NUMPIXELS      10
 #define MAX_BRIGHTNESS 50
@@ -74,6 +87,7 @@ unsigned long keyPressTimes[LIST_MAX];
 
 // ─── setup ────────────────────────────────────────────────────────────────────
 void setup() {
+  Serial.setRxBufferSize(RX_BUFFER_SIZE);
   Serial.begin(115200);
   EEPROM.begin(EEPROM_SIZE);
 
@@ -95,6 +109,26 @@ void setup() {
   for (int i = 0; i < 4; i++)
     fill_solid(strips[i], NUMPIXELS, CRGB::Black);
   FastLED.show();
+
+  // Tell the host it can send initial state now instead of guessing the boot time
+  Serial.println("READY");
+  sendCaps();
+}
+
+void sendCaps() {
+  Serial.print("CAPS:v=");
+  Serial.print(PROTOCOL_VERSION);
+  Serial.print(";fw=" FW_VERSION ";keys=");
+  Serial.print(ROWS * COLS);
+  Serial.print(";enc=4;leds=");
+  Serial.print(NUMPIXELS);
+  Serial.print(";rate=");
+  Serial.print(MAX_LINE_RATE);
+  Serial.print(";rx=");
+  Serial.print(RX_BUFFER_SIZE);
+  Serial.print(";line=");
+  Serial.print(MAX_LINE_LEN);
+  Serial.println(";cmds=" CAPS_CMDS);
 }
 
 // ─── Startup: all strips flash red×3, green×3, blue×3 ────────────────────────
@@ -158,11 +192,10 @@ void loop() {
 
   updateEffects();
 
-  if (Serial.available() > 0) {
+  for (int n = 0; n < LINES_PER_LOOP && Serial.available() > 0; n++) {
     String input = Serial.readStringUntil('\n');
     input.trim();
-    if (input.length() == 0) return;
-    handleLEDCommand(input);
+    if (input.length() > 0) handleLEDCommand(input);
   }
 }
 
@@ -296,6 +329,8 @@ void handleKeypad() {
 
 // ─── LED serial command parser ────────────────────────────────────────────────
 // Commands (strip index N is 1-based):
+//   PING                   answers MACROPAD_OK
+//   CAPS?                  answers the CAPS line (see top of file)
 //   BRIGHT:V               global brightness 0-255
 //   N:colorvolume(R,G,B)   volume bar mode
 //   N:colorfade(R,G,B)     fade mode
@@ -307,6 +342,11 @@ void handleLEDCommand(String &input) {
     return;
   }
 
+  if (input == "CAPS?") {
+    sendCaps();
+    return;
+  }
+
   if (input.startsWith("BRIGHT:")) {
     int val = constrain(input.substring(7).toInt(), 0, 255);
     FastLED.setBrightness(val);
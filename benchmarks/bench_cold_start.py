@@ -0,0 +1,133 @@
+"""
+Cold-start benchmark — import cost and time to the first startup() result
+-------------------------------------------------------------------------
+Each run is a fresh interpreter in a scratch directory (an empty Data/, or a
+copy of --data), so nothing is cached between runs:
+
+    import   python -X importtime -c "import api": total cumulative time of
+             the api import and the slowest modules it pulled in
+    startup  interpreter launch → MacroPadAPI().startup() returned, measured
+             inside the process, plus the wall time of the whole process
+
+Modules that must stay deferred until their subsystem is used (keyboard,
+pycaw, urllib.request, …) are reported if they show up in the import
+trace. With --budget-ms, the run fails when the median startup time is over
+budget or a deferred module was imported, so it can gate a CI job.
+
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 10 --data Data --budget-ms 300
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC  = os.path.join(ROOT, 'src')
+
+# Must not be imported by `import api` — each belongs to a subsystem that loads it on first use
+DEFERRED = ('keyboard', 'pycaw', 'comtypes', 'webview', 'serial', 'psutil', 'winreg',
+            'urllib.request', 'subprocess', 'zipfile', 'bundles', 'volume_manager')
+
+_STARTUP = f"""
+import sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, {SRC!r})
+import api
+t1 = time.perf_counter()
+a = api.MacroPadAPI()
+a.startup()
+t2 = time.perf_counter()
+print(json.dumps({{'import_ms': (t1 - t0) * 1000, 'startup_ms': (t2 - t0) * 1000}}))
+sys.stdout.flush()
+a.shutdown()
+"""
+
+
+def _scratch(data):
+    work = tempfile.mkdtemp(prefix='macropad-bench-')
+    if data:
+        shutil.copytree(data, os.path.join(work, 'Data'))
+    else:
+        os.makedirs(os.path.join(work, 'Data'))
+    return work
+
+
+def _importtime(data):
+    """[(module, self_us, cumulative_us, depth)] for everything `import api` imported."""
+    work = _scratch(data)
+    try:
+        r = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import sys; sys.path.insert(0, {SRC!r}); import api'],
+                           cwd=work, capture_output=True, text=True, timeout=120)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    rows = []
+    for line in r.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts  = line[len('import time:'):].split('|')
+        module = parts[2].rstrip()
+        depth  = (len(module) - len(module.lstrip())) // 2
+        rows.append((module.strip(), int(parts[0]), int(parts[1]), depth))
+    # -X importtime lists children before their parent; keep the subtree that ends at `api`
+    end = next((i for i, row in enumerate(rows) if row[0] == 'api' and row[3] == 0), None)
+    if end is None:
+        sys.exit(f'import api failed:\n{r.stderr[-2000:]}')
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def _startup(data):
+    work = _scratch(data)
+    try:
+        t0 = time.perf_counter()
+        r  = subprocess.run([sys.executable, '-c', _STARTUP], cwd=work, capture_output=True, text=True, timeout=120)
+        wall = (time.perf_counter() - t0) * 1000
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    line = next((l for l in r.stdout.splitlines() if l.startswith('{')), None)
+    if line is None:
+        sys.exit(f'startup() failed:\n{r.stderr[-2000:]}')
+    return {**json.loads(line), 'wall_ms': wall}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--data', help='Data directory to copy into each run (default: empty)')
+    ap.add_argument('--top', type=int, default=12, help='slowest modules to list (default 12)')
+    ap.add_argument('--budget-ms', type=float, help='fail if median startup exceeds this')
+    args = ap.parse_args()
+
+    rows  = _importtime(args.data)
+    total = rows[-1][2] / 1000
+    print(f'import api: {total:.1f} ms cumulative, {len(rows)} modules\n')
+    print(f'{"self ms":>8}  {"cum ms":>8}  module')
+    for name, self_us, cum_us, _ in sorted(rows[:-1], key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f'{self_us / 1000:>8.1f}  {cum_us / 1000:>8.1f}  {name}')
+
+    names  = {row[0] for row in rows}
+    leaked = [m for m in DEFERRED if m in names]
+    print(f'\ndeferred modules imported eagerly: {", ".join(leaked) or "none"}')
+
+    runs = [_startup(args.data) for _ in range(args.runs)]
+    print(f'\n{"run":>4}  {"import ms":>9}  {"startup ms":>10}  {"process ms":>10}')
+    for i, run in enumerate(runs, 1):
+        print(f'{i:>4}  {run["import_ms"]:>9.1f}  {run["startup_ms"]:>10.1f}  {run["wall_ms"]:>10.1f}')
+    median = statistics.median(r['startup_ms'] for r in runs)
+    print(f'\nmedian time to first startup() result: {median:.1f} ms')
+
+    if args.budget_ms is not None and (median > args.budget_ms or leaked):
+        print(f'FAIL: budget {args.budget_ms:.0f} ms' + (f', eager imports: {", ".join(leaked)}' if leaked else ''))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
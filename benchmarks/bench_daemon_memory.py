@@ -0,0 +1,148 @@
+"""
+Daemon memory benchmark — resident set of the always-on process
+----------------------------------------------------------------
+Runs the headless daemon (and, with --gui, the windowed app) in a fresh
+interpreter in a scratch directory (an empty Data/, or a copy of --data),
+lets it settle, then reports the resident memory of the process and every
+child it started — for the window that includes the WebView2 / browser
+processes. The daemon also reports whether pywebview got imported.
+
+    python benchmarks/bench_daemon_memory.py
+    python benchmarks/bench_daemon_memory.py --gui --data Data
+    python benchmarks/bench_daemon_memory.py --max-mb 60 --max-ratio 0.25
+
+With --max-mb the run fails when the daemon is over budget or imported
+pywebview; --max-ratio additionally fails when daemon / window exceeds the
+ratio (needs --gui). Child processes are only counted when psutil is
+installed; without it the figure is the Python process alone.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC  = os.path.join(ROOT, 'src')
+DIST = os.path.join(ROOT, 'frontend', 'dist', 'index.html')
+
+_RSS = """
+import os, sys
+def rss_mb():
+    try:
+        import psutil
+        procs = [psutil.Process()]
+        procs += procs[0].children(recursive=True)
+        total = 0
+        for p in procs:
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / 2**20, len(procs)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024, 1
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == 'darwin' else 1024), 1
+"""
+
+_DAEMON = _RSS + """
+import json, threading, time
+sys.path.insert(0, {src!r})
+import daemon
+d = daemon.Daemon()
+def report():
+    mb, procs = rss_mb()
+    print(json.dumps({{'rss_mb': mb, 'processes': procs, 'webview': 'webview' in sys.modules}}))
+    sys.stdout.flush()
+    d.quit()
+threading.Timer({settle}, report).start()
+d.run()
+"""
+
+_GUI = _RSS + """
+import json, time
+sys.path.insert(0, {src!r})
+import webview
+from api import MacroPadAPI
+api    = MacroPadAPI()
+window = webview.create_window('MacroPad', url={url!r}, js_api=api, width=1100, height=720, frameless=True)
+api.set_window(window)
+def report():
+    time.sleep({settle})
+    mb, procs = rss_mb()
+    print(json.dumps({{'rss_mb': mb, 'processes': procs, 'webview': True}}))
+    sys.stdout.flush()
+    window.destroy()
+webview.start(report)
+api.shutdown()
+"""
+
+
+def _measure(template, data, settle):
+    work = tempfile.mkdtemp(prefix='macropad-bench-')
+    if data:
+        shutil.copytree(data, os.path.join(work, 'Data'))
+    else:
+        os.makedirs(os.path.join(work, 'Data'))
+    code = template.format(src=SRC, url=DIST, settle=settle)
+    try:
+        r = subprocess.run([sys.executable, '-c', code], cwd=work, capture_output=True, text=True,
+                           timeout=settle + 120)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    line = next((l for l in r.stdout.splitlines() if l.startswith('{')), None)
+    if line is None:
+        sys.exit(f'measurement failed:\n{r.stderr[-2000:]}')
+    return json.loads(line)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--data', help='Data directory to copy into each run (default: empty)')
+    ap.add_argument('--settle', type=float, default=3.0, help='seconds to run before measuring (default 3)')
+    ap.add_argument('--gui', action='store_true', help='also measure the windowed app (needs pywebview)')
+    ap.add_argument('--max-mb', type=float, help='fail if the daemon is over this many MB')
+    ap.add_argument('--max-ratio', type=float, help='fail if daemon / window memory is over this ratio')
+    args = ap.parse_args()
+
+    rows = [('daemon', _measure(_DAEMON, args.data, args.settle))]
+    if args.gui:
+        rows.append(('window', _measure(_GUI, args.data, args.settle)))
+
+    print(f'{"mode":<8}  {"rss MB":>8}  {"procs":>5}  webview')
+    for mode, m in rows:
+        print(f'{mode:<8}  {m["rss_mb"]:>8.1f}  {m["processes"]:>5}  {"yes" if m["webview"] else "no"}')
+
+    daemon = rows[0][1]
+    ratio  = daemon['rss_mb'] / rows[1][1]['rss_mb'] if args.gui else None
+    if ratio is not None:
+        print(f'\ndaemon uses {ratio:.0%} of the windowed app\'s memory')
+
+    failures = []
+    if daemon['webview']:
+        failures.append('the daemon imported pywebview')
+    if args.max_mb is not None and daemon['rss_mb'] > args.max_mb:
+        failures.append(f'daemon {daemon["rss_mb"]:.1f} MB > {args.max_mb:.0f} MB')
+    if args.max_ratio is not None:
+        if ratio is None:
+            failures.append('--max-ratio needs --gui')
+        elif ratio > args.max_ratio:
+            failures.append(f'ratio {ratio:.2f} > {args.max_ratio:.2f}')
+    if failures and (args.max_mb is not None or args.max_ratio is not None):
+        print('FAIL: ' + '; '.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Type Text delivery benchmark — typed vs. pasted
+-----------------------------------------------
+Compares keyboard.write() (one synthesized key event per character) with the
+clipboard paste path of the Type Text plugin, using a fake keyboard and a fake
+clipboard so it runs anywhere and measures only our own delivery overhead
+plus a modelled per-event injection cost.
+
+    python benchmarks/bench_type_text.py
+    python benchmarks/bench_type_text.py --event-us 400 --lengths 32 256 4096
+"""
+import argparse
+import os
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+class FakeKeyboard(types.ModuleType):
+    """Stands in for the `keyboard` package: counts events and burns a fixed cost per event."""
+
+    def __init__(self, event_cost_s):
+        super().__init__('keyboard')
+        self.event_cost_s = event_cost_s
+        self.events       = 0
+        self.last_event_t = 0.0
+
+    def _inject(self, n):
+        self.events += n
+        end = time.perf_counter() + n * self.event_cost_s
+        while time.perf_counter() < end:
+            pass
+        self.last_event_t = time.perf_counter()
+
+    def write(self, text, delay=0):
+        self._inject(2 * len(text))          # down + up per character
+
+    def send(self, hotkey, *args, **kwargs):
+        self._inject(2 * (hotkey.count('+') + 1))
+
+    press_and_release = send
+
+
+class FakeClipboard(types.ModuleType):
+    def __init__(self):
+        super().__init__('clipboard')
+        self.text   = 'user clipboard'
+        self.writes = 0
+
+    def get_text(self):
+        return self.text
+
+    def set_text(self, text):
+        self.text    = text
+        self.writes += 1
+        return True
+
+    def save(self):
+        return True, self.text
+
+    def clear(self):
+        self.text = None
+        return True
+
+    def restore(self, text):
+        return self.clear() if text is None else self.set_text(text)
+
+
+def _run(text_plugin, kb, text, delivery, repeat):
+    """Return (ms until the last key event landed, ms until the call returned, events)."""
+    kb.events = 0
+    delivered = total = 0.0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        text_plugin.type_text(text, delivery)
+        total     += time.perf_counter() - t0
+        delivered += kb.last_event_t - t0
+    return delivered / repeat * 1000, total / repeat * 1000, kb.events // repeat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--event-us', type=float, default=250.0,
+                    help='modelled cost of one injected key event in µs (default 250)')
+    ap.add_argument('--lengths', type=int, nargs='+', default=[16, 64, 256, 1024, 4096])
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    kb = FakeKeyboard(args.event_us / 1e6)
+    cb = FakeClipboard()
+    sys.modules['keyboard']  = kb
+    sys.modules['clipboard'] = cb
+    import action_registry
+    import macro_manager
+    text_plugin = sys.modules[type(action_registry.get('Type Text')).__module__]
+
+    print(f'event cost {args.event_us:.0f} µs, paste settle {text_plugin._PASTE_SETTLE_S * 1000:.0f} ms, '
+          f'auto threshold {macro_manager.paste_threshold} chars\n')
+    print('delivered = last key event injected; busy = call returned (paste includes clipboard restore)\n')
+    print(f'{"chars":>6}  {"type ms":>9}  {"events":>6}  {"paste ms":>9}  {"busy ms":>8}  {"events":>6}  {"auto":>6}')
+    for n in args.lengths:
+        text = ('lorem ipsum dolor sit amet ' * (n // 27 + 1))[:n]
+        t_ms, _, t_ev      = _run(text_plugin, kb, text, 'type', args.repeat)
+        p_ms, p_busy, p_ev = _run(text_plugin, kb, text, 'paste', args.repeat)
+        auto = 'paste' if n >= macro_manager.paste_threshold > 0 else 'type'
+        print(f'{n:>6}  {t_ms:>9.1f}  {t_ev:>6}  {p_ms:>9.2f}  {p_busy:>8.1f}  {p_ev:>6}  {auto:>6}')
+
+    assert cb.text == 'user clipboard', 'clipboard was not restored'
+
+
+if __name__ == '__main__':
+    main()
@@ -8,11 +8,16 @@ import SettingsPage    from './pages/SettingsPage'
 import UploadPage      from './pages/UploadPage'
 import TestPage        from './pages/TestPage'
 import { toast }       from './utils/toast'
+import { applyOps }    from './utils/statePatch'
 
 // Receive events pushed from Python via evaluate_js
 window.__macropadEvent = (event, payload) => {
   window.dispatchEvent(new CustomEvent('macropad:' + event, { detail: payload }))
 }
+// Python delivers one batch of [event, payload] pairs per frame
+window.__macropadBatch = (events) => {
+  for (const [event, payload] of events) window.__macropadEvent(event, payload)
+}
 
 const pyapi = () => window.pywebview?.api ?? null
 
@@ -51,6 +56,36 @@ export default function App() {
 
   const t           = dark ? DARK_THEME : LIGHT_THEME
   const initDone    = useRef(false)
+  const synced      = useRef({ version: 0, state: {} })   // mirror of Python's StateStore
+
+  // Push changed top-level keys of the mirrored state into React state
+  const adoptState = useCallback((state, keys) => {
+    const setters = { macros: setMacros, encoders: setEncoders, profiles: setProfiles,
+                      active: setActive, settings: setSettings }
+    for (const key of keys) setters[key]?.(state[key] ?? (key === 'encoders' ? DEFAULT_ENCODERS : {}))
+  }, [])
+
+  const applySync = useCallback((r) => {
+    if (!r) return
+    if (r.state) {
+      synced.current = { version: r.version, state: r.state }
+      adoptState(r.state, Object.keys(r.state))
+      return
+    }
+    let { state } = synced.current
+    const keys = new Set()
+    for (const p of r.patches ?? []) {
+      const [next, touched] = applyOps(state, p.ops)
+      state = next
+      touched.forEach(k => keys.add(k))
+    }
+    synced.current = { version: r.version, state }
+    adoptState(state, keys)
+  }, [adoptState])
+
+  const resync = useCallback(async () => {
+    applySync(await pyapi()?.get_state?.(synced.current.version))
+  }, [applySync])
 
   // Init — guard against double-call (pywebviewready event + fallback timeout)
   useEffect(() => {
@@ -59,12 +94,7 @@ export default function App() {
       initDone.current = true
       const api = pyapi()
       if (!api) { setReady(true); return }
-      const data = await api.startup()
-      setMacros(data.macros    ?? {})
-      setEncoders(data.encoders ?? DEFAULT_ENCODERS)
-      setProfiles(data.profiles ?? ['Default'])
-      setActive(data.active    ?? 'Default')
-      setSettings(data.settings ?? {})
+      applySync(await api.startup())
       setReady(true)
     }
     if (window.pywebview) {
@@ -96,27 +126,30 @@ export default function App() {
       setEncMuted(prev => { const n=[...prev]; n[id]=muted; return n })
     }
     const onProfileSwitch = (e) => {
-      const { active, macros: m, encoders: enc } = e.detail
-      if (active)  { setActive(active); toast(`Profile: ${active}`, 'info') }
-      if (m)       setMacros(m)
-      if (enc)     setEncoders(enc)
+      const { active } = e.detail
+      if (active)  toast(`Profile: ${active}`, 'info')
+    }
+    const onStatePatch = (e) => {
+      const p = e.detail
+      if (p.to <= synced.current.version) return            // already have it (e.g. from a resync)
+      if (p.from !== synced.current.version) { resync(); return }
+      applySync({ version: p.to, patches: [p] })
     }
     window.addEventListener('macropad:connection',    onConn)
     window.addEventListener('macropad:encoder_turn',  onTurn)
     window.addEventListener('macropad:mute_change',   onMute)
     window.addEventListener('macropad:profile_switch', onProfileSwitch)
+    window.addEventListener('macropad:state_patch',    onStatePatch)
     return () => {
       window.removeEventListener('macropad:connection',    onConn)
       window.removeEventListener('macropad:encoder_turn',  onTurn)
       window.removeEventListener('macropad:mute_change',   onMute)
       window.removeEventListener('macropad:profile_switch', onProfileSwitch)
+      window.removeEventListener('macropad:state_patch',    onStatePatch)
     }
-  }, [])
+  }, [applySync, resync])
 
-  const refreshMacros = useCallback(async () => {
-    const m = await pyapi()?.get_macros()
-    if (m) setMacros(m)
-  }, [])
+  const refreshMacros = resync     // edits arrive as state patches; this only catches up if one was missed
 
   const handleEncoderChange = useCallback((idx, config) => {
     setEncoders(prev => {
@@ -156,10 +189,8 @@ export default function App() {
         connected={connected} port={port}
         profiles={profiles} activeProfile={activeProfile}
         onSwitch={async (name) => {
-          const r = await pyapi()?.switch_profile(name)
+          await pyapi()?.switch_profile(name)
           setActive(name)
-          if (r?.macros)   setMacros(r.macros)
-          if (r?.encoders) setEncoders(r.encoders)
           toast(`Profile: ${name}`, 'info')
         }}
         onNew={async (name) => {
@@ -8,6 +8,7 @@ export const MEDIA_OPTIONS    = ['play/pause','next track','prev track','volume
 export const MODIFIER_OPTIONS = ['ctrl','alt','shift','win','ctrl+c','ctrl+v','ctrl+z','ctrl+x','ctrl+a','alt+tab','ctrl+alt+del','ctrl+shift+esc']
 export const FKEY_OPTIONS     = Array.from({length:24},(_,i)=>`f${i+1}`)
 export const SYSTEM_OPTIONS   = ['lock','sleep','shutdown','restart']
+export const DELIVERY_OPTIONS = [['auto','Auto (paste long text)'],['type','Type each key'],['paste','Paste via clipboard']]
 
 // Multi Action cannot contain another Multi Action (avoid nesting)
 const STEP_TYPES = MACRO_TYPES.filter(t => t !== 'Multi Action' && t !== 'Mute App' && t !== 'Delay')
@@ -165,7 +166,23 @@ export function ActionInput({ t, api, type, value, onChange }) {
   )
 }
 
-function MacroSection({ t, api, label, type, setType, action, setAction, holdMs, setHoldMs }) {
+const REPEAT_DEFAULT = { delay_ms:400, rate_ms:80, accel:0 }
+
+function RepeatInput({ t, value, onChange }) {
+  const num = (field, min, max, step) => (
+    <input type="number" value={value[field]} min={min} max={max} step={step}
+      onChange={e => onChange({ ...value, [field]: Math.max(min, Math.min(max, Number(e.target.value))) })}
+      style={{ width:58, padding:'3px 6px', borderRadius:4, border:`1px solid ${t.border}`, background:t.elevated, color:t.text, fontSize:12, textAlign:'center' }} />
+  )
+  return (
+    <div style={{ display:'flex', alignItems:'center', gap:6, marginTop:8, fontSize:11, color:t.dim }}>
+      <span>after</span>{num('delay_ms', 0, 2000, 50)}<span>ms, every</span>{num('rate_ms', 20, 1000, 10)}
+      <span>ms, accel</span>{num('accel', 0, 0.5, 0.05)}
+    </div>
+  )
+}
+
+function MacroSection({ t, api, label, type, setType, action, setAction, holdMs, setHoldMs, delivery, setDelivery, repeat, setRepeat }) {
   const isHold = label.startsWith('Hold')
   return (
     <div style={{ marginBottom:16 }}>
@@ -180,27 +197,46 @@ function MacroSection({ t, api, label, type, setType, action, setAction, holdMs,
             <span style={{ fontSize:11, color:t.dim }}>ms</span>
           </div>
         )}
+        {!isHold && type && setRepeat && (
+          <label style={{ display:'flex', alignItems:'center', gap:6, marginLeft:'auto', fontSize:11, color:t.dim, cursor:'pointer' }}>
+            <input type="checkbox" checked={!!repeat} onChange={e => setRepeat(e.target.checked ? REPEAT_DEFAULT : null)} />
+            repeat while held
+          </label>
+        )}
       </div>
       <select value={type} onChange={e => { setType(e.target.value); setAction('') }} style={{ ...fieldStyle(t), marginBottom:8 }}>
         <option value="">— None —</option>
         {MACRO_TYPES.map(mt => <option key={mt} value={mt}>{mt}</option>)}
       </select>
       {type && <ActionInput t={t} api={api} type={type} value={action} onChange={setAction} />}
+      {!isHold && type && repeat && setRepeat && <RepeatInput t={t} value={repeat} onChange={setRepeat} />}
+      {type === 'Type Text' && (
+        <select value={delivery} onChange={e => setDelivery(e.target.value)} style={{ ...fieldStyle(t), marginTop:8 }}>
+          {DELIVERY_OPTIONS.map(([v, l]) => <option key={v} value={v}>{l}</option>)}
+        </select>
+      )}
     </div>
   )
 }
 
 // ── modal ─────────────────────────────────────────────────────────────────────
-export function MacroModal({ t, api, title, pressData, holdData, onSave, onClose, showHold=true }) {
+export function MacroModal({ t, api, title, pressData, holdData, doubleData, onSave, onClose, showHold=true, showDouble=false, showRepeat=true }) {
   const [pressType,   setPressType]   = useState(pressData?.type    ?? '')
   const [pressAction, setPressAction] = useState(pressData?.action  ?? '')
   const [holdType,    setHoldType]    = useState(holdData?.type     ?? '')
   const [holdAction,  setHoldAction]  = useState(holdData?.action   ?? '')
   const [holdMs,      setHoldMs]      = useState(holdData?.hold_ms  ?? 500)
+  const [pressDelivery, setPressDelivery] = useState(pressData?.delivery ?? 'auto')
+  const [holdDelivery,  setHoldDelivery]  = useState(holdData?.delivery  ?? 'auto')
+  const [pressRepeat,   setPressRepeat]   = useState(pressData?.repeat    ?? null)
+  const [doubleType,     setDoubleType]     = useState(doubleData?.type     ?? '')
+  const [doubleAction,   setDoubleAction]   = useState(doubleData?.action   ?? '')
+  const [doubleDelivery, setDoubleDelivery] = useState(doubleData?.delivery ?? 'auto')
 
   const save = () => onSave(
-    pressType ? { type:pressType, action:pressAction } : null,
-    showHold  ? (holdType ? { type:holdType, action:holdAction, hold_ms:holdMs } : null) : undefined,
+    pressType ? { type:pressType, action:pressAction, delivery:pressDelivery, repeat:showRepeat ? pressRepeat : null } : null,
+    showHold  ? (holdType ? { type:holdType, action:holdAction, hold_ms:holdMs, delivery:holdDelivery } : null) : undefined,
+    showDouble ? (doubleType ? { type:doubleType, action:doubleAction, delivery:doubleDelivery } : null) : undefined,
   )
 
   return (
@@ -212,11 +248,22 @@ export function MacroModal({ t, api, title, pressData, holdData, onSave, onClose
           <button onClick={onClose} style={{ background:'none', border:'none', color:t.muted, cursor:'pointer', fontSize:16 }}>✕</button>
         </div>
         <MacroSection t={t} api={api} label="Press"
-          type={pressType} setType={setPressType} action={pressAction} setAction={setPressAction} />
+          type={pressType} setType={setPressType} action={pressAction} setAction={setPressAction}
+          delivery={pressDelivery} setDelivery={setPressDelivery}
+          repeat={pressRepeat} setRepeat={showRepeat ? setPressRepeat : null} />
         {showHold && (
           <MacroSection t={t} api={api} label="Hold"
             type={holdType} setType={setHoldType} action={holdAction} setAction={setHoldAction}
-            holdMs={holdMs} setHoldMs={setHoldMs} />
+            holdMs={holdMs} setHoldMs={setHoldMs}
+            delivery={holdDelivery} setDelivery={setHoldDelivery} />
+        )}
+        {showDouble && (
+          <MacroSection t={t} api={api} label="Double tap"
+            type={doubleType} setType={setDoubleType} action={doubleAction} setAction={setDoubleAction}
+            delivery={doubleDelivery} setDelivery={setDoubleDelivery} />
+        )}
+        {showDouble && doubleType && pressRepeat && (
+          <div style={{ fontSize:11, color:t.warning, marginBottom:12 }}>A repeating press ignores hold and double tap.</div>
         )}
         <div style={{ display:'flex', justifyContent:'flex-end', gap:8, marginTop:4 }}>
           <button onClick={onClose} style={outlineBtn(t)}>Cancel</button>
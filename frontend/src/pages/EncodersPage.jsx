@@ -215,9 +215,9 @@ const EncoderCard = forwardRef(function EncoderCard({ t, idx, encoder, audioApps
 
   const saveBtnMacro = async (press, hold) => {
     setEditBtn(null)
-    if (press) await api?.set_macro(`KP:${btnKey}`,      press.type, press.action)
+    if (press) await api?.set_macro(`KP:${btnKey}`,      press.type, press.action, null, press.delivery, press.repeat)
     else       await api?.delete_macro(`KP:${btnKey}`)
-    if (hold)  await api?.set_macro(`KP:${btnKey}:HOLD`, hold.type,  hold.action, hold.hold_ms ?? 500)
+    if (hold)  await api?.set_macro(`KP:${btnKey}:HOLD`, hold.type,  hold.action, hold.hold_ms ?? 500, hold.delivery)
     else       await api?.delete_macro(`KP:${btnKey}:HOLD`)
     onRefresh?.()
     toast(`Encoder ${idx + 1} button saved`, 'success')
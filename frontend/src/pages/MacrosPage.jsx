@@ -1,56 +1,86 @@
-import { useState, useRef } from 'react'
-import { MacroModal, macroLabel } from '../components/MacroModal'
+import { useState, useRef, useEffect } from 'react'
+import { MacroModal, macroLabel, fieldStyle, solidBtn, outlineBtn } from '../components/MacroModal'
 import { toast } from '../utils/toast'
 
-const KEY_GRID = [['1','2','3','4'],['5','6','7','8']]
-const ALL_KEYS = KEY_GRID.flat()
+const KEY_GRID    = [['1','2','3','4'],['5','6','7','8']]
+const ALL_KEYS    = KEY_GRID.flat()
+const MAX_LAYERS  = 4
+const LAYER_MODES = ['momentary', 'toggle']
+
+// Commands on layer n (1-based) carry an "L<n>:" prefix; the base layer has none
+const layerPrefix = layer => layer ? `L${layer}:` : ''
 
 export default function MacrosPage({ t, macros, api, onRefresh }) {
-  const [editing,   setEditing]   = useState(null)
-  const [clipboard, setClipboard] = useState(null)
-  const [dragOver,  setDragOver]  = useState(null)
-  const [undoState, setUndoState] = useState(null)  // { keyId, press, hold }
+  const [editing,      setEditing]      = useState(null)
+  const [clipboard,    setClipboard]    = useState(null)
+  const [dragOver,     setDragOver]     = useState(null)
+  const [undoState,    setUndoState]    = useState(null)  // { prefix, keyId, press, hold, double }
+  const [layer,        setLayer]        = useState(0)     // layer being edited, 0 = base
+  const [layers,       setLayers]       = useState([])
+  const [activeLayer,  setActiveLayer]  = useState(0)     // layer currently live on the pad
+  const [layerDraft,   setLayerDraft]   = useState(null)  // rows while the layer editor is open
+  const [chordKeys,    setChordKeys]    = useState(['1', '2'])
+  const [editingChord, setEditingChord] = useState(null)  // chord command
   const dragSrc = useRef(null)
 
-  const handleSave = async (keyId, press, hold) => {
-    setUndoState({
-      keyId,
-      press: macros[`KP:${keyId}`]      ?? null,
-      hold:  macros[`KP:${keyId}:HOLD`] ?? null,
-    })
+  const prefix = layerPrefix(layer)
+
+  useEffect(() => {
+    api?.get_layers?.().then(l => { if (Array.isArray(l)) setLayers(l) }).catch(() => {})
+  }, [api, macros])
+
+  useEffect(() => { if (layer > layers.length) setLayer(0) }, [layers, layer])
+
+  useEffect(() => {
+    const onLayer = (e) => setActiveLayer(e.detail?.layer ?? 0)
+    window.addEventListener('macropad:layer_change', onLayer)
+    return () => window.removeEventListener('macropad:layer_change', onLayer)
+  }, [])
+
+  // ── read / write one key's bindings ──────────────────────────────────────
+  const readKey = (keyId, p = prefix) => ({
+    press:  macros[`${p}KP:${keyId}`]        ?? null,
+    hold:   macros[`${p}KP:${keyId}:HOLD`]   ?? null,
+    double: macros[`${p}KP:${keyId}:DOUBLE`] ?? null,
+  })
+
+  const setOrDelete = async (command, m, holdMs = null) => {
+    if (m) await api?.set_macro(command, m.type, m.action, holdMs, m.delivery, m.repeat)
+    else   await api?.delete_macro(command).catch(() => {})
+  }
+
+  const writeKey = async (keyId, { press, hold, double }, p = prefix) => {
+    await setOrDelete(`${p}KP:${keyId}`,        press)
+    await setOrDelete(`${p}KP:${keyId}:HOLD`,   hold, hold ? (hold.hold_ms ?? 500) : null)
+    await setOrDelete(`${p}KP:${keyId}:DOUBLE`, double)
+  }
+
+  const handleSave = async (keyId, press, hold, double) => {
+    setUndoState({ prefix, keyId, ...readKey(keyId) })
     setEditing(null)
-    if (press) await api?.set_macro(`KP:${keyId}`,      press.type, press.action)
-    else       await api?.delete_macro(`KP:${keyId}`)
-    if (hold)  await api?.set_macro(`KP:${keyId}:HOLD`, hold.type,  hold.action, hold.hold_ms ?? 500)
-    else       await api?.delete_macro(`KP:${keyId}:HOLD`)
+    await writeKey(keyId, { press, hold, double })
     onRefresh?.()
     toast(`Key ${keyId} saved`, 'success')
   }
 
   const handleUndo = async () => {
     if (!undoState) return
-    const { keyId, press, hold } = undoState
+    const { prefix: p, keyId, ...bindings } = undoState
     setUndoState(null)
-    if (press) await api?.set_macro(`KP:${keyId}`,      press.type, press.action)
-    else       await api?.delete_macro(`KP:${keyId}`).catch(() => {})
-    if (hold)  await api?.set_macro(`KP:${keyId}:HOLD`, hold.type,  hold.action, hold.hold_ms ?? 500)
-    else       await api?.delete_macro(`KP:${keyId}:HOLD`).catch(() => {})
+    await writeKey(keyId, bindings, p)
     onRefresh?.()
   }
 
   // ── copy / paste ─────────────────────────────────────────────────────────
   const copyKey = (keyId, e) => {
     e.stopPropagation()
-    setClipboard({
-      press: macros[`KP:${keyId}`]      ?? null,
-      hold:  macros[`KP:${keyId}:HOLD`] ?? null,
-    })
+    setClipboard(readKey(keyId))
   }
 
   const pasteKey = async (keyId, e) => {
     e.stopPropagation()
     if (!clipboard) return
-    await handleSave(keyId, clipboard.press, clipboard.hold)
+    await handleSave(keyId, clipboard.press, clipboard.hold, clipboard.double)
   }
 
   // ── drag and drop ─────────────────────────────────────────────────────────
@@ -63,23 +93,55 @@ export default function MacrosPage({ t, macros, api, onRefresh }) {
     setDragOver(null)
     const srcId = dragSrc.current
     if (!srcId || srcId === targetId) return
-    const srcPress = macros[`KP:${srcId}`]        ?? null
-    const srcHold  = macros[`KP:${srcId}:HOLD`]   ?? null
-    const tgtPress = macros[`KP:${targetId}`]      ?? null
-    const tgtHold  = macros[`KP:${targetId}:HOLD`] ?? null
-    // Swap: write target's macros into src slot
-    if (tgtPress) await api?.set_macro(`KP:${srcId}`, tgtPress.type, tgtPress.action)
-    else          await api?.delete_macro(`KP:${srcId}`).catch(() => {})
-    if (tgtHold)  await api?.set_macro(`KP:${srcId}:HOLD`, tgtHold.type, tgtHold.action, tgtHold.hold_ms ?? 500)
-    else          await api?.delete_macro(`KP:${srcId}:HOLD`).catch(() => {})
-    // Write src's macros into target slot
-    if (srcPress) await api?.set_macro(`KP:${targetId}`, srcPress.type, srcPress.action)
-    else          await api?.delete_macro(`KP:${targetId}`).catch(() => {})
-    if (srcHold)  await api?.set_macro(`KP:${targetId}:HOLD`, srcHold.type, srcHold.action, srcHold.hold_ms ?? 500)
-    else          await api?.delete_macro(`KP:${targetId}:HOLD`).catch(() => {})
+    const src = readKey(srcId)
+    const tgt = readKey(targetId)
+    // Swap: write target's macros into src slot, then src's into target
+    await writeKey(srcId, tgt)
+    await writeKey(targetId, src)
+    onRefresh?.()
+  }
+
+  // ── layers ───────────────────────────────────────────────────────────────
+  const saveLayers = async () => {
+    const r = await api?.set_layers?.(layerDraft)
+    if (!r?.ok) { toast(r?.error || 'Could not save layers', 'error'); return }
+    setLayers(r.layers)
+    setLayerDraft(null)
+    toast('Layers saved', 'success')
+  }
+
+  const updateDraft = (i, field, val) => setLayerDraft(layerDraft.map((l, j) => j === i ? { ...l, [field]: val } : l))
+
+  // ── chords ───────────────────────────────────────────────────────────────
+  const chordRe = new RegExp(`^${prefix}CH:([^+]+)\\+(.+)$`)
+  const chords  = Object.keys(macros).filter(c => chordRe.test(c)).sort()
+
+  const addChord = () => {
+    const [a, b] = chordKeys
+    if (a === b) { toast('Pick two different keys', 'error'); return }
+    const reversed = `${prefix}CH:${b}+${a}`
+    setEditingChord(macros[reversed] ? reversed : `${prefix}CH:${a}+${b}`)
+  }
+
+  const saveChord = async (command, press) => {
+    setEditingChord(null)
+    await setOrDelete(command, press)
+    onRefresh?.()
+    toast(press ? 'Chord saved' : 'Chord removed', 'success')
+  }
+
+  const removeChord = async (command) => {
+    await api?.delete_macro(command).catch(() => {})
     onRefresh?.()
   }
 
+  const tab = (active) => ({
+    padding:'5px 12px', borderRadius:6, fontSize:12, cursor:'pointer',
+    border:`1px solid ${active ? t.accent : t.border}`, background:'transparent', color:active ? t.accent : t.muted,
+  })
+  const small = { padding:'3px 8px', borderRadius:4, border:`1px solid ${t.border}`, background:'transparent', color:t.muted, fontSize:11, cursor:'pointer' }
+  const sectionTitle = { fontSize:11, fontWeight:600, color:t.dim, textTransform:'uppercase', letterSpacing:'0.1em', marginBottom:12, paddingBottom:6, borderBottom:`1px solid ${t.border}` }
+
   return (
     <div>
       <div style={{ marginBottom:24, display:'flex', alignItems:'flex-start', justifyContent:'space-between' }}>
@@ -97,10 +159,55 @@ export default function MacrosPage({ t, macros, api, onRefresh }) {
         )}
       </div>
 
+      {/* Layer tabs */}
+      <div style={{ display:'flex', gap:6, alignItems:'center', marginBottom:16, maxWidth:560, flexWrap:'wrap' }}>
+        {[{ name:'Base' }, ...layers].map((l, i) => (
+          <button key={i} onClick={() => setLayer(i)} style={tab(layer === i)}
+            title={i ? `Hold or toggle key ${l.key}` : 'Bindings when no layer is active'}>
+            {l.name}{activeLayer === i && i > 0 ? ' ●' : ''}
+          </button>
+        ))}
+        <button onClick={() => setLayerDraft(layerDraft ? null : layers.map(l => ({ ...l })))}
+          style={{ ...small, marginLeft:'auto' }}>
+          {layerDraft ? 'Close' : 'Edit layers…'}
+        </button>
+      </div>
+
+      {layerDraft && (
+        <div style={{ background:t.card, border:`1px solid ${t.border}`, borderRadius:8, padding:12, marginBottom:16, maxWidth:560 }}>
+          {layerDraft.map((l, i) => (
+            <div key={i} style={{ display:'flex', gap:6, alignItems:'center', marginBottom:8 }}>
+              <span style={{ fontSize:11, color:t.dim, width:14 }}>{i + 1}</span>
+              <input value={l.name} onChange={e => updateDraft(i, 'name', e.target.value)} placeholder={`Layer ${i + 1}`}
+                style={{ ...fieldStyle(t), flex:2, padding:'5px 8px', fontSize:12 }} />
+              <select value={l.key} onChange={e => updateDraft(i, 'key', e.target.value)}
+                style={{ ...fieldStyle(t), flex:1, padding:'5px 8px', fontSize:12 }}>
+                <option value="">Key…</option>
+                {ALL_KEYS.map(k => <option key={k} value={k}>Key {k}</option>)}
+              </select>
+              <select value={l.mode} onChange={e => updateDraft(i, 'mode', e.target.value)}
+                style={{ ...fieldStyle(t), flex:1, padding:'5px 8px', fontSize:12 }}>
+                {LAYER_MODES.map(m => <option key={m} value={m}>{m === 'momentary' ? 'While held' : 'Toggle'}</option>)}
+              </select>
+              <button onClick={() => setLayerDraft(layerDraft.filter((_, j) => j !== i))} style={small}>✕</button>
+            </div>
+          ))}
+          <div style={{ display:'flex', gap:8, marginTop:4 }}>
+            <button onClick={() => setLayerDraft([...layerDraft, { name:'', key:'', mode:'momentary' }])}
+              disabled={layerDraft.length >= MAX_LAYERS}
+              style={{ ...small, flex:1, borderStyle:'dashed', cursor:layerDraft.length >= MAX_LAYERS ? 'not-allowed' : 'pointer' }}>
+              + Add layer
+            </button>
+            <button onClick={() => setLayerDraft(null)} style={{ ...outlineBtn(t), padding:'5px 14px', fontSize:12 }}>Cancel</button>
+            <button onClick={saveLayers} style={{ ...solidBtn(t), padding:'5px 14px', fontSize:12 }}>Save layers</button>
+          </div>
+        </div>
+      )}
+
       <div style={{ display:'grid', gridTemplateColumns:'repeat(4,1fr)', gap:12, maxWidth:560 }}>
         {ALL_KEYS.map(keyId => {
-          const press      = macros[`KP:${keyId}`]
-          const hold       = macros[`KP:${keyId}:HOLD`]
+          const { press, hold, double } = readKey(keyId)
+          const layerKey   = layers.find(l => l.key === keyId)
           const isDragOver = dragOver === keyId
           return (
             <div key={keyId}
@@ -118,7 +225,14 @@ export default function MacrosPage({ t, macros, api, onRefresh }) {
               onMouseEnter={e => { e.currentTarget.style.borderColor=t.accent; e.currentTarget.style.background=t.hover }}
               onMouseLeave={e => { if (dragOver !== keyId) { e.currentTarget.style.borderColor=t.border; e.currentTarget.style.background=t.card } }}
             >
-              <div className="mono" style={{ fontSize:18, fontWeight:700, color:t.dim, marginBottom:6 }}>{keyId}</div>
+              <div style={{ display:'flex', alignItems:'baseline', justifyContent:'space-between', marginBottom:6 }}>
+                <span className="mono" style={{ fontSize:18, fontWeight:700, color:t.dim }}>{keyId}</span>
+                {layerKey && (
+                  <span style={{ fontSize:10, color:t.accent }} title="Layer key">
+                    {layerKey.mode === 'toggle' ? '⇆' : '⇧'} {layerKey.name}
+                  </span>
+                )}
+              </div>
 
               {/* Click area to edit */}
               <div onClick={() => setEditing(keyId)} style={{ cursor:'pointer' }}>
@@ -128,6 +242,11 @@ export default function MacrosPage({ t, macros, api, onRefresh }) {
                 <div style={{ fontSize:11, color:hold?t.muted:t.dim, overflow:'hidden', textOverflow:'ellipsis', whiteSpace:'nowrap' }}>
                   ⏸ {hold ? macroLabel(hold) : 'empty'}
                 </div>
+                {double && (
+                  <div style={{ fontSize:11, color:t.muted, marginTop:3, overflow:'hidden', textOverflow:'ellipsis', whiteSpace:'nowrap' }}>
+                    ⏩ {macroLabel(double)}
+                  </div>
+                )}
               </div>
 
               {/* Copy / Paste */}
@@ -146,15 +265,56 @@ export default function MacrosPage({ t, macros, api, onRefresh }) {
         })}
       </div>
 
+      {/* Chords */}
+      <div style={{ marginTop:28, maxWidth:560 }}>
+        <div style={sectionTitle}>Chords{layer ? ` — ${layers[layer - 1]?.name ?? ''}` : ''}</div>
+        {chords.length === 0 && <div style={{ fontSize:12, color:t.dim, marginBottom:10 }}>Press two keys together to run a macro of their own.</div>}
+        {chords.map(command => {
+          const [, a, b] = command.match(chordRe)
+          return (
+            <div key={command} style={{ display:'flex', alignItems:'center', gap:10, marginBottom:8 }}>
+              <span className="mono" style={{ fontSize:13, fontWeight:700, color:t.dim, width:56 }}>{a} + {b}</span>
+              <span onClick={() => setEditingChord(command)}
+                style={{ flex:1, fontSize:12, color:t.text, cursor:'pointer', overflow:'hidden', textOverflow:'ellipsis', whiteSpace:'nowrap' }}>
+                {macroLabel(macros[command])}
+              </span>
+              <button onClick={() => setEditingChord(command)} style={small}>Edit</button>
+              <button onClick={() => removeChord(command)} style={small}>✕</button>
+            </div>
+          )
+        })}
+        <div style={{ display:'flex', gap:6, alignItems:'center' }}>
+          {[0, 1].map(i => (
+            <select key={i} value={chordKeys[i]} onChange={e => setChordKeys(i ? [chordKeys[0], e.target.value] : [e.target.value, chordKeys[1]])}
+              style={{ ...fieldStyle(t), width:90, padding:'5px 8px', fontSize:12 }}>
+              {ALL_KEYS.map(k => <option key={k} value={k}>Key {k}</option>)}
+            </select>
+          ))}
+          <button onClick={addChord} style={{ ...small, padding:'5px 12px', fontSize:12 }}>+ Add chord</button>
+        </div>
+      </div>
+
       {editing !== null && (
         <MacroModal
-          t={t} api={api} title={`Key ${editing}`}
-          pressData={macros[`KP:${editing}`]}
-          holdData={macros[`KP:${editing}:HOLD`]}
-          onSave={(press, hold) => handleSave(editing, press, hold)}
+          t={t} api={api} title={layer ? `Key ${editing} — ${layers[layer - 1]?.name ?? ''}` : `Key ${editing}`}
+          pressData={macros[`${prefix}KP:${editing}`]}
+          holdData={macros[`${prefix}KP:${editing}:HOLD`]}
+          doubleData={macros[`${prefix}KP:${editing}:DOUBLE`]}
+          showDouble
+          onSave={(press, hold, double) => handleSave(editing, press, hold, double)}
           onClose={() => setEditing(null)}
         />
       )}
+
+      {editingChord !== null && (
+        <MacroModal
+          t={t} api={api} title={`Chord ${editingChord.match(chordRe)?.slice(1).join(' + ') ?? ''}`}
+          pressData={macros[editingChord]}
+          showHold={false} showRepeat={false}
+          onSave={(press) => saveChord(editingChord, press)}
+          onClose={() => setEditingChord(null)}
+        />
+      )}
     </div>
   )
 }
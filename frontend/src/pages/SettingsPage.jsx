@@ -8,6 +8,10 @@ export default function SettingsPage({ t, settings, api, connected, port, onSave
   const [brightness,     setBrightness]     = useState(settings.brightness_pct ?? 10)
   const [ledTimeout,     setLedTimeout]     = useState(settings.enc_led_timeout ?? 2)
   const [effectSpeed,    setEffectSpeed]    = useState(settings.effect_speed_ms ?? 10)
+  const [pasteThreshold, setPasteThreshold] = useState(settings.paste_threshold ?? 64)
+  const [switchDwell,    setSwitchDwell]    = useState(settings.switch_dwell_ms ?? 150)
+  const [chordWindow,    setChordWindow]    = useState(settings.chord_window_ms ?? 50)
+  const [doubleTap,      setDoubleTap]      = useState(settings.double_tap_ms ?? 250)
   const [saving,         setSaving]         = useState(false)
   const [status,         setStatus]         = useState('')
   const [updateInfo,     setUpdateInfo]     = useState(null)
@@ -20,6 +24,7 @@ export default function SettingsPage({ t, settings, api, connected, port, onSave
   const [triggerApps,    setTriggerApps]    = useState([])
   const [availableApps,  setAvailableApps]  = useState([])
   const [newTriggerApp,  setNewTriggerApp]  = useState('')
+  const [bundleProgress, setBundleProgress] = useState(null)
 
   useEffect(() => {
     api?.get_ports().then(p => { if (Array.isArray(p)) setPorts(p) }).catch(() => {})
@@ -69,7 +74,7 @@ export default function SettingsPage({ t, settings, api, connected, port, onSave
 
   const handleSaveSettings = async () => {
     setSaving(true)
-    const s = { ...settings, port: selPort, baud_rate: baud, brightness_pct: brightness, enc_led_timeout: ledTimeout, effect_speed_ms: effectSpeed }
+    const s = { ...settings, port: selPort, baud_rate: baud, brightness_pct: brightness, enc_led_timeout: ledTimeout, effect_speed_ms: effectSpeed, paste_threshold: pasteThreshold, switch_dwell_ms: switchDwell, chord_window_ms: chordWindow, double_tap_ms: doubleTap }
     await api?.save_settings(s)
     onSave?.(s)
     setSaving(false)
@@ -105,6 +110,31 @@ export default function SettingsPage({ t, settings, api, connected, port, onSave
     input.click()
   }
 
+  const handleExportBundle = async () => {
+    const r = await api?.export_bundle?.(null, true)
+    if (r?.ok) setBundleProgress({ op: 'export', state: 'running', done: 0, total: 0 })
+  }
+
+  const handleImportBundle = async () => {
+    const r = await api?.import_bundle?.(false)
+    if (r?.ok) setBundleProgress({ op: 'import', state: 'running', done: 0, total: 0 })
+  }
+
+  useEffect(() => {
+    const onBundle = (e) => {
+      const p = e.detail
+      setBundleProgress(p)
+      if (p.state === 'error') toast(`Bundle ${p.op} failed: ${p.error}`, 'error')
+      if (p.state === 'done' && p.op === 'export') toast(`Exported ${p.count} profiles`, 'success')
+      if (p.state === 'done' && p.op === 'import') {
+        const renamed = Object.keys(p.renamed ?? {}).length
+        toast(`Imported ${p.count} profiles${renamed ? ` (${renamed} renamed)` : ''}`, 'success')
+      }
+    }
+    window.addEventListener('macropad:bundle_progress', onBundle)
+    return () => window.removeEventListener('macropad:bundle_progress', onBundle)
+  }, [])
+
   // ── Trigger apps ─────────────────────────────────────────────────────────
   const addTriggerApp = async () => {
     const app = newTriggerApp.trim()
@@ -211,6 +241,43 @@ export default function SettingsPage({ t, settings, api, connected, port, onSave
         </div>
       </div>
 
+      {/* Macros */}
+      <div style={section}>
+        <div style={sectionTitle}>Macros</div>
+        <div style={row}>
+          <span style={lbl}>Paste text from</span>
+          <input type="number" min={0} max={10000} step={16} value={pasteThreshold}
+            onChange={e => setPasteThreshold(Math.max(0, Number(e.target.value)))}
+            onBlur={() => api?.set_paste_threshold?.(pasteThreshold)}
+            style={{ ...sel, cursor:'text' }} />
+          <span style={{ fontSize:12, color:t.muted }}>chars (0 = always type)</span>
+        </div>
+        <div style={row}>
+          <span style={lbl}>Auto-switch after</span>
+          <input type="number" min={0} max={5000} step={50} value={switchDwell}
+            onChange={e => setSwitchDwell(Math.max(0, Number(e.target.value)))}
+            onBlur={() => api?.set_switch_dwell?.(switchDwell)}
+            style={{ ...sel, cursor:'text' }} />
+          <span style={{ fontSize:12, color:t.muted }}>ms in front of a trigger app</span>
+        </div>
+        <div style={row}>
+          <span style={lbl}>Chord window</span>
+          <input type="number" min={0} max={500} step={10} value={chordWindow}
+            onChange={e => setChordWindow(Math.max(0, Number(e.target.value)))}
+            onBlur={() => api?.set_key_windows?.(chordWindow, doubleTap)}
+            style={{ ...sel, cursor:'text' }} />
+          <span style={{ fontSize:12, color:t.muted }}>ms between two chord keys</span>
+        </div>
+        <div style={row}>
+          <span style={lbl}>Double tap within</span>
+          <input type="number" min={0} max={1000} step={10} value={doubleTap}
+            onChange={e => setDoubleTap(Math.max(0, Number(e.target.value)))}
+            onBlur={() => api?.set_key_windows?.(chordWindow, doubleTap)}
+            style={{ ...sel, cursor:'text' }} />
+          <span style={{ fontSize:12, color:t.muted }}>ms (press fires after this)</span>
+        </div>
+      </div>
+
       {/* Profile import/export */}
       <div style={section}>
         <div style={sectionTitle}>Profile Import / Export</div>
@@ -218,6 +285,15 @@ export default function SettingsPage({ t, settings, api, connected, port, onSave
           <button onClick={handleExport} style={{ flex:1, padding:'8px', borderRadius:6, border:`1px solid ${t.border}`, background:'transparent', color:t.text, cursor:'pointer', fontSize:13 }}>↓ Export current profile</button>
           <button onClick={handleImport} style={{ flex:1, padding:'8px', borderRadius:6, border:`1px solid ${t.border}`, background:'transparent', color:t.text, cursor:'pointer', fontSize:13 }}>↑ Import profile…</button>
         </div>
+        <div style={{ display:'flex', gap:10, marginTop:10 }}>
+          <button onClick={handleExportBundle} disabled={bundleProgress?.state === 'running'} style={{ flex:1, padding:'8px', borderRadius:6, border:`1px solid ${t.border}`, background:'transparent', color:t.text, cursor:'pointer', fontSize:13 }}>↓ Export all profiles…</button>
+          <button onClick={handleImportBundle} disabled={bundleProgress?.state === 'running'} style={{ flex:1, padding:'8px', borderRadius:6, border:`1px solid ${t.border}`, background:'transparent', color:t.text, cursor:'pointer', fontSize:13 }}>↑ Import bundle…</button>
+        </div>
+        {bundleProgress?.state === 'running' && (
+          <div style={{ fontSize:12, color:t.muted, marginTop:8 }}>
+            {bundleProgress.op === 'export' ? 'Exporting' : 'Reading'}… {bundleProgress.total ? `${bundleProgress.done} / ${bundleProgress.total}` : ''}
+          </div>
+        )}
       </div>
 
       {/* Updates */}
@@ -0,0 +1,24 @@
+// Apply a state patch from Python ({ from, to, ops }) without mutating the old state.
+// An op is [path, value] to set or [path] to delete. Only objects along a patched
+// path are copied, so untouched macros / encoders keep their identity and don't re-render.
+export function applyOps(state, ops) {
+  const next    = { ...state }
+  const copied  = new Set([next])
+  const touched = new Set()
+  for (const [path, ...value] of ops) {
+    touched.add(path[0])
+    let parent = next
+    for (const key of path.slice(0, -1)) {
+      if (!copied.has(parent[key])) {
+        parent[key] = Array.isArray(parent[key]) ? [...parent[key]] : { ...parent[key] }
+        copied.add(parent[key])
+      }
+      parent = parent[key]
+    }
+    const last = path[path.length - 1]
+    if (value.length)                parent[last] = value[0]
+    else if (Array.isArray(parent))  parent.splice(last, 1)
+    else                             delete parent[last]
+  }
+  return [next, touched]
+}
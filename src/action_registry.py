@@ -0,0 +1,133 @@
+"""
+Registry mapping macro type names ('Type Text', 'Launch', …) to handler objects.
+
+Handlers live in plugin modules: the built-in ones in src/plugins/, extra
+ones in the data directory's plugins/ folder. Discovery only reads each
+file's header for a line like
+
+    # macro-types: Keyboard Key, Media Control
+
+so nothing is imported at startup. A plugin module is imported the first
+time one of its types is executed, and must define HANDLERS, a list of
+ActionHandler instances.
+"""
+import importlib.util
+import logging
+import os
+import sys
+import threading
+from utils import get_data_path
+
+log = logging.getLogger(__name__)
+
+_HEADER       = '# macro-types:'
+_HEADER_LINES = 20
+
+if getattr(sys, 'frozen', False):
+    _BUILTIN_DIR = os.path.join(sys._MEIPASS, 'plugins')
+else:
+    _BUILTIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+
+
+class ActionHandler:
+    """Base class for macro action handlers.
+
+    blocking — True if run() may sleep or wait on another process. The
+    executor runs blocking handlers on its worker thread, never on the
+    serial thread.
+    """
+    name     = ''
+    blocking = False
+
+    def run(self, action, macro):
+        raise NotImplementedError
+
+
+_lock     = threading.Lock()
+_handlers = {}      # type name → handler instance (imported)
+_sources  = {}      # type name → plugin file path (discovered, not yet imported)
+_loaded   = set()   # plugin paths already imported
+_scanned  = False
+
+
+def register(handler):
+    """Register a handler instance directly (core types, tests, embedding apps)."""
+    with _lock:
+        _handlers[handler.name] = handler
+
+
+def _plugin_dirs():
+    return [_BUILTIN_DIR, get_data_path('plugins')]
+
+
+def _read_types(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for _, line in zip(range(_HEADER_LINES), f):
+                if line.startswith(_HEADER):
+                    return [t.strip() for t in line[len(_HEADER):].split(',') if t.strip()]
+    except OSError as e:
+        log.warning(f'Cannot read plugin {path}: {e}')
+    return []
+
+
+def discover():
+    """Scan the plugin directories and record which file provides each type. Imports nothing."""
+    global _scanned
+    found = {}
+    for directory in _plugin_dirs():
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.py') or filename.startswith('_'):
+                continue
+            path = os.path.join(directory, filename)
+            for type_name in _read_types(path):
+                if type_name in found and directory != _BUILTIN_DIR:
+                    log.info(f'Plugin {filename} overrides handler for {type_name!r}')
+                found[type_name] = path
+    with _lock:
+        _sources.update(found)
+        _scanned = True
+
+
+def _import(path):
+    name = 'macropad_plugin_' + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, 'HANDLERS', [])
+
+
+def get(type_name):
+    """Return the handler for a macro type, importing its plugin on first use, or None."""
+    handler = _handlers.get(type_name)
+    if handler is not None:
+        return handler
+    if not _scanned:
+        discover()
+    with _lock:
+        handler = _handlers.get(type_name)
+        if handler is not None:
+            return handler
+        path = _sources.get(type_name)
+        if path is None or path in _loaded:
+            return None
+        _loaded.add(path)
+        try:
+            handlers = _import(path)
+        except Exception as e:
+            log.error(f'Failed to load plugin {os.path.basename(path)}: {e}')
+            return None
+        for h in handlers:
+            if _sources.get(h.name, path) == path:
+                _handlers.setdefault(h.name, h)
+        return _handlers.get(type_name)
+
+
+def available_types():
+    """All known type names, including ones whose plugins are not imported yet."""
+    if not _scanned:
+        discover()
+    return sorted(set(_handlers) | set(_sources))
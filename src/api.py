@@ -3,16 +3,23 @@ Python API exposed to the React frontend via pywebview.
 All public methods are callable from JS as:
     await window.pywebview.api.method_name(args)
 """
-import json
+import copy
 import logging
 import os
 import threading
 import time
-import subprocess
-import urllib.request
-import urllib.error
 import macro_manager
+import persistence
 import profile_manager
+from device_shadow import DeviceShadow
+from ipc import IpcServer
+from local_tools import LocalTools, REPO
+import profile_view
+from key_dispatch import KeyDispatcher
+from push_queue import PushQueue, deliver_to_window
+from settings_store import SettingsStore
+from state_store import StateStore
+from switch_controller import SwitchController
 from utils import get_data_path
 
 log = logging.getLogger(__name__)
@@ -49,23 +56,32 @@ def _effect_cmd(enc_id: int, enc: dict) -> str:
     return f'EFFECT:{enc_id + 1}:{val}'
 
 
-class MacroPadAPI:
+class MacroPadAPI(LocalTools):
     def __init__(self):
         self._window        = None
         self._serial_mgr    = None
         self._connected     = False
         self._port          = ''
         self._profile_data  = {}
-        self._settings      = {}
+        self._settings      = SettingsStore()
+        self._settings.subscribe(self._on_settings_changed)
         self._connect_lock        = threading.Lock()
-        self._key_down_times      = {}
+        self._shadow              = DeviceShadow()
+        self._resync_lock         = threading.Lock()
+        self._view                = profile_view.EMPTY   # swapped whole, never mutated
+        self._view_lock           = threading.Lock()     # serialises writers only
+        self._keys                = KeyDispatcher(self._fire_key, self._on_layer_change)
         self._enc_muted           = {0:False,1:False,2:False,3:False}
         self._enc_muted_last_turn = {}
         self._enc_muted_flashing  = {}
         self._recording_buf       = None
-        self._shift_active        = False   # encoder layer shift
-        self._shift_turned        = False   # encoder turned while shift held
         self._fw                  = None    # ForegroundWatcher
+        self._switcher            = SwitchController(self._commit_auto_switch)
+        self._events              = PushQueue(self._deliver_events)
+        self._ipc                 = IpcServer(self)
+        self._state               = StateStore(lambda patch: self._push('state_patch', patch))
+        self._data_watcher        = None    # DataWatcher
+        self._loaded              = threading.Event()   # profiles loaded and the view built
 
     # ── window reference ──────────────────────────────────────────────────────
     def set_window(self, window):
@@ -86,16 +102,41 @@ class MacroPadAPI:
         return {'ok': True, 'maximized': self._maximized}
 
     def close_window(self):
+        self.shutdown()
         if self._window: self._window.destroy()
         return {'ok': True}
 
+    def shutdown(self):
+        """Flush pending writes — called on window close and when the GUI loop exits."""
+        if self._fw:
+            self._fw.stop()
+        if self._data_watcher:
+            self._data_watcher.stop()
+        if self._profile_data:
+            profile_manager.compact(self._profile_data)
+        persistence.store.flush()
+        self._events.stop()
+        self._ipc.stop()
+
     def _push(self, event: str, payload):
+        """Queue an event for the UI; it is delivered with the rest of its frame's events."""
+        self._events.push(event, payload)
+
+    def _deliver_events(self, batch):
         if self._window:
-            safe = json.dumps(payload).replace("'", "\\'")
-            self._window.evaluate_js(
-                f"window.__macropadEvent && window.__macropadEvent('{event}', {safe})",
-                callback=lambda _: None,
-            )
+            deliver_to_window(self._window, batch)
+        self._ipc.broadcast(batch)
+
+    def get_push_stats(self):
+        return self._events.stats()
+
+    # ── Local IPC ─────────────────────────────────────────────────────────────
+    def add_ipc_method(self, name, fn):
+        """Serve an extra callable to IPC clients (the daemon adds open_gui and quit)."""
+        self._ipc.register(name, fn)
+
+    def get_ipc_stats(self):
+        return self._ipc.stats()
 
     def _default_encoders(self):
         return [dict(_DEFAULT_ENCODER) for _ in range(4)]
@@ -103,35 +144,61 @@ class MacroPadAPI:
     def _serial_send(self, cmd: str):
         if self._serial_mgr:
             self._serial_mgr.send_data(cmd + '\n')
+            if self._connected:
+                self._shadow.record(cmd)
+
+    def _serial_send_many(self, cmds):
+        """Send several commands in one write."""
+        if self._serial_mgr and cmds:
+            self._serial_mgr.send_data(''.join(c + '\n' for c in cmds))
+            if self._connected:
+                for cmd in cmds:
+                    self._shadow.record(cmd)
 
     # ── Startup ───────────────────────────────────────────────────────────────
     def startup(self):
-        existing = macro_manager.reload_macros()
-        self._profile_data = profile_manager.load(existing)
-        active = profile_manager.get_active(self._profile_data)
-        macro_manager.macros.clear()
-        macro_manager.macros.update(active.get('macros', existing))
-
-        settings = self._load_settings()
-        self._settings = settings
+        """Return the UI state as soon as it is loaded; nothing here waits on the device.
 
-        port  = settings.get('port', 'COM6')
-        baud  = int(settings.get('baud_rate', 115200))
+        Settings are read first because they name the port, so the connection
+        (and the volume reads it triggers) starts on its own thread while macros
+        and profiles load; its status reaches the UI as connection events. The
+        watchers and the IPC server start after the view is built.
+        """
+        self._settings.load()
+        macro_manager.set_paste_threshold(self._settings.get('paste_threshold'))
+        self._switcher.dwell_s = max(0, self._settings.get('switch_dwell_ms')) / 1000
+        self._apply_key_windows()
+        port  = self._settings.get('port')
+        baud  = int(self._settings.get('baud_rate'))
         threading.Thread(target=self._do_connect, args=(port, baud), daemon=True).start()
 
+        existing = macro_manager.reload_macros()
+        data     = profile_manager.load(existing)
+        profile_manager.get_active(data).setdefault('macros', existing)
+        self._profile_data = data
+        self._refresh_view()
+        self._loaded.set()
+
+        threading.Thread(target=self._start_services, name='startup-services', daemon=True).start()
+        return self._state.snapshot()
+
+    def _start_services(self):
         # Start foreground watcher for auto profile switching
         from foreground_watcher import ForegroundWatcher
         self._fw = ForegroundWatcher(self._on_foreground_change)
         self._fw.start()
 
-        return {
-            'macros':      macro_manager.macros,
-            'profiles':    profile_manager.get_names(self._profile_data),
-            'active':      profile_manager.get_active_name(self._profile_data),
-            'settings':    settings,
-            'encoders':    active.get('encoders', self._default_encoders()),
-            'trigger_apps': profile_manager.get_active(self._profile_data).get('trigger_apps', []),
-        }
+        # Pick up JSON files edited by hand or by provisioning scripts
+        from data_watcher import DataWatcher
+        self._data_watcher = DataWatcher(os.path.dirname(get_data_path('macros.json')),
+                                         self._on_data_file_changed)
+        self._data_watcher.start()
+
+        # Let scripts and other tools share the pad while the app holds the port
+        try:
+            self._ipc.start()
+        except OSError as e:
+            log.warning(f'IPC server not started: {e}')
 
     # ── Serial ────────────────────────────────────────────────────────────────
     def get_ports(self):
@@ -166,12 +233,12 @@ class MacroPadAPI:
                 connected_callback=self._on_connection_changed,
                 port=port,
                 baud_rate=baud,
+                fingerprint=self._settings.get('device_fingerprint') or None,
             )
             self._connected = True
             self._port = port
             self._push('connection', {'connected': True, 'port': port})
-            self._save_settings_field('port', port)
-            self._save_settings_field('baud_rate', str(baud))
+            self._settings.update({'port': port, 'baud_rate': str(baud)})
         except Exception as e:
             self._connected = False
             self._push('connection', {'connected': False, 'port': '', 'error': str(e)})
@@ -180,39 +247,66 @@ class MacroPadAPI:
 
     def _on_connection_changed(self, connected):
         self._connected = connected
+        self._shadow.clear()          # a (re)connected device has booted with its own defaults
+        if not connected:
+            self._keys.reset()
         if connected and self._serial_mgr:
             actual = self._serial_mgr.port
             if actual != self._port:
                 log.info(f'Auto-connected to {actual} (was configured for {self._port})')
                 self._port = actual
-                self._save_settings_field('port', actual)
+                self._settings.set('port', actual)
+            if self._serial_mgr.fingerprint:
+                self._settings.set('device_fingerprint', self._serial_mgr.fingerprint)
         self._push('connection', {'connected': connected, 'port': self._port if connected else ''})
         if connected:
-            # Delay slightly so the ESP32 finishes booting before we flood it
-            threading.Thread(target=self._send_initial_state, daemon=True).start()
-
-    def _send_initial_state(self):
-        """Send brightness, LED colors, effects, and volume levels on connect."""
-        time.sleep(2.5)
-        s = self._load_settings()
-        brightness_pct = s.get('brightness_pct', 10)
-        self._serial_send(f'BRIGHT:{round(brightness_pct * 255 / 100)}')
-        time.sleep(0.05)
-        active   = profile_manager.get_active(self._profile_data)
-        encoders = active.get('encoders', self._default_encoders())
-
-        enc_timeout = s.get('enc_led_timeout', 2)
-        self._serial_send(f'ENC_TIMEOUT:{enc_timeout}')
-        time.sleep(0.05)
-        effect_speed = s.get('effect_speed_ms', 10)
-        self._serial_send(f'EFFECT_SPEED:{effect_speed}')
-        time.sleep(0.05)
+            # A warm connect did not reset the pad, so there is no boot to wait for
+            boot = not (self._serial_mgr and self._serial_mgr.warm)
+            threading.Thread(target=self._send_initial_state, kwargs={'boot': boot}, daemon=True).start()
+
+    def _send_initial_state(self, boot=False, cancel=None):
+        """Bring the device in line with the settings and active profile.
+
+        Only commands whose value differs from what the device was last sent
+        go out, so a switch between profiles with the same encoder setup sends
+        nothing. boot=True (fresh connection) first waits for the ESP32 to
+        report that it has booted; the shadow is empty then, so everything is
+        sent. Commands go out in batches sized to the firmware's advertised
+        line rate and buffer. Setting cancel (a threading.Event) stops the
+        resync between batches.
+        """
+        mgr = self._serial_mgr
+        if mgr is None:
+            return
+        if boot and not mgr.wait_ready():
+            log.warning('MacroPad did not report ready — sending its state anyway')
+        self._loaded.wait()           # the first connection can beat the profile load
+        with self._resync_lock:
+            for batch, pause in mgr.batches(self._shadow.diff(self._device_state())):
+                if cancel is not None and cancel.is_set():
+                    return
+                self._serial_send_many(batch)
+                time.sleep(pause)
+
+    def _resync(self):
+        """Resync the device in the background, cancelling any resync this one supersedes."""
+        self._switcher.resync(lambda token: self._send_initial_state(cancel=token))
+
+    def _device_state(self):
+        """The full command list describing brightness, LED colors, effects and volume levels."""
+        s        = self._settings
+        encoders = [target.config for target in self._view.encoders]
+        commands = [
+            f'BRIGHT:{round(s.get("brightness_pct", 10) * 255 / 100)}',
+            f'ENC_TIMEOUT:{s.get("enc_led_timeout", 2)}',
+            f'EFFECT_SPEED:{s.get("effect_speed_ms", 10)}',
+        ]
 
         from volume_manager import MASTER_APP, MIC_APP
+        vm = self._serial_mgr.volume_manager if self._serial_mgr else None
         for enc_id, enc in enumerate(encoders):
             n   = enc_id + 1
             app = enc.get('app', '')
-            vm  = self._serial_mgr.volume_manager if self._serial_mgr else None
 
             # Read mute state (master/mic don't support per-app mute)
             muted = False
@@ -224,12 +318,9 @@ class MacroPadAPI:
             self._enc_muted[enc_id] = muted
 
             if muted:
-                self._serial_send(f'{n}:color(200,0,0)')
-                time.sleep(0.06)
-                self._serial_send(f'{n}:100')
+                commands += [f'{n}:color(200,0,0)', f'{n}:100']
             else:
-                self._serial_send(_color_cmd(enc_id, enc))
-                time.sleep(0.06)
+                commands.append(_color_cmd(enc_id, enc))
                 if vm and app:
                     pct = 0
                     try:
@@ -241,10 +332,9 @@ class MacroPadAPI:
                             pct = vm.get_volume(app) or 0
                     except Exception as e:
                         log.debug(f'Could not read volume for {app}: {e}')
-                    self._serial_send(f'{n}:{pct}')
-            time.sleep(0.06)
-            self._serial_send(_effect_cmd(enc_id, enc))
-            time.sleep(0.06)
+                    commands.append(f'{n}:{pct}')
+            commands.append(_effect_cmd(enc_id, enc))
+        return commands
 
     def _on_serial_data(self, data):
         data = data.strip()
@@ -257,16 +347,15 @@ class MacroPadAPI:
             try:
                 enc_id    = int(parts[1])
                 direction = parts[2]
+                self._ipc.publish('device', [['encoder', {'id': enc_id, 'direction': direction}]])
                 increase  = direction == '+'
-                active    = profile_manager.get_active(self._profile_data)
-                encoders  = active.get('encoders', [])
-                enc       = encoders[enc_id] if enc_id < len(encoders) else {}
+                enc       = self._view.encoder(enc_id)
                 # Use shifted app if shift key is held and a shift app is configured
-                if self._shift_active and enc.get('app_shift'):
-                    app = enc['app_shift']
-                    self._shift_turned = True
+                if enc and self._keys.shift_active and enc.app_shift:
+                    app = enc.app_shift
+                    self._keys.mark_shift_used()
                 else:
-                    app = enc.get('app', '')
+                    app = enc.app if enc else ''
                 pct       = -1
                 if self._enc_muted.get(enc_id, False):
                     # Record this turn's time; start the flash thread only if not already running
@@ -296,55 +385,102 @@ class MacroPadAPI:
                 log.warning(f'Error processing encoder event: {e}')
             return
 
-        # Key event
+        # Key event — tap-only keys fire on DOWN, others resolve in the dispatcher
         if parts[0] == 'KP' and len(parts) >= 3:
             key   = parts[1]
             event = parts[2]
-            shift_key = self._settings.get('shift_key', '')
+            self._ipc.publish('device', [['key', {'key': key, 'event': event,
+                                                  'ms': parts[3] if len(parts) >= 4 else None}]])
             if event == 'DOWN':
-                self._key_down_times[key] = time.monotonic()
-                if shift_key and key == shift_key:
-                    self._shift_active  = True
-                    self._shift_turned  = False
+                self._keys.on_down(key)
             elif event == 'UP':
-                if shift_key and key == shift_key:
-                    self._shift_active = False
-                    if self._shift_turned:
-                        self._shift_turned = False
-                        return  # suppress macro fire — key was used as shift
-                # Use firmware-provided duration if present, else calculate from DOWN timestamp
+                fw_ms = None
                 if len(parts) >= 4:
                     try:
-                        ms = int(parts[3])
+                        fw_ms = int(parts[3])
                     except ValueError:
-                        ms = 0
-                else:
-                    down_t = self._key_down_times.pop(key, None)
-                    ms = round((time.monotonic() - down_t) * 1000) if down_t else 0
-                hold_entry = macro_manager.macros.get(f'KP:{key}:HOLD')
-                threshold  = hold_entry.get('hold_ms', 500) if hold_entry else 500
-                macro_key  = f'KP:{key}:HOLD' if ms >= threshold else f'KP:{key}'
-                macro      = macro_manager.macros.get(macro_key)
-                if macro and macro.get('type') == 'Mute App':
-                    self._execute_mute_app(key)
-                else:
-                    macro_manager.execute_macro(macro_key)
-                self._push('key_press', {'key': key, 'macro_key': macro_key, 'macro': macro, 'ms': ms})
+                        pass
+                self._keys.on_up(key, fw_ms)
+
+    def _fire_key(self, key, macro_key, ms, repeat=False):
+        view  = self._view
+        macro = view.macros.get(macro_key)
+        if macro_key in view.mute_commands:
+            self._execute_mute_app(key, view)
+        else:
+            macro_manager.execute_macro(macro_key, macro, coalesce=repeat)
+        self._push('key_press', {'key': key, 'macro_key': macro_key, 'macro': macro, 'ms': ms})
+
+    def _refresh_view(self):
+        """Rebuild the active-profile snapshot after a switch or edit and swap it in.
+
+        Hot-path readers take self._view once per event, so they see either the
+        old or the new profile in full. The keymap and macro_manager's table are
+        replaced from the same build.
+        """
+        with self._view_lock:
+            view = profile_view.build(profile_manager.get_active_name(self._profile_data),
+                                      profile_manager.get_resolved_active(self._profile_data),
+                                      self._settings.get('shift_key', ''),
+                                      self._default_encoders())
+            macro_manager.replace_macros(view.macros)
+            self._keys.load(view.keymap)
+            self._view = view
+        self._publish_state()
+        return view
+
+    # ── UI state sync ─────────────────────────────────────────────────────────
+    def _publish_state(self):
+        """Diff what the UI shows against the last published state and push the patch, if any."""
+        if not self._profile_data:
+            return
+        view  = self._view
+        names = profile_manager.get_names(self._profile_data)
+        self._state.publish({
+            'active':       view.name,
+            'profiles':     names,
+            'parents':      {n: p for n in names if (p := profile_manager.get_parent(self._profile_data, n))},
+            'macros':       dict(view.macros),
+            'encoders':     [dict(e.config) for e in view.encoders],
+            'trigger_apps': list(profile_manager.get_trigger_apps(self._profile_data, view.name)),
+            'settings':     self._settings.as_dict(),
+        })
+
+    def get_state(self, version: int = 0):
+        """Patches since version, or a full snapshot if the client is too far behind."""
+        return self._state.since(int(version))
+
+    def _on_layer_change(self, layer, name):
+        self._push('layer_change', {'layer': layer, 'name': name})
+
+    def get_device_info(self):
+        """Firmware capabilities reported by the pad ({} for firmware without a CAPS line)."""
+        mgr = self._serial_mgr
+        return {'connected': self._connected, 'port': self._port, 'caps': dict(mgr.caps) if mgr else {}}
 
     def send_command(self, cmd):
-        if self._serial_mgr:
-            self._serial_mgr.send_data(cmd + '\n')
+        self._serial_send(cmd)
         return {'ok': True}
 
+    def send_commands(self, cmds: list):
+        """Send a batch of device commands in one write (for IPC clients and scripts)."""
+        lines = [line for cmd in cmds for line in str(cmd).splitlines() if line.strip()]
+        self._serial_send_many(lines)
+        return {'ok': True, 'sent': len(lines), 'connected': self._connected}
+
     # ── Macros ────────────────────────────────────────────────────────────────
     def get_macros(self):
         return dict(macro_manager.macros)
 
-    def set_macro(self, key, macro_type, action, hold_ms=None):
+    def set_macro(self, key, macro_type, action, hold_ms=None, delivery=None, repeat=None):
         macro_manager.set_macro(key, macro_type, action,
-                                hold_ms=int(hold_ms) if hold_ms is not None else None)
+                                hold_ms=int(hold_ms) if hold_ms is not None else None,
+                                delivery=delivery, repeat=repeat)
         macro_manager.save_macros()
-        self._queue_profile_save()
+        profile_manager.record(self._profile_data, 'set_macro',
+                               profile=profile_manager.get_active_name(self._profile_data),
+                               command=key, entry=macro_manager.macros[key])
+        self._refresh_view()
         return {'ok': True}
 
     def delete_macro(self, key):
@@ -352,50 +488,98 @@ class MacroPadAPI:
             macro_manager.delete_macro(key)
         except KeyError:
             pass
-        self._queue_profile_save()
+        active_name = profile_manager.get_active_name(self._profile_data)
+        if profile_manager.inherits_macro(self._profile_data, active_name, key):
+            # Hide the parent's binding rather than falling back to it
+            profile_manager.record(self._profile_data, 'set_macro', profile=active_name, command=key, entry=None)
+        else:
+            profile_manager.record(self._profile_data, 'delete_macro', profile=active_name, command=key)
+        self._refresh_view()
         return {'ok': True}
 
+    def undo(self):
+        """Revert the last macro, encoder, trigger or profile edit."""
+        undone = profile_manager.undo(self._profile_data)
+        if undone is None:
+            return {'ok': False, 'error': 'Nothing to undo'}
+        self._refresh_view()
+        macro_manager.save_macros()
+        self._resync()
+        return {
+            'ok':       True,
+            'undone':   undone['op'],
+            'can_undo': profile_manager.can_undo(),
+            'version':  self._state.version,
+        }
+
     # ── Profiles ──────────────────────────────────────────────────────────────
     def get_profiles(self):
+        names = profile_manager.get_names(self._profile_data)
         return {
-            'names':  profile_manager.get_names(self._profile_data),
-            'active': profile_manager.get_active_name(self._profile_data),
+            'names':   names,
+            'active':  profile_manager.get_active_name(self._profile_data),
+            'parents': {n: profile_manager.get_parent(self._profile_data, n) for n in names
+                        if profile_manager.get_parent(self._profile_data, n)},
         }
 
     def switch_profile(self, name):
+        self._switcher.cancel_pending()
         profile_manager.switch(self._profile_data, name)
-        active = profile_manager.get_active(self._profile_data)
-        macro_manager.macros.clear()
-        macro_manager.macros.update(active.get('macros', {}))
+        self._refresh_view()
         macro_manager.save_macros()
-        profile_manager.save(self._profile_data)
+        profile_manager.save(self._profile_data, ())
         # Re-send LED state for new profile's encoder configs
-        threading.Thread(target=self._send_initial_state, daemon=True).start()
-        return {
-            'ok': True,
-            'macros':   dict(macro_manager.macros),
-            'encoders': active.get('encoders', self._default_encoders()),
-        }
+        self._resync()
+        return {'ok': True, 'version': self._state.version}
 
-    def new_profile(self, name):
+    def new_profile(self, name, parent=None):
+        """Create a profile; with parent it inherits everything it does not override."""
         if name in profile_manager.get_names(self._profile_data):
             return {'ok': False, 'error': 'Profile already exists'}
-        profile_manager.create(self._profile_data, name)
-        profile_manager.save(self._profile_data)
+        if parent and parent not in profile_manager.get_names(self._profile_data):
+            return {'ok': False, 'error': 'Parent profile not found'}
+        profile_manager.create(self._profile_data, name, parent)
+        profile_manager.save(self._profile_data, [name])
+        self._publish_state()
+        return {'ok': True}
+
+    def set_profile_parent(self, name, parent=None):
+        """Make name inherit from parent (None = standalone). Its own settings keep winning."""
+        if name not in profile_manager.get_names(self._profile_data):
+            return {'ok': False, 'error': 'Profile not found'}
+        if parent and parent not in profile_manager.get_names(self._profile_data):
+            return {'ok': False, 'error': 'Parent profile not found'}
+        if profile_manager.get_parent(self._profile_data, name) != (parent or None):
+            if not profile_manager.record(self._profile_data, 'set_parent', profile=name, parent=parent or None):
+                return {'ok': False, 'error': 'A profile cannot inherit from itself or its descendants'}
+        if name in profile_manager.lineage(self._profile_data, self._view.name):
+            self._refresh_view()
+            macro_manager.save_macros()
+            self._resync()
+        else:
+            self._publish_state()
         return {'ok': True}
 
     def delete_profile(self, name):
         if len(profile_manager.get_names(self._profile_data)) <= 1:
             return {'ok': False, 'error': 'Cannot delete the last profile'}
-        profile_manager.delete(self._profile_data, name)
-        profile_manager.save(self._profile_data)
+        children = profile_manager.get_children(self._profile_data, name)
+        if children:
+            return {'ok': False, 'error': f'Other profiles inherit from this one: {", ".join(children)}'}
+        profile_manager.record(self._profile_data, 'delete', profile=name)
+        if self._view.name != profile_manager.get_active_name(self._profile_data):
+            self._refresh_view()        # the active profile was deleted
+            macro_manager.save_macros()
+        else:
+            self._publish_state()
         return {'ok': True}
 
     def duplicate_profile(self, name: str):
-        new_name = profile_manager.duplicate(self._profile_data, name)
-        if not new_name:
+        if name not in profile_manager.get_names(self._profile_data):
             return {'ok': False, 'error': 'Profile not found'}
-        profile_manager.save(self._profile_data)
+        new_name = profile_manager.copy_name(self._profile_data, name)
+        profile_manager.record(self._profile_data, 'duplicate', source=name, new=new_name)
+        self._publish_state()
         return {
             'ok':    True,
             'name':  new_name,
@@ -408,9 +592,12 @@ class MacroPadAPI:
             return {'ok': False, 'error': 'Name cannot be empty'}
         if new_name in profile_manager.get_names(self._profile_data):
             return {'ok': False, 'error': 'Name already exists'}
-        if not profile_manager.rename(self._profile_data, old_name, new_name):
+        if not profile_manager.record(self._profile_data, 'rename', old=old_name, new=new_name):
             return {'ok': False, 'error': 'Rename failed'}
-        profile_manager.save(self._profile_data)
+        if self._view.name == old_name:
+            self._refresh_view()
+        else:
+            self._publish_state()
         return {
             'ok':     True,
             'names':  profile_manager.get_names(self._profile_data),
@@ -422,26 +609,131 @@ class MacroPadAPI:
 
     def import_profile(self, exported: dict):
         new_name = profile_manager.import_profile(self._profile_data, exported)
-        profile_manager.save(self._profile_data)
+        profile_manager.save(self._profile_data, [new_name])
+        self._publish_state()
         return {'ok': True, 'name': new_name}
 
-    def _queue_profile_save(self):
-        active         = profile_manager.get_active(self._profile_data)
-        encoder_states = active.get('encoders', self._default_encoders())
-        profile_manager.update_profile(self._profile_data, macro_manager.macros, encoder_states)
-        profile_manager.save(self._profile_data)
+    # ── Bundles ───────────────────────────────────────────────────────────────
+    def export_bundle(self, names=None, include_settings=True, path=None):
+        """Write profiles (default: all) and settings to a .macropad archive. Progress arrives as bundle_progress."""
+        path = path or self._bundle_dialog(save=True)
+        if not path:
+            return {'ok': False, 'cancelled': True}
+        settings = self._settings.as_dict() if include_settings else None
+
+        def _run():
+            try:
+                import bundles
+                count = bundles.export_bundle(self._profile_data, path, names, settings,
+                                              progress=self._bundle_progress('export'))
+                self._push('bundle_progress', {'op': 'export', 'state': 'done', 'count': count, 'path': path})
+            except Exception as e:
+                log.warning(f'export_bundle failed: {e}')
+                self._push('bundle_progress', {'op': 'export', 'state': 'error', 'error': str(e)})
+
+        threading.Thread(target=_run, daemon=True).start()
+        return {'ok': True, 'path': path}
+
+    def import_bundle(self, include_settings=False, path=None):
+        """Add every profile from a .macropad archive, renaming clashes. Progress arrives as bundle_progress."""
+        path = path or self._bundle_dialog(save=False)
+        if not path:
+            return {'ok': False, 'cancelled': True}
+
+        def _run():
+            try:
+                import bundles
+                entries, settings = bundles.read_bundle(path, progress=self._bundle_progress('import'))
+                names = bundles.plan_import(self._profile_data, entries)
+                added = bundles.import_entries(self._profile_data, entries, names)
+                profile_manager.save(self._profile_data, added)
+                if include_settings and settings:
+                    settings.pop('port', None)     # COM port numbering is per machine
+                    settings.pop('device_fingerprint', None)
+                    self._settings.update(settings)
+                renamed = {old: new for old, new in names.items() if old != new}
+                self._publish_state()
+                self._push('bundle_progress', {'op': 'import', 'state': 'done', 'count': len(added),
+                                               'renamed': renamed, 'settings': bool(include_settings and settings)})
+            except Exception as e:
+                log.warning(f'import_bundle failed: {e}')
+                self._push('bundle_progress', {'op': 'import', 'state': 'error', 'error': str(e)})
+
+        threading.Thread(target=_run, daemon=True).start()
+        return {'ok': True, 'path': path}
+
+    # ── External edits ────────────────────────────────────────────────────────
+    def _on_data_file_changed(self, path, obj):
+        """DataWatcher callback (watcher thread): fold a file edited outside the app into the live state."""
+        if not isinstance(obj, dict):
+            log.warning(f'Ignoring external edit of {path}: not a JSON object')
+            return
+        filename = os.path.basename(path)
+        in_profiles = os.path.basename(os.path.dirname(path)) == 'profiles'
+        before   = profile_manager.get_active_name(self._profile_data)
+        if not in_profiles and filename == 'settings_serial.json':
+            if not self._settings.update(obj, persist=False):
+                return
+        elif not in_profiles and filename == 'macros.json':
+            if not self._apply_external_macros(obj):
+                return
+        elif in_profiles and filename == 'index.json':
+            if not profile_manager.apply_external_index(self._profile_data, obj):
+                return
+        elif in_profiles:
+            if not profile_manager.valid_profile(obj):
+                log.warning(f'Ignoring external edit of {filename}: not a valid profile')
+                return
+            name = profile_manager.apply_external_shard(self._profile_data, filename, obj)
+            if name is None:
+                return
+            if name not in profile_manager.lineage(self._profile_data, before):
+                self._publish_state()
+                return
+        else:
+            return
+
+        view = self._refresh_view()
+        if view.name != before:
+            self._push('profile_switch', {'active': view.name})
+        self._resync()
+
+    def _apply_external_macros(self, macros):
+        """macros.json mirrors the active profile's macros; apply just the bindings that differ."""
+        active  = profile_manager.get_active_name(self._profile_data)
+        current = self._view.macros
+        changed = False
+        for key, entry in macros.items():
+            if isinstance(entry, dict) and current.get(key) != entry:
+                changed |= profile_manager.record(self._profile_data, 'set_macro',
+                                                  profile=active, command=key, entry=entry)
+        for key in set(current) - set(macros):
+            if profile_manager.inherits_macro(self._profile_data, active, key):
+                changed |= profile_manager.record(self._profile_data, 'set_macro',
+                                                  profile=active, command=key, entry=None)
+            else:
+                changed |= profile_manager.record(self._profile_data, 'delete_macro',
+                                                  profile=active, command=key)
+        return changed
+
+    def _bundle_progress(self, op):
+        return lambda done, total: self._push('bundle_progress', {'op': op, 'state': 'running',
+                                                                  'done': done, 'total': total})
+
+    def _bundle_dialog(self, save):
+        import bundles
+        return bundles.ask_path(self._window, save)
 
     # ── Encoders ──────────────────────────────────────────────────────────────
     def get_encoders(self):
-        active = profile_manager.get_active(self._profile_data)
-        return active.get('encoders', self._default_encoders())
+        return [dict(target.config) for target in self._view.encoders]
 
     def set_encoder(self, idx: int, config: dict):
         active_name = profile_manager.get_active_name(self._profile_data)
         if active_name not in self._profile_data['profiles']:
             return {'ok': False}
-        prof     = self._profile_data['profiles'][active_name]
-        enc_list = prof.setdefault('encoders', self._default_encoders())
+        resolved = profile_manager.resolve(self._profile_data, active_name)
+        enc_list = copy.deepcopy(resolved.get('encoders') or self._default_encoders())
         while len(enc_list) <= idx:
             enc_list.append(dict(_DEFAULT_ENCODER))
 
@@ -456,43 +748,66 @@ class MacroPadAPI:
                     self._serial_send(_effect_cmd(i, other))
 
         enc_list[idx].update(config)
-        profile_manager.save(self._profile_data)
+        profile_manager.record(self._profile_data, 'set_encoders', profile=active_name,
+                               encoders=profile_manager.encoder_overrides(self._profile_data, active_name, enc_list))
+        self._refresh_view()
 
         # Push updated color/effect to device
         enc = enc_list[idx]
         self._restore_encoder_led(idx)
         self._serial_send(_effect_cmd(idx, enc))
 
-        return {'ok': True, 'encoders': [dict(e) for e in enc_list]}
+        return {'ok': True, 'version': self._state.version}
+
+    # ── Layers ────────────────────────────────────────────────────────────────
+    def get_layers(self):
+        return profile_manager.get_resolved_active(self._profile_data).get('layers', [])
+
+    def set_layers(self, layers):
+        """Replace the active profile's layers; None drops its override and inherits the parent's."""
+        from keymap import MAX_LAYERS, LAYER_MODES
+        clean = None if layers is None else []
+        for layer in list(layers or [])[:MAX_LAYERS]:
+            key  = str(layer.get('key', ''))
+            mode = layer.get('mode', 'momentary')
+            if not key or mode not in LAYER_MODES:
+                return {'ok': False, 'error': f'Layer {len(clean) + 1} needs a key and a valid mode'}
+            clean.append({'name': str(layer.get('name', '')) or f'Layer {len(clean) + 1}',
+                          'key': key, 'mode': mode})
+        active_name = profile_manager.get_active_name(self._profile_data)
+        if active_name not in self._profile_data['profiles']:
+            return {'ok': False}
+        profile_manager.record(self._profile_data, 'set_layers', profile=active_name, layers=clean)
+        self._refresh_view()
+        return {'ok': True, 'layers': self.get_layers()}
 
     # ── Trigger apps (auto profile switching) ────────────────────────────────
     def get_trigger_apps(self, profile_name: str):
-        return self._profile_data.get('profiles', {}).get(profile_name, {}).get('trigger_apps', [])
+        return profile_manager.get_trigger_apps(self._profile_data, profile_name)
 
     def set_trigger_apps(self, profile_name: str, apps: list):
-        profile_manager.set_trigger_apps(self._profile_data, profile_name, list(apps))
-        profile_manager.save(self._profile_data)
+        profile_manager.record(self._profile_data, 'set_trigger_apps', profile=profile_name, apps=list(apps))
+        self._publish_state()
         return {'ok': True}
 
-    def _on_foreground_change(self, app_name: str):
-        found = profile_manager.find_profile_for_app(self._profile_data, app_name)
-        if not found:
-            return
-        current = profile_manager.get_active_name(self._profile_data)
-        if found == current:
-            return
-        log.info(f'Auto-switching to profile {found!r} (foreground: {app_name})')
+    def _on_foreground_change(self, app_name: str, title: str = ''):
+        found = profile_manager.find_profile_for_app(self._profile_data, app_name, title)
+        self._switcher.request(found)      # None (no profile claims it) drops a pending switch
+
+    def _commit_auto_switch(self, found):
+        """SwitchController callback, once the foreground has settled on found's trigger app."""
+        if found == profile_manager.get_active_name(self._profile_data) or found not in self._profile_data['profiles']:
+            return False
+        log.info(f'Auto-switching to profile {found!r}')
         profile_manager.switch(self._profile_data, found)
-        active = profile_manager.get_active(self._profile_data)
-        macro_manager.macros.clear()
-        macro_manager.macros.update(active.get('macros', {}))
-        self._push('profile_switch', {
-            'active':      found,
-            'macros':      dict(macro_manager.macros),
-            'encoders':    active.get('encoders', self._default_encoders()),
-            'trigger_apps': active.get('trigger_apps', []),
-        })
-        threading.Thread(target=self._send_initial_state, daemon=True).start()
+        self._refresh_view()
+        self._push('profile_switch', {'active': found})     # the state patch carries the rest
+        self._resync()
+        return True
+
+    def get_switch_stats(self):
+        """Counters for tuning the auto-switch dwell time."""
+        return self._switcher.stats()
 
     # ── Startup with Windows ──────────────────────────────────────────────────
     def get_startup(self):
@@ -509,14 +824,12 @@ class MacroPadAPI:
 
     def set_startup(self, enabled: bool):
         import winreg
-        import sys
+        from daemon import startup_command
         key_path = r'Software\Microsoft\Windows\CurrentVersion\Run'
         try:
             reg = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, winreg.KEY_SET_VALUE)
             if enabled:
-                exe    = sys.executable.replace('python.exe', 'pythonw.exe')
-                script = os.path.normpath(os.path.join(os.path.dirname(__file__), 'main_webview.py'))
-                winreg.SetValueEx(reg, 'MacroPad', 0, winreg.REG_SZ, f'"{exe}" "{script}"')
+                winreg.SetValueEx(reg, 'MacroPad', 0, winreg.REG_SZ, startup_command())
             else:
                 try:
                     winreg.DeleteValue(reg, 'MacroPad')
@@ -532,37 +845,63 @@ class MacroPadAPI:
         return self._settings.get('shift_key', '')
 
     def set_shift_key(self, key: str):
-        self._settings['shift_key'] = key
-        self._save_settings_field('shift_key', key)
+        self._settings.set('shift_key', key)   # keymap recompiles via _on_settings_changed
         return {'ok': True}
 
     # ── Settings ──────────────────────────────────────────────────────────────
     def get_settings(self):
-        return self._load_settings()
+        return self._settings.as_dict()
 
     def save_settings(self, settings: dict):
-        try:
-            with open(get_data_path('settings_serial.json'), 'w') as f:
-                json.dump(settings, f)
-        except Exception as e:
-            return {'ok': False, 'error': str(e)}
+        self._settings.update(settings)
         return {'ok': True}
 
+    def _on_settings_changed(self, changed: dict):
+        if 'paste_threshold' in changed:
+            macro_manager.set_paste_threshold(changed['paste_threshold'])
+        if 'switch_dwell_ms' in changed:
+            self._switcher.dwell_s = max(0, changed['switch_dwell_ms']) / 1000
+        if 'chord_window_ms' in changed or 'double_tap_ms' in changed:
+            self._apply_key_windows()
+        if 'shift_key' in changed and self._profile_data:
+            self._refresh_view()
+        self._publish_state()
+
+    def _apply_key_windows(self):
+        self._keys.chord_window_ms  = max(0, self._settings.get('chord_window_ms'))
+        self._keys.double_window_ms = max(0, self._settings.get('double_tap_ms'))
+
+    def get_persistence_stats(self):
+        return persistence.store.stats()
+
     def set_brightness(self, pct: int):
         self._serial_send(f'BRIGHT:{round(pct * 255 / 100)}')
-        self._save_settings_field('brightness_pct', pct)
+        self._settings.set('brightness_pct', pct)
         return {'ok': True}
 
     def set_enc_led_timeout(self, secs: int):
         self._serial_send(f'ENC_TIMEOUT:{secs}')
-        self._save_settings_field('enc_led_timeout', secs)
+        self._settings.set('enc_led_timeout', secs)
         return {'ok': True}
 
     def set_effect_speed(self, ms: int):
         self._serial_send(f'EFFECT_SPEED:{ms}')
-        self._save_settings_field('effect_speed_ms', ms)
+        self._settings.set('effect_speed_ms', ms)
         return {'ok': True}
 
+    def set_paste_threshold(self, chars: int):
+        self._settings.set('paste_threshold', max(0, int(chars)))
+        return {'ok': True, 'paste_threshold': macro_manager.paste_threshold}
+
+    def set_switch_dwell(self, ms: int):
+        self._settings.set('switch_dwell_ms', max(0, int(ms)))
+        return {'ok': True, 'switch_dwell_ms': self._settings.get('switch_dwell_ms')}
+
+    def set_key_windows(self, chord_ms: int, double_ms: int):
+        self._settings.update({'chord_window_ms': max(0, int(chord_ms)), 'double_tap_ms': max(0, int(double_ms))})
+        return {'ok': True, 'chord_window_ms': self._settings.get('chord_window_ms'),
+                'double_tap_ms': self._settings.get('double_tap_ms')}
+
     def get_audio_apps(self):
         if self._serial_mgr:
             try:
@@ -576,80 +915,29 @@ class MacroPadAPI:
             log.warning(f'get_audio_apps fallback failed: {e}')
             return []
 
-    # ── Macro Recording ───────────────────────────────────────────────────────
-    def start_recording(self):
-        try:
-            import keyboard as kb
-            self._recording_buf = kb.start_recording()
-            return {'ok': True}
-        except Exception as e:
-            return {'ok': False, 'error': str(e)}
-
-    def get_recording_status(self):
-        count = len(self._recording_buf) if self._recording_buf is not None else 0
-        return {'ok': True, 'count': count}
-
-    def stop_recording(self):
-        try:
-            import keyboard as kb
-            events = kb.stop_recording()
-            self._recording_buf = None
-            # Normalise timestamps so the first event starts at t=0
-            t0 = events[0].time if events else 0
-            data = [
-                {
-                    'event_type': e.event_type,
-                    'scan_code':  int(e.scan_code or 0),
-                    'name':       e.name,
-                    'time':       round(e.time - t0, 4),
-                }
-                for e in events
-            ]
-            return {'ok': True, 'events': json.dumps(data), 'count': len(data)}
-        except Exception as e:
-            self._recording_buf = None
-            return {'ok': False, 'error': str(e)}
+    # ── Local tools (recording, firmware upload, update) ──────────────────────
+    def _release_port(self):
+        if self._serial_mgr:
+            self._serial_mgr.stop()
 
-    # ── Firmware Upload ───────────────────────────────────────────────────────
-    def upload_firmware(self, ino_path: str, cli_path: str, action: str, board: str, port: str):
-        def _run():
-            if self._serial_mgr:
-                self._serial_mgr.stop()
-            try:
-                compile_cmd = f'"{cli_path}" compile --fqbn {board} "{ino_path}"'
-                r = subprocess.run(compile_cmd, shell=True, capture_output=True, text=True, timeout=120)
-                self._push('upload_log', {'line': r.stdout or r.stderr or 'Compile done', 'ok': r.returncode == 0})
-                if r.returncode != 0:
-                    self._push('upload_done', {'ok': False, 'error': 'Compilation failed'})
-                    return
-                if action == 'upload':
-                    upload_cmd = f'"{cli_path}" upload --fqbn {board} --port {port} "{ino_path}"'
-                    r2 = subprocess.run(upload_cmd, shell=True, capture_output=True, text=True, timeout=120)
-                    self._push('upload_log', {'line': r2.stdout or r2.stderr or 'Upload done', 'ok': r2.returncode == 0})
-                    self._push('upload_done', {'ok': r2.returncode == 0})
-                else:
-                    self._push('upload_done', {'ok': True})
-            except Exception as e:
-                self._push('upload_done', {'ok': False, 'error': str(e)})
-            finally:
-                if self._serial_mgr:
-                    self._serial_mgr.start()
+    def _reclaim_port(self):
+        if self._serial_mgr:
+            self._serial_mgr.start()
 
-        threading.Thread(target=_run, daemon=True).start()
-        return {'ok': True, 'started': True}
+    def _exit_for_update(self):
+        self.shutdown()
+        if self._window:
+            self._window.destroy()
 
     # ── Mute App helper ───────────────────────────────────────────────────────
-    _BTN_TO_ENC = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+    _BTN_TO_ENC = profile_view.BUTTON_ENCODERS
 
-    def _execute_mute_app(self, btn_key: str):
+    def _execute_mute_app(self, btn_key: str, view=None):
         enc_id = self._BTN_TO_ENC.get(btn_key, -1)
         if enc_id < 0 or not self._serial_mgr:
             return
-        active   = profile_manager.get_active(self._profile_data)
-        encoders = active.get('encoders', [])
-        if enc_id >= len(encoders):
-            return
-        app = encoders[enc_id].get('app', '')
+        target = (view or self._view).encoder(enc_id)
+        app    = target.app if target else ''
         if not app:
             return
         from volume_manager import MASTER_APP, MIC_APP
@@ -727,11 +1015,10 @@ class MacroPadAPI:
     def _restore_encoder_led(self, enc_id: int):
         """Re-send the configured color + current volume (or mute red) for an encoder."""
         try:
-            active   = profile_manager.get_active(self._profile_data)
-            encoders = active.get('encoders', [])
-            if enc_id >= len(encoders):
+            target = self._view.encoder(enc_id)
+            if target is None:
                 return
-            enc = encoders[enc_id]
+            enc = target.config
             n   = enc_id + 1
             if self._enc_muted.get(enc_id, False):
                 self._serial_send(f'{n}:color(200,0,0)')
@@ -753,7 +1040,7 @@ class MacroPadAPI:
             log.debug(f'_restore_encoder_led failed for enc {enc_id}: {e}')
 
     # ── Update check ──────────────────────────────────────────────────────────
-    _REPO          = 'brimgit/MacroPad-Serial-To-Macros-GUI'
+    _REPO          = REPO
     _RAW_URL       = f'https://raw.githubusercontent.com/{_REPO}/main/version.txt'
     _REPO_URL      = f'https://github.com/{_REPO}'
     _RELEASES_URL  = f'https://github.com/{_REPO}/releases'
@@ -765,6 +1052,8 @@ class MacroPadAPI:
         except Exception as e:
             return {'ok': False, 'error': f'Could not read local version: {e}'}
 
+        import urllib.request
+        import urllib.error
         try:
             req = urllib.request.Request(
                 self._RAW_URL,
@@ -786,46 +1075,6 @@ class MacroPadAPI:
             'releases_url':     self._RELEASES_URL,
         }
 
-    def install_update(self, version: str):
-        """Download the installer for *version* from GitHub Releases and run it."""
-        url  = (f'https://github.com/{self._REPO}/releases/download/'
-                f'v{version}/MacroPad_Setup_v{version}.exe')
-        import tempfile
-        dest = os.path.join(tempfile.gettempdir(), f'MacroPad_Setup_v{version}.exe')
-
-        def _run():
-            try:
-                self._push('update_progress', {'state': 'downloading', 'pct': 0})
-                req = urllib.request.Request(
-                    url, headers={'User-Agent': 'MacroPad-updater/1.0'})
-                with urllib.request.urlopen(req, timeout=120) as r:
-                    total = int(r.headers.get('Content-Length') or 0)
-                    done  = 0
-                    with open(dest, 'wb') as f:
-                        while True:
-                            chunk = r.read(32768)
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                            done += len(chunk)
-                            if total:
-                                self._push('update_progress', {
-                                    'state': 'downloading',
-                                    'pct': int(done * 100 / total),
-                                })
-                self._push('update_progress', {'state': 'launching'})
-                import subprocess
-                subprocess.Popen([dest])
-                time.sleep(1)
-                if self._window:
-                    self._window.destroy()
-            except Exception as e:
-                log.warning(f'install_update failed: {e}')
-                self._push('update_progress', {'state': 'error', 'error': str(e)})
-
-        threading.Thread(target=_run, daemon=True).start()
-        return {'ok': True}
-
     def _local_version(self) -> str:
         import sys
         if getattr(sys, 'frozen', False):
@@ -848,19 +1097,3 @@ class MacroPadAPI:
             return ap > bp
         except Exception:
             return a != b
-
-    # ── Helpers ───────────────────────────────────────────────────────────────
-    def _load_settings(self):
-        try:
-            with open(get_data_path('settings_serial.json'), 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {'port': 'COM6', 'baud_rate': '115200', 'brightness_pct': 10}
-        except Exception as e:
-            log.warning(f'Failed to load settings, using defaults: {e}')
-            return {'port': 'COM6', 'baud_rate': '115200', 'brightness_pct': 10}
-
-    def _save_settings_field(self, key, value):
-        s = self._load_settings()
-        s[key] = value
-        self.save_settings(s)
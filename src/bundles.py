@@ -0,0 +1,199 @@
+"""
+Profile bundles — many profiles (and optionally settings) in one zip archive.
+
+Layout:
+    manifest.json               format, version, profile list (name, file, parent)
+    profiles/<file>.json        one profile each, exactly as stored
+    settings.json               optional
+
+Export streams each profile straight into the archive: a profile already in
+memory is serialised entry by entry, one that was never opened this session
+is copied from its shard file without being parsed. Import validates the
+whole archive and settles every name clash in one pass before touching the
+live profiles, so a bad bundle changes nothing.
+"""
+import copy
+import io
+import json
+import os
+import time
+import zipfile
+import logging
+import profile_manager
+
+log = logging.getLogger(__name__)
+
+FORMAT         = 'macropad-bundle'
+VERSION        = 1
+EXTENSION      = '.macropad'
+MAX_ENTRY_SIZE = 32 * 1024 * 1024      # refuse absurdly large members (zip bombs)
+
+
+class BundleError(Exception):
+    pass
+
+
+def _noop(done, total):
+    pass
+
+
+def export_bundle(data, path, names=None, settings=None, progress=_noop):
+    """Write the named profiles (default: all) and optional settings dict to path. Returns the count."""
+    profiles = data['profiles']
+    names    = [n for n in (names or list(profiles)) if n in profiles]
+    if not names:
+        raise BundleError('No profiles to export')
+    included = set(names)
+    entries  = []
+    tmp      = path + '.part'
+    try:
+        with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for done, name in enumerate(names):
+                member = f'profiles/{len(entries):04d}.json'
+                parent = profile_manager.get_parent(data, name)
+                if parent and parent not in included:
+                    # The parent stays behind — ship this profile flattened so it stands alone
+                    profile = copy.deepcopy(profile_manager.resolve(data, name))
+                    profile.pop('parent', None)
+                    parent = None
+                    _write_json(zf, member, profile)
+                else:
+                    shard = _shard_path(profiles, name)
+                    if shard:
+                        zf.write(shard, member)
+                    else:
+                        _write_json(zf, member, profiles[name])
+                entries.append({'name': name, 'file': member, **({'parent': parent} if parent else {})})
+                progress(done + 1, len(names))
+            if settings is not None:
+                _write_json(zf, 'settings.json', settings)
+            _write_json(zf, 'manifest.json', {
+                'format':   FORMAT,
+                'version':  VERSION,
+                'created':  time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'profiles': entries,
+                'settings': settings is not None,
+            })
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    log.info(f'Exported {len(entries)} profiles to {path}')
+    return len(entries)
+
+
+def _write_json(zf, member, obj):
+    with zf.open(member, 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8') as f:
+        json.dump(obj, f, indent=2)
+
+
+def _shard_path(profiles, name):
+    """The on-disk shard for a profile that was never loaded (so the file is current), else None."""
+    if not isinstance(profiles, profile_manager.ProfileShards) or profiles.is_loaded(name):
+        return None
+    path = profiles.path_of(name)
+    return path if os.path.isfile(path) else None
+
+
+def ask_path(window, save):
+    """Native save/open dialog for a bundle on a pywebview window. Returns the path or None."""
+    if not window:
+        return None
+    import webview
+    file_types = (f'MacroPad bundle (*{EXTENSION})',)
+    if save:
+        result = window.create_file_dialog(webview.SAVE_DIALOG, file_types=file_types,
+                                           save_filename=f'MacroPad{EXTENSION}')
+    else:
+        result = window.create_file_dialog(webview.OPEN_DIALOG, file_types=file_types)
+    if isinstance(result, (list, tuple)):
+        result = result[0] if result else None
+    return result
+
+
+def read_bundle(path, progress=_noop):
+    """Parse and validate a bundle. Returns (manifest entries with 'profile' filled in, settings or None)."""
+    try:
+        zf = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        raise BundleError(f'Not a MacroPad bundle: {e}')
+    with zf:
+        manifest = _read_json(zf, 'manifest.json')
+        if not isinstance(manifest, dict) or manifest.get('format') != FORMAT:
+            raise BundleError('Not a MacroPad bundle')
+        if manifest.get('version', 0) > VERSION:
+            raise BundleError(f'Bundle version {manifest["version"]} is newer than this app supports')
+        entries = manifest.get('profiles')
+        if not isinstance(entries, list) or not entries:
+            raise BundleError('Bundle contains no profiles')
+        out, seen = [], set()
+        for done, entry in enumerate(entries):
+            name = entry.get('name') if isinstance(entry, dict) else None
+            if not isinstance(name, str) or not name.strip() or name in seen:
+                raise BundleError(f'Bad or duplicate profile entry #{done + 1}')
+            seen.add(name)
+            profile = _read_json(zf, entry.get('file', ''))
+            if not profile_manager.valid_profile(profile):
+                raise BundleError(f'Profile {name!r} is malformed')
+            out.append({'name': name, 'parent': entry.get('parent'), 'profile': profile})
+            progress(done + 1, len(entries))
+        settings = _read_json(zf, 'settings.json') if manifest.get('settings') else None
+        if settings is not None and not isinstance(settings, dict):
+            raise BundleError('settings.json is malformed')
+    return out, settings
+
+
+def _read_json(zf, member):
+    try:
+        info = zf.getinfo(member)
+    except KeyError:
+        raise BundleError(f'Bundle is missing {member}')
+    if info.file_size > MAX_ENTRY_SIZE:
+        raise BundleError(f'{member} is too large')
+    try:
+        with zf.open(info) as f:
+            return json.load(f)
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise BundleError(f'{member} is unreadable: {e}')
+
+
+def plan_import(data, entries):
+    """Map every bundle name to a free profile name in one pass. Returns {bundle name: new name}."""
+    taken, names = set(data['profiles']), {}
+    for entry in entries:
+        base = name = entry['name']
+        counter = 1
+        while name in taken:
+            name = f'{base} ({counter})'
+            counter += 1
+        taken.add(name)
+        names[entry['name']] = name
+    return names
+
+
+def import_entries(data, entries, names):
+    """Add validated bundle entries under their planned names, parents before children."""
+    pending, added = list(entries), []
+    while pending:
+        progressed = False
+        for entry in list(pending):
+            parent = entry['parent']
+            if parent in names and names[parent] not in added:
+                continue                      # wait for the parent (it comes from the bundle too)
+            profile = entry['profile']
+            if parent in names:
+                profile['parent'] = names[parent]
+            else:
+                profile.pop('parent', None)
+            data['profiles'][names[entry['name']]] = profile
+            added.append(names[entry['name']])
+            pending.remove(entry)
+            progressed = True
+        if not progressed:                    # parent cycle inside the bundle — break it
+            entry = pending[0]
+            entry['parent'] = None
+            entry['profile'].pop('parent', None)
+    return added
@@ -0,0 +1,152 @@
+"""
+Minimal Unicode clipboard access for the paste-based Type Text path.
+
+Talks to the Win32 clipboard API through ctypes so no extra dependency is
+needed. Only CF_UNICODETEXT is read and written — get_text() returns None
+when the clipboard holds no text (or on non-Windows platforms). save() tells
+an empty clipboard apart from one whose content can't be read back as text.
+"""
+import ctypes
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+_CF_UNICODETEXT = 13
+_GMEM_MOVEABLE  = 0x0002
+_OPEN_RETRIES   = 10      # another app may briefly hold the clipboard open
+_OPEN_RETRY_S   = 0.01
+
+_api = None
+
+
+def _win32():
+    """Load and prototype the clipboard functions once (pointer-sized handles on x64)."""
+    global _api
+    if _api is None:
+        user32   = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        user32.OpenClipboard.argtypes    = [ctypes.c_void_p]
+        user32.GetClipboardData.restype  = ctypes.c_void_p
+        user32.GetClipboardData.argtypes = [ctypes.c_uint]
+        user32.SetClipboardData.restype  = ctypes.c_void_p
+        user32.SetClipboardData.argtypes = [ctypes.c_uint, ctypes.c_void_p]
+        kernel32.GlobalAlloc.restype     = ctypes.c_void_p
+        kernel32.GlobalAlloc.argtypes    = [ctypes.c_uint, ctypes.c_size_t]
+        kernel32.GlobalLock.restype      = ctypes.c_void_p
+        kernel32.GlobalLock.argtypes     = [ctypes.c_void_p]
+        kernel32.GlobalUnlock.argtypes   = [ctypes.c_void_p]
+        kernel32.GlobalFree.argtypes     = [ctypes.c_void_p]
+        user32.CountClipboardFormats.restype = ctypes.c_int
+        _api = (user32, kernel32)
+    return _api
+
+
+def _open(user32):
+    for _ in range(_OPEN_RETRIES):
+        if user32.OpenClipboard(None):
+            return True
+        time.sleep(_OPEN_RETRY_S)
+    return False
+
+
+def _read_text(user32, kernel32):
+    handle = user32.GetClipboardData(_CF_UNICODETEXT)
+    if not handle:
+        return None
+    ptr = kernel32.GlobalLock(handle)
+    if not ptr:
+        return None
+    try:
+        return ctypes.wstring_at(ptr)
+    finally:
+        kernel32.GlobalUnlock(handle)
+
+
+def get_text():
+    """Return the clipboard's Unicode text, or None if it has none / is unavailable."""
+    try:
+        user32, kernel32 = _win32()
+    except (AttributeError, OSError):
+        return None
+    if not _open(user32):
+        log.debug('Clipboard busy — could not read')
+        return None
+    try:
+        return _read_text(user32, kernel32)
+    finally:
+        user32.CloseClipboard()
+
+
+def save():
+    """Read the clipboard so it can be put back with restore().
+
+    Returns (True, text), (True, None) when the clipboard is empty, or
+    (False, None) when it holds only non-text data or could not be read.
+    """
+    try:
+        user32, kernel32 = _win32()
+    except (AttributeError, OSError):
+        return False, None
+    if not _open(user32):
+        log.debug('Clipboard busy — could not read')
+        return False, None
+    try:
+        if not user32.CountClipboardFormats():
+            return True, None
+        text = _read_text(user32, kernel32)
+        return text is not None, text
+    finally:
+        user32.CloseClipboard()
+
+
+def restore(text):
+    """Put back what save() returned: the text, or an empty clipboard for None."""
+    return clear() if text is None else set_text(text)
+
+
+def clear():
+    """Empty the clipboard. Returns True on success."""
+    try:
+        user32, _ = _win32()
+    except (AttributeError, OSError):
+        return False
+    if not _open(user32):
+        log.debug('Clipboard busy — could not clear')
+        return False
+    try:
+        return bool(user32.EmptyClipboard())
+    finally:
+        user32.CloseClipboard()
+
+
+def set_text(text):
+    """Replace the clipboard contents with *text*. Returns True on success."""
+    try:
+        user32, kernel32 = _win32()
+    except (AttributeError, OSError):
+        return False
+    buf    = ctypes.create_unicode_buffer(text)
+    size   = ctypes.sizeof(buf)
+    handle = kernel32.GlobalAlloc(_GMEM_MOVEABLE, size)
+    if not handle:
+        return False
+    ptr = kernel32.GlobalLock(handle)
+    if not ptr:
+        kernel32.GlobalFree(handle)
+        return False
+    ctypes.memmove(ptr, buf, size)
+    kernel32.GlobalUnlock(handle)
+
+    if not _open(user32):
+        kernel32.GlobalFree(handle)
+        log.debug('Clipboard busy — could not write')
+        return False
+    try:
+        user32.EmptyClipboard()
+        if not user32.SetClipboardData(_CF_UNICODETEXT, handle):
+            kernel32.GlobalFree(handle)
+            return False
+        return True   # the clipboard now owns the memory
+    finally:
+        user32.CloseClipboard()
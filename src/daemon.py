@@ -0,0 +1,91 @@
+"""
+Headless MacroPad: serial, volume, macros and auto profile switching without a window.
+
+    MacroPad.exe --daemon          run in the background (e.g. from the Run key)
+    MacroPad.exe --daemon --gui    same, and open the window straight away
+    MacroPad.exe --attach          open a window on the running daemon
+
+The daemon never imports pywebview. The GUI is a separate process started
+on request (open_gui over IPC, or `--daemon --gui` while a daemon is
+already running); closing the window ends only that process, so the
+embedded browser is not kept resident between uses.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def startup_command():
+    """Command line for the login Run key: the daemon, with no console window."""
+    if getattr(sys, 'frozen', False):
+        return f'"{sys.executable}" --daemon'
+    exe    = sys.executable.replace('python.exe', 'pythonw.exe')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main_webview.py')
+    return f'"{exe}" "{script}" --daemon'
+
+
+def gui_command():
+    """Command line that opens a window attached to the daemon."""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, '--attach']
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main_webview.py'), '--attach']
+
+
+class Daemon:
+    def __init__(self):
+        from api import MacroPadAPI
+        self.api   = MacroPadAPI()
+        self._gui  = None
+        self._done = threading.Event()
+        self.api.add_ipc_method('open_gui', self.open_gui)
+        self.api.add_ipc_method('quit', self.quit)
+
+    def run(self, open_gui=False):
+        self.api.startup()             # also starts the IPC server
+        if open_gui:
+            self.open_gui()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                signal.signal(sig, lambda *_: self.quit())
+            except (ValueError, OSError):
+                pass
+        try:
+            while not self._done.wait(1.0):     # wake periodically so signals are handled on Windows
+                pass
+        finally:
+            if self._gui and self._gui.poll() is None:
+                self._gui.terminate()
+            self.api.shutdown()
+
+    def open_gui(self):
+        """Start the window process unless one is already open."""
+        if self._gui and self._gui.poll() is None:
+            return {'ok': True, 'pid': self._gui.pid, 'running': True}
+        self._gui = subprocess.Popen(gui_command(), cwd=os.getcwd())
+        log.info(f'GUI started (pid {self._gui.pid})')
+        return {'ok': True, 'pid': self._gui.pid}
+
+    def quit(self):
+        self._done.set()
+        return {'ok': True}
+
+
+def main(argv):
+    from ipc import IpcClient, IpcError
+    try:
+        running = IpcClient(timeout=1.0)
+    except (IpcError, OSError):
+        running = None
+    if running:
+        # One daemon per data directory — a second launch at most brings up its window
+        log.info('MacroPad daemon already running')
+        if '--gui' in argv:
+            running.call('open_gui')
+        running.close()
+        return
+    Daemon().run(open_gui='--gui' in argv)
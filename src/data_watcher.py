@@ -0,0 +1,92 @@
+"""
+Watches the data directory for JSON files edited outside the app.
+
+Every POLL_S the watcher stats Data/*.json and Data/profiles/*.json. Only
+a file whose mtime or size moved is read; its bytes are then hashed, and a
+file whose content is exactly what persistence last wrote there is our own
+write and is skipped. Anything else is parsed here, on the watcher thread,
+and handed to on_change(path, obj). A file that does not parse (an editor
+halfway through saving, a typo) is logged and retried when it next changes;
+it is never quarantined or overwritten.
+
+Polling is used rather than inotify / ReadDirectoryChangesW: the directory
+holds a handful of small files, the check is a few stat calls, and it
+behaves the same on every platform and on network drives.
+"""
+import json
+import os
+import threading
+import logging
+import persistence
+
+log = logging.getLogger(__name__)
+
+POLL_S = 1.0
+
+
+class DataWatcher:
+    def __init__(self, root, on_change, interval=POLL_S):
+        self._root      = os.path.abspath(root)
+        self._on_change = on_change
+        self._interval  = interval
+        self._stats     = {}     # path → (mtime_ns, size) at the last scan
+        self._seen      = {}     # path → digest of the last content handed over or rejected
+        self._stop      = threading.Event()
+        self._thread    = None
+
+    def start(self):
+        self._stats  = self._scan()       # whatever is on disk now is the baseline
+        self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self._interval + 1)
+        self._thread = None
+
+    def _scan(self):
+        found = {}
+        for directory in (self._root, os.path.join(self._root, 'profiles')):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith('.json') or entry.name.startswith('.'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                found[entry.path] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            current = self._scan()
+            changed = [p for p, sig in current.items() if self._stats.get(p) != sig]
+            self._stats = current
+            for path in changed:
+                try:
+                    self._check(path)
+                except Exception as e:
+                    log.warning(f'Data watcher: handling {path} failed: {e}')
+
+    def _check(self, path):
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return                            # removed or locked mid-save; the next change retries
+        digest = persistence.digest(raw)
+        if persistence.is_own_write(path, raw) or self._seen.get(path) == digest:
+            return
+        self._seen[path] = digest
+        try:
+            obj = json.loads(raw)
+        except ValueError as e:
+            log.warning(f'{os.path.relpath(path, self._root)} was edited but does not parse ({e}) — ignored')
+            return
+        log.info(f'External edit detected: {os.path.relpath(path, self._root)}')
+        self._on_change(path, obj)
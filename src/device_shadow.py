@@ -0,0 +1,50 @@
+"""
+Host-side copy of the state last sent to the MacroPad.
+
+Every command that goes out through MacroPadAPI._serial_send is recorded
+by the slot it sets — brightness, encoder 2's colour, encoder 3's level —
+so a resync can build the full desired command list and send only the
+commands whose slot would change. Switching between profiles with the same
+encoder setup therefore sends nothing. clear() forgets everything; call it
+when the device (re)connects, since it boots with its own defaults.
+"""
+import threading
+
+_GLOBAL_SLOTS = ('BRIGHT', 'ENC_TIMEOUT', 'EFFECT_SPEED')
+
+
+def slot(cmd: str):
+    """The device setting a command writes, or None for commands that set no state (PING, …)."""
+    head, _, rest = cmd.partition(':')
+    if head in _GLOBAL_SLOTS:
+        return head
+    if head == 'EFFECT':
+        return 'effect', rest.partition(':')[0]
+    if head.isdigit():
+        return ('color', head) if rest.startswith('color') else ('level', head)   # color(...) / colorfade(...)
+    return None
+
+
+class DeviceShadow:
+    def __init__(self):
+        self._lock  = threading.Lock()
+        self._state = {}        # slot → last command sent for it
+
+    def record(self, cmd: str):
+        s = slot(cmd)
+        if s is not None:
+            with self._lock:
+                self._state[s] = cmd
+
+    def diff(self, commands):
+        """Return the commands from a desired-state list that the device does not already reflect."""
+        with self._lock:
+            return [cmd for cmd in commands if slot(cmd) is None or self._state.get(slot(cmd)) != cmd]
+
+    def clear(self):
+        with self._lock:
+            self._state.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._state)
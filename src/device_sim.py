@@ -0,0 +1,363 @@
+"""
+MacroPad device simulator — the firmware side of the serial protocol, without an ESP32.
+
+Speaks what MacroPad_Arduino_Code.ino speaks: answers PING and CAPS?,
+announces READY and CAPS after a simulated boot, keeps a virtual model of
+the four LED rings (BRIGHT, EFFECT, color, colorfade, colorvolume,
+rgbpointer, N:pct, ...) and emits KP / E traffic, scripted or random.
+
+    python src/device_sim.py --socket 7777                 # app port: socket://127.0.0.1:7777
+    python src/device_sim.py --pty                         # prints /dev/pts/N (Linux, macOS)
+    python src/device_sim.py --socket 7777 --keys-per-s 5 --turns-per-s 40
+    python src/device_sim.py --socket 7777 --script demo.txt
+
+A script has one "<delay ms> <line>" per line, e.g. "250 KP:1:DOWN"; lines
+starting with # are ignored. For tests and benchmarks, build a DeviceSim
+with any write(bytes) callable, feed() it the host's bytes and read its
+counters and LED model directly.
+
+Like the firmware, the simulator works through at most `rate` command
+lines per second and drops bytes that would overflow its `rx` byte
+receive buffer (counted in stats), so it exposes host-side pacing bugs.
+"""
+import argparse
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+KEYS     = '12345678ABCD'       # keypad characters, as in the firmware's key map
+ENCODERS = 4
+LEDS     = 10
+EFFECTS  = 6                    # 1=breathe … 6=sparkle
+CAPS     = {'v': 1, 'fw': '1.1-sim', 'keys': len(KEYS), 'enc': ENCODERS, 'leds': LEDS,
+            'rate': 200, 'rx': 256, 'line': 64,
+            'cmds': 'PING,CAPS?,BRIGHT,ENC_TIMEOUT,EFFECT_SPEED,EFFECT,color,colorfade,colorvolume,rgbpointer,pct'}
+
+_RGB      = r'(\d+),(\d+),(\d+)'
+_COMMANDS = [
+    ('rgbpointer',  re.compile(rf'^(\d+):rgbpointer\({_RGB},(\d+)\)$')),
+    ('colorfade',   re.compile(rf'^(\d+):colorfade\({_RGB},{_RGB},(\d+)\)$')),
+    ('colorvolume', re.compile(rf'^(\d+):colorvolume\({_RGB}\)$')),
+    ('color',       re.compile(rf'^(\d+):color\({_RGB}\)$')),
+    ('pct',         re.compile(r'^(\d+):(\d+)$')),
+]
+
+
+def _clamp(v, lo, hi):
+    return max(lo, min(hi, int(v)))
+
+
+def caps_line(caps=CAPS):
+    return 'CAPS:' + ';'.join(f'{k}={v}' for k, v in caps.items())
+
+
+class Strip:
+    """One LED ring's state, mirroring the firmware's StripData."""
+
+    def __init__(self):
+        self.mode        = 'solid'          # solid | fade | volume | pointer
+        self.color       = (50, 50, 50)
+        self.fade_color  = (255, 100, 0)
+        self.blend_start = 0
+        self.pointer_pos = 0
+        self.percentage  = 50
+        self.effect      = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class DeviceSim:
+    def __init__(self, write, boot_s=0.0, caps=None, seed=None):
+        self._write      = write            # write(bytes) → host
+        self._write_lock = threading.Lock()
+        self.boot_s      = boot_s
+        self.caps        = dict(caps or CAPS)
+        self.brightness  = 25
+        self.enc_timeout = 2
+        self.effect_ms   = 10
+        self.strips      = [Strip() for _ in range(ENCODERS)]
+        self.stats       = {'rx_lines': 0, 'rx_dropped_bytes': 0, 'unknown': 0, 'tx_lines': 0, 'boots': 0}
+        self.log         = []               # every command line handled, in order
+        self._rx         = bytearray()
+        self._cv         = threading.Condition()
+        self._booted     = threading.Event()
+        self._running    = True
+        self._random     = random.Random(seed)
+        threading.Thread(target=self._process, name='sim-rx', daemon=True).start()
+
+    # ── Host link ─────────────────────────────────────────────────────────────
+    def boot(self):
+        """A new connection resets the pad (as opening the port does): boot, then READY and CAPS."""
+        self._booted.clear()
+        with self._cv:
+            self._rx.clear()
+        self.stats['boots'] += 1
+
+        def _done():
+            self._booted.set()
+            self.emit('READY')
+            self.emit(caps_line(self.caps))
+        if self.boot_s > 0:
+            threading.Timer(self.boot_s, _done).start()
+        else:
+            _done()
+
+    def wait_booted(self, timeout=None):
+        return self._booted.wait(timeout)
+
+    def feed(self, data):
+        """Bytes from the host. Bytes arriving while booting are lost, and overflow is dropped."""
+        if not self._booted.is_set():
+            self.stats['rx_dropped_bytes'] += len(data)
+            return
+        with self._cv:
+            room = self.caps['rx'] - len(self._rx)
+            if len(data) > room:
+                self.stats['rx_dropped_bytes'] += len(data) - max(room, 0)
+                data = data[:max(room, 0)]
+            self._rx += data
+            self._cv.notify()
+
+    def emit(self, line):
+        with self._write_lock:
+            try:
+                self._write((line + '\n').encode('utf-8'))
+                self.stats['tx_lines'] += 1
+            except OSError as e:
+                log.debug(f'Host write failed: {e}')
+
+    def stop(self):
+        self._running = False
+        with self._cv:
+            self._cv.notify()
+
+    def _process(self):
+        """Work through received lines no faster than the advertised rate."""
+        while self._running:
+            with self._cv:
+                while self._running and b'\n' not in self._rx:
+                    self._cv.wait(0.5)
+                if not self._running:
+                    return
+                raw, _, rest = bytes(self._rx).partition(b'\n')
+                self._rx[:] = rest
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                try:
+                    self.handle(line)
+                except ValueError:
+                    self.stats['unknown'] += 1      # the firmware's toInt() would read 0; flag it instead
+            rate = self.caps.get('rate') or 0
+            if rate > 0:
+                time.sleep(1.0 / rate)
+
+    # ── Command parser (same rules as handleLEDCommand) ───────────────────────
+    def handle(self, line):
+        log.debug(f'RX {line}')
+        self.stats['rx_lines'] += 1
+        self.log.append(line)
+        if line == 'PING':
+            self.emit('MACROPAD_OK')
+        elif line == 'CAPS?':
+            self.emit(caps_line(self.caps))
+        elif line.startswith('BRIGHT:'):
+            self.brightness = _clamp(line[7:] or 0, 0, 255)
+        elif line.startswith('ENC_TIMEOUT:'):
+            self.enc_timeout = int(line[12:] or 0)
+        elif line.startswith('EFFECT_SPEED:'):
+            ms = int(line[13:] or 0)
+            if 1 <= ms <= 200:
+                self.effect_ms = ms
+        elif line.startswith('EFFECT:'):
+            m = re.match(r'^EFFECT:(\d+):(\d+)$', line)
+            if m and 1 <= int(m.group(1)) <= ENCODERS:
+                self.strips[int(m.group(1)) - 1].effect = _clamp(m.group(2), 0, EFFECTS)
+        else:
+            self._strip_command(line)
+
+    def _strip_command(self, line):
+        for kind, pattern in _COMMANDS:
+            m = pattern.match(line)
+            if not m:
+                continue
+            n, *vals = (int(v) for v in m.groups())
+            if not 1 <= n <= ENCODERS:
+                return
+            s = self.strips[n - 1]
+            if kind == 'pct':
+                if 0 <= vals[0] <= 100:
+                    s.percentage = vals[0]
+                return
+            if kind in ('color', 'colorvolume') and any(not 0 <= v <= 255 for v in vals):
+                return
+            s.color = tuple(vals[:3])
+            if kind == 'rgbpointer':
+                s.mode, s.pointer_pos = 'pointer', _clamp(vals[3], 0, LEDS - 1)
+            elif kind == 'colorfade':
+                s.mode, s.fade_color, s.blend_start = 'fade', tuple(vals[3:6]), _clamp(vals[6], 0, 90)
+            elif kind == 'colorvolume':
+                s.mode, s.fade_color = 'volume', tuple(255 - v for v in vals)
+            else:
+                s.mode = 'solid'
+            return
+        self.stats['unknown'] += 1
+
+    def leds(self):
+        return {'brightness': self.brightness, 'enc_timeout': self.enc_timeout,
+                'effect_ms': self.effect_ms, 'strips': [s.as_dict() for s in self.strips]}
+
+    # ── Input traffic ─────────────────────────────────────────────────────────
+    def press(self, key, hold_ms=80):
+        self.emit(f'KP:{key}:DOWN')
+        time.sleep(hold_ms / 1000)
+        self.emit(f'KP:{key}:UP:{hold_ms}')
+
+    def turn(self, enc_id, clicks=1):
+        for _ in range(abs(clicks)):
+            self.emit(f'E:{enc_id}:{"+" if clicks > 0 else "-"}')
+
+    def run_script(self, lines):
+        """Play "<delay ms> <line>" entries."""
+        for entry in lines:
+            entry = entry.strip()
+            if not entry or entry.startswith('#'):
+                continue
+            delay, _, line = entry.partition(' ')
+            time.sleep(int(delay) / 1000)
+            self.emit(line.strip())
+
+    def run_random(self, keys_per_s=0.0, turns_per_s=0.0, duration=None):
+        """Random key presses and encoder turns as Poisson streams, until stop() or duration."""
+        end = time.monotonic() + duration if duration else None
+        threads = []
+        if keys_per_s > 0:
+            threads.append(threading.Thread(target=self._random_stream, args=(keys_per_s, self._random_key, end),
+                                            daemon=True))
+        if turns_per_s > 0:
+            threads.append(threading.Thread(target=self._random_stream, args=(turns_per_s, self._random_turn, end),
+                                            daemon=True))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def _random_key(self):
+        self.press(self._random.choice(KEYS), self._random.randint(30, 400))
+
+    def _random_turn(self):
+        self.turn(self._random.randrange(ENCODERS), self._random.choice((1, -1)))
+
+    def _random_stream(self, per_s, action, end):
+        while self._running and (end is None or time.monotonic() < end):
+            time.sleep(self._random.expovariate(per_s))
+            if self._booted.is_set():
+                action()
+
+
+# ── Transports ───────────────────────────────────────────────────────────────
+
+def serve_socket(make_sim, port, host='127.0.0.1'):
+    """Serve one host connection at a time on host:port (pyserial URL socket://host:port).
+
+    make_sim(write) → DeviceSim; each connection gets a fresh, freshly booted device.
+    Yields every DeviceSim as its connection opens.
+    """
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind((host, port))
+    srv.listen(1)
+    log.info(f'Simulated MacroPad on socket://{host}:{srv.getsockname()[1]}')
+    try:
+        while True:
+            conn, _ = srv.accept()
+            sim = make_sim(conn.sendall)
+            sim.boot()
+            yield sim
+            try:
+                while True:
+                    data = conn.recv(4096)
+                    if not data:
+                        break
+                    sim.feed(data)
+            except OSError:
+                pass
+            finally:
+                sim.stop()
+                conn.close()
+    finally:
+        srv.close()
+
+
+def open_pty(make_sim):
+    """Create a pseudo-terminal; the app opens the returned slave path like a COM port."""
+    import pty
+    import tty
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    sim = make_sim(lambda data: os.write(master, data))
+
+    def _read():
+        while True:
+            try:
+                data = os.read(master, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            sim.feed(data)
+    threading.Thread(target=_read, name='sim-pty', daemon=True).start()
+    sim.boot()
+    return sim, os.ttyname(slave)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    where = ap.add_mutually_exclusive_group(required=True)
+    where.add_argument('--socket', type=int, metavar='PORT', help='listen on 127.0.0.1:PORT')
+    where.add_argument('--pty', action='store_true', help='create a pseudo-terminal')
+    ap.add_argument('--boot-ms', type=int, default=500, help='simulated boot time before READY (default 500)')
+    ap.add_argument('--rate', type=int, default=CAPS['rate'], help='command lines per second (0 = unlimited)')
+    ap.add_argument('--rx', type=int, default=CAPS['rx'], help='receive buffer bytes')
+    ap.add_argument('--keys-per-s', type=float, default=0.0)
+    ap.add_argument('--turns-per-s', type=float, default=0.0)
+    ap.add_argument('--script', help='file of "<delay ms> <line>" entries to play after boot')
+    ap.add_argument('--seed', type=int)
+    ap.add_argument('-v', '--verbose', action='store_true', help='log every command received')
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(message)s')
+
+    def make_sim(write):
+        return DeviceSim(write, boot_s=args.boot_ms / 1000, seed=args.seed,
+                         caps={**CAPS, 'rate': args.rate, 'rx': args.rx})
+
+    def drive(sim):
+        sim.wait_booted()
+        if args.script:
+            with open(args.script, 'r', encoding='utf-8') as f:
+                sim.run_script(f.readlines())
+        sim.run_random(args.keys_per_s, args.turns_per_s)
+
+    try:
+        if args.pty:
+            sim, path = open_pty(make_sim)
+            print(f'Simulated MacroPad on {path}', flush=True)
+            drive(sim)
+            threading.Event().wait()
+        else:
+            for sim in serve_socket(make_sim, args.socket):
+                threading.Thread(target=drive, args=(sim,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
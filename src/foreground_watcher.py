@@ -1,6 +1,29 @@
+"""
+Foreground-window tracking for automatic profile switching.
+
+ForegroundWatcher asks a source for the current (process name, window
+title) and calls on_change(app_name, title) when either changes. Sources:
+
+    WinEventSource   Windows — SetWinEventHook wakes the watcher the moment
+                     the foreground window or its title changes
+    X11Source        Linux/X11 — `xprop -spy` on the root window streams the
+                     active window id; its pid and title are read once per
+                     change, the process name comes from /proc
+    FakeSource       scripted, for tests and demos
+
+While a source's events are live the watcher only re-checks every IDLE_S
+as a safety net (a missed hook, a title change X11 does not report).
+Without them it polls adaptively: every FAST_S right after a change or
+recent user input, backing off to IDLE_S when nothing happens.
+"""
 import ctypes
-import time
+import os
+import re
+import shutil
+import subprocess
+import sys
 import threading
+import time
 import logging
 
 try:
@@ -11,49 +34,325 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+FAST_S       = 0.1     # polling without events: re-check interval right after a change or user input
+IDLE_S       = 2.0     # polling backs off to this; also the safety-net interval while events are live
+RECENT_INPUT = 1.0     # seconds since the last keyboard/mouse input that count as "active"
 
-class ForegroundWatcher:
-    """Polls the foreground window every 500 ms and calls on_change(app_name) when it changes."""
 
-    _POLL_S = 0.5
+# ── Sources ──────────────────────────────────────────────────────────────────
 
-    def __init__(self, on_change):
-        self._on_change = on_change
-        self._current   = None
-        self._running   = False
+class ForegroundSource:
+    """Base class. wait() blocks until the foreground may have changed or timeout passes."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+
+    def open(self):
+        """Start whatever the source listens to. Returns False if it cannot work here."""
+        return True
+
+    def close(self):
+        self.interrupt()
+
+    @property
+    def live(self):
+        """True while change notifications are arriving, so the watcher need not poll fast."""
+        return False
+
+    def current(self):
+        """(process name, window title) of the foreground window, or None."""
+        raise NotImplementedError
+
+    def input_age(self):
+        """Seconds since the last user input, or None if the source cannot tell."""
+        return None
+
+    def wait(self, timeout):
+        """True if woken by a change notification, False on timeout."""
+        woken = self._wake.wait(timeout)
+        self._wake.clear()
+        return woken
+
+    def interrupt(self):
+        self._wake.set()
+
+
+class WinEventSource(ForegroundSource):
+    _EVENT_SYSTEM_FOREGROUND = 0x0003
+    _EVENT_OBJECT_NAMECHANGE = 0x800C
+    _WINEVENT_OUTOFCONTEXT   = 0x0000
+    _WINEVENT_SKIPOWNPROCESS = 0x0002
+    _OBJID_WINDOW            = 0
+    _WM_QUIT                 = 0x0012
+
+    def __init__(self):
+        super().__init__()
         self._thread    = None
+        self._thread_id = None
+        self._proc      = None    # keeps the ctypes callback alive while hooked
 
-    def start(self):
-        if not _PSUTIL:
-            log.warning('psutil unavailable — auto profile switching disabled')
-            return
-        self._running = True
-        self._thread  = threading.Thread(target=self._run, daemon=True)
+    @property
+    def live(self):
+        return self._thread_id is not None     # set only while both hooks are installed
+
+    def open(self):
+        if sys.platform != 'win32' or not _PSUTIL:
+            return False
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._hook_loop, args=(ready,), name='win-event-hook', daemon=True)
         self._thread.start()
+        ready.wait(2.0)
+        return True             # without the hook the watcher still polls
 
-    def stop(self):
-        self._running = False
+    def close(self):
+        if self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self._WM_QUIT, 0, 0)
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        super().close()
 
-    def _foreground_app(self):
+    def _hook_loop(self, ready):
+        """Hooks must be installed, and their messages pumped, on the same thread."""
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        proto  = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                    wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, ms):
+            if event == self._EVENT_SYSTEM_FOREGROUND or (
+                    id_object == self._OBJID_WINDOW and hwnd == user32.GetForegroundWindow()):
+                self._wake.set()
+
+        self._proc = proto(on_event)
+        flags = self._WINEVENT_OUTOFCONTEXT | self._WINEVENT_SKIPOWNPROCESS
+        hooks = [user32.SetWinEventHook(ev, ev, 0, self._proc, 0, 0, flags)
+                 for ev in (self._EVENT_SYSTEM_FOREGROUND, self._EVENT_OBJECT_NAMECHANGE)]
+        if not all(hooks):
+            log.warning('SetWinEventHook failed — falling back to polling')
+            for hook in filter(None, hooks):
+                user32.UnhookWinEvent(hook)
+            ready.set()
+            return
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+        self._thread_id = None
+
+    def current(self):
         try:
-            hwnd = ctypes.windll.user32.GetForegroundWindow()
+            user32 = ctypes.windll.user32
+            hwnd   = user32.GetForegroundWindow()
             if not hwnd:
                 return None
             pid = ctypes.c_ulong()
-            ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
             if not pid.value:
                 return None
-            return psutil.Process(pid.value).name()
+            length = user32.GetWindowTextLengthW(hwnd)
+            buf    = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buf, length + 1)
+            return psutil.Process(pid.value).name(), buf.value
         except Exception:
             return None
 
+    def input_age(self):
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+        info = LASTINPUTINFO(ctypes.sizeof(LASTINPUTINFO), 0)
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000
+
+
+class X11Source(ForegroundSource):
+    _WINDOW_ID = re.compile(r'window id # (0x[0-9a-fA-F]+)')
+    _PID       = re.compile(r'_NET_WM_PID\(CARDINAL\) = (\d+)')
+    _TITLE     = re.compile(r'_NET_WM_NAME\(\w+\) = "(.*)"')
+
+    def __init__(self):
+        super().__init__()
+        self._spy    = None
+        self._reader = None
+        self._window = None      # active window id from the spy, None when nothing is focused
+
+    @property
+    def live(self):
+        return self._spy is not None and self._spy.poll() is None
+
+    def open(self):
+        if not sys.platform.startswith('linux') or not os.environ.get('DISPLAY') or not shutil.which('xprop'):
+            return False
+        try:
+            self._spy = subprocess.Popen(['xprop', '-root', '-spy', '_NET_ACTIVE_WINDOW'],
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError as e:
+            log.warning(f'xprop -spy failed ({e}) — falling back to polling')
+            return True
+        self._reader = threading.Thread(target=self._read_spy, name='xprop-spy', daemon=True)
+        self._reader.start()
+        return True
+
+    def close(self):
+        if self._spy:
+            self._spy.terminate()
+            try:
+                self._spy.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self._spy.kill()
+        if self._reader:
+            self._reader.join(timeout=2.0)
+        super().close()
+
+    def _read_spy(self):
+        for line in self._spy.stdout:    # one line per active-window change, the first one right away
+            self._window = self._parse_window(line)
+            self._wake.set()
+
+    def _parse_window(self, text):
+        m = self._WINDOW_ID.search(text)
+        return m.group(1) if m and int(m.group(1), 16) else None
+
+    def current(self):
+        try:
+            if self.live:
+                window = self._window
+            else:
+                window = self._parse_window(subprocess.run(['xprop', '-root', '_NET_ACTIVE_WINDOW'],
+                                                           capture_output=True, text=True, timeout=1).stdout)
+            if window is None:
+                return None
+            props = subprocess.run(['xprop', '-id', window, '_NET_WM_PID', '_NET_WM_NAME'],
+                                   capture_output=True, text=True, timeout=1).stdout
+            pid   = self._PID.search(props)
+            title = self._TITLE.search(props)
+            if not pid:
+                return None
+            return _proc_name(int(pid.group(1))), title.group(1) if title else ''
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+
+def _proc_name(pid):
+    """Executable name of a process from /proc (comm is truncated to 15 chars, exe is not)."""
+    try:
+        return os.path.basename(os.readlink(f'/proc/{pid}/exe'))
+    except OSError:
+        with open(f'/proc/{pid}/comm') as f:
+            return f.read().strip()
+
+
+class FakeSource(ForegroundSource):
+    """Scripted source: emit(app, title) switches the 'foreground', play() replays a timed script.
+
+    live=True makes it behave like a working event source (the watcher only safety-polls).
+    """
+
+    def __init__(self, script=(), live=False):
+        super().__init__()
+        self._live      = live
+        self._current   = None
+        self._input_age = None
+        self._script    = list(script)   # [(delay_s, app, title)]
+        self._player    = None
+
+    def open(self):
+        if self._script:
+            self._player = threading.Thread(target=self._play, daemon=True)
+            self._player.start()
+        return True
+
+    def close(self):
+        self._script = []
+        super().close()
+
+    def emit(self, app, title='', input_age=None):
+        self._current   = (app, title)
+        self._input_age = input_age
+        self._wake.set()
+
+    def _play(self):
+        for delay, app, title in list(self._script):
+            time.sleep(delay)
+            if not self._script:
+                return
+            self.emit(app, title)
+
+    @property
+    def live(self):
+        return self._live
+
+    def current(self):
+        return self._current
+
+    def input_age(self):
+        return self._input_age
+
+
+def default_source():
+    """The best source for this platform, or None if foreground tracking is unavailable."""
+    if sys.platform == 'win32':
+        return WinEventSource()
+    if sys.platform.startswith('linux'):
+        return X11Source()
+    return None
+
+
+# ── Watcher ──────────────────────────────────────────────────────────────────
+
+class ForegroundWatcher:
+    """Calls on_change(app_name, title) whenever the foreground window or its title changes."""
+
+    def __init__(self, on_change, source=None):
+        self._on_change = on_change
+        self._source    = source
+        self._current   = None
+        self._running   = False
+        self._thread    = None
+        self.interval   = IDLE_S
+
+    def start(self):
+        source = self._source or default_source()
+        if source is None or not source.open():
+            log.warning('No foreground-window source available — auto profile switching disabled')
+            return
+        self._source  = source
+        self._running = True
+        self._thread  = threading.Thread(target=self._run, name='foreground-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._source:
+            self._source.close()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=IDLE_S + 1)
+        self._thread = None
+
     def _run(self):
         while self._running:
-            app = self._foreground_app()
-            if app and app != self._current:
-                self._current = app
-                try:
-                    self._on_change(app)
-                except Exception as e:
-                    log.debug(f'ForegroundWatcher callback error: {e}')
-            time.sleep(self._POLL_S)
+            changed = self._check()
+            if self._source.live:
+                self.interval = IDLE_S          # events wake us; this is only the safety net
+            else:
+                age = self._source.input_age()
+                if changed or (age is not None and age < RECENT_INPUT):
+                    self.interval = FAST_S
+                else:
+                    self.interval = min(self.interval * 2, IDLE_S)
+            self._source.wait(self.interval)
+
+    def _check(self):
+        current = self._source.current()
+        if not current or not current[0] or current == self._current:
+            return False
+        self._current = current
+        try:
+            self._on_change(*current)
+        except Exception as e:
+            log.debug(f'ForegroundWatcher callback error: {e}')
+        return True
@@ -0,0 +1,383 @@
+"""
+Local control channel between MacroPad, its GUI, scripts and stream tools.
+
+Newline-delimited JSON over a loopback TCP socket. The app (windowed or
+daemon) picks a free port and writes Data/ipc.json ({port, token, pid}); a
+client reads it and must send {"auth": token} as its first line, so only
+someone who can read the data directory can drive the pad.
+
+    → {"id": 1, "method": "switch_profile", "params": ["Gaming"]}
+    ← {"id": 1, "result": {"ok": true, "version": 12}}
+    ← {"id": 2, "error": "Unknown method 'foo'"}
+    → {"id": 3, "method": "subscribe", "params": [["device"]]}
+    ← {"topic": "device", "events": [["key", {"key": "3", "event": "DOWN"}]]}
+    ← {"topic": "ui", "events": [["state_patch", {...}], ["key_press", {...}]]}
+    → {"id": 4, "method": "send_commands", "params": [["BRIGHT:128", "1:50"]]}
+
+Methods are the MacroPadAPI methods named in REMOTE_METHODS plus whatever
+extra callables the host registers (the daemon adds open_gui and quit).
+Anything that runs programs, records the keyboard or installs software stays
+local to the process that owns the window. Topics: "ui" is the
+frame-batched UI event stream, "device" the parsed key and encoder events
+as they arrive from the pad.
+
+Every client has its own writer thread and a bounded outbox. Publishing
+only appends to the outboxes, so a slow subscriber never holds up the
+serial thread: when its outbox is full the oldest events are dropped, and a
+client that stops reading its replies is disconnected.
+"""
+import json
+import os
+from collections import deque
+import secrets
+import socket
+import threading
+import logging
+import persistence
+from utils import get_data_path
+
+log = logging.getLogger(__name__)
+
+ENDPOINT_FILE = 'ipc.json'
+MAX_LINE      = 16 * 1024 * 1024
+AUTH_TIMEOUT  = 5.0                  # seconds a new connection gets to send its token
+CLIENT_QUEUE  = 1024                 # messages waiting per client before events are dropped
+TOPICS        = ('ui', 'device')
+
+# MacroPadAPI methods served to clients — what the attached GUI and the CLI need.
+# Not served: window chrome, startup/shutdown, upload_firmware (runs a compiler),
+# start/stop_recording (global keyboard hook) and install_update (runs an installer).
+REMOTE_METHODS = frozenset({
+    'get_state', 'get_device_info', 'get_ports', 'connect', 'disconnect', 'send_command', 'send_commands',
+    'get_macros', 'set_macro', 'delete_macro', 'undo',
+    'get_profiles', 'switch_profile', 'new_profile', 'set_profile_parent', 'delete_profile',
+    'duplicate_profile', 'rename_profile', 'export_profile', 'import_profile', 'export_bundle', 'import_bundle',
+    'get_encoders', 'set_encoder', 'get_layers', 'set_layers', 'get_trigger_apps', 'set_trigger_apps',
+    'get_startup', 'set_startup', 'get_shift_key', 'set_shift_key', 'get_settings', 'save_settings',
+    'set_brightness', 'set_enc_led_timeout', 'set_effect_speed', 'set_paste_threshold', 'set_switch_dwell',
+    'set_key_windows', 'get_audio_apps', 'check_for_update',
+    'get_push_stats', 'get_ipc_stats', 'get_switch_stats', 'get_persistence_stats',
+})
+
+
+class IpcError(Exception):
+    pass
+
+
+def read_endpoint(path=None):
+    """The running server's {port, token, pid}, or None."""
+    try:
+        with open(path or get_data_path(ENDPOINT_FILE), 'r') as f:
+            ep = json.load(f)
+        return ep if isinstance(ep, dict) and ep.get('port') and ep.get('token') else None
+    except (OSError, ValueError):
+        return None
+
+
+def _encode(obj):
+    return (json.dumps(obj, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _send(conn, lock, obj):
+    line = _encode(obj)
+    with lock:
+        conn.sendall(line)
+
+
+def _lines(conn):
+    """Yield decoded JSON objects from a socket until it closes."""
+    f = conn.makefile('rb')
+    while True:
+        raw = f.readline(MAX_LINE + 1)     # bounded: a line without a newline can't grow past the limit
+        if not raw:
+            return
+        if len(raw) > MAX_LINE:
+            raise IpcError('message too large')
+        try:
+            yield json.loads(raw)
+        except ValueError:
+            raise IpcError('malformed message')
+
+
+# ── Server ───────────────────────────────────────────────────────────────────
+
+class _Client:
+    """One connection: a bounded outbox drained by its own writer thread."""
+
+    def __init__(self, conn, name):
+        self.conn    = conn
+        self.name    = name
+        self.topics  = set()
+        self.dropped = 0
+        self._cv     = threading.Condition()
+        self._outbox = deque()             # (is_event, line)
+        self._open   = True
+        threading.Thread(target=self._write, name='ipc-writer', daemon=True).start()
+
+    def offer(self, line, event=True):
+        """Queue a line without blocking. False if the client had to be dropped."""
+        with self._cv:
+            if not self._open:
+                return False
+            if len(self._outbox) >= CLIENT_QUEUE:
+                oldest = next((m for m in self._outbox if m[0]), None)
+                if oldest is None:
+                    self._open = False          # a full outbox of replies — it is not reading at all
+                    self._cv.notify()
+                    return False
+                self._outbox.remove(oldest)
+                self.dropped += 1
+            self._outbox.append((event, line))
+            self._cv.notify()
+            return True
+
+    def queued(self):
+        with self._cv:
+            return len(self._outbox)
+
+    def close(self):
+        with self._cv:
+            self._open = False
+            self._cv.notify()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+    def _write(self):
+        while True:
+            with self._cv:
+                while self._open and not self._outbox:
+                    self._cv.wait()
+                if not self._open:
+                    break
+                _, line = self._outbox.popleft()
+            try:
+                self.conn.sendall(line)
+            except OSError:
+                break
+        self.close()
+
+
+class IpcServer:
+    def __init__(self, api, extra=None):
+        self._api     = api
+        self._extra   = dict(extra or {})
+        self._token   = secrets.token_hex(16)
+        self._sock    = None
+        self._clients = set()
+        self._lock    = threading.Lock()
+        self._thread  = None
+
+    def methods(self):
+        names = {n for n in REMOTE_METHODS if callable(getattr(self._api, n, None))}
+        return sorted(names | set(self._extra))
+
+    def register(self, name, fn):
+        """Serve fn as an extra method (clients that connect later see it in their method list)."""
+        self._extra[name] = fn
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(8)
+        port = self._sock.getsockname()[1]
+        persistence.atomic_write_json(get_data_path(ENDPOINT_FILE),
+                                      {'port': port, 'token': self._token, 'pid': os.getpid()})
+        self._thread = threading.Thread(target=self._accept, name='ipc-accept', daemon=True)
+        self._thread.start()
+        log.info(f'IPC server listening on 127.0.0.1:{port}')
+        return port
+
+    def stop(self):
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        ep = read_endpoint()
+        if ep and ep.get('pid') == os.getpid():
+            try:
+                os.remove(get_data_path(ENDPOINT_FILE))
+            except OSError:
+                pass
+        with self._lock:
+            clients, self._clients = list(self._clients), set()
+        for client in clients:
+            client.close()
+
+    def publish(self, topic, events):
+        """Queue [event, payload] pairs for every client subscribed to topic. Never blocks."""
+        with self._lock:
+            targets = [c for c in self._clients if topic in c.topics]
+        if not targets:
+            return
+        line = _encode({'topic': topic, 'events': events})
+        for client in targets:
+            if not client.offer(line):
+                log.debug(f'IPC client {client.name} dropped: not reading')
+                self._drop(client)
+
+    def broadcast(self, batch):
+        """UI event sink: forward a frame's batch to "ui" subscribers."""
+        self.publish('ui', batch)
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients)
+        return {'clients': [{'name': c.name, 'topics': sorted(c.topics), 'queued': c.queued(),
+                             'dropped': c.dropped} for c in clients]}
+
+    def _accept(self):
+        while self._sock:
+            try:
+                conn, addr = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn, f'{addr[0]}:{addr[1]}'),
+                             name='ipc-client', daemon=True).start()
+
+    def _serve(self, conn, name):
+        client = None
+        try:
+            conn.settimeout(AUTH_TIMEOUT)
+            messages = _lines(conn)
+            hello    = next(messages, None)
+            if not isinstance(hello, dict) or not secrets.compare_digest(str(hello.get('auth', '')), self._token):
+                conn.sendall(_encode({'error': 'unauthorized'}))
+                return
+            conn.settimeout(None)
+            client = _Client(conn, name)
+            client.offer(_encode({'ok': True, 'methods': self.methods()}), event=False)
+            with self._lock:
+                self._clients.add(client)
+            for msg in messages:
+                if isinstance(msg, dict):
+                    self._handle(client, msg)
+        except (OSError, IpcError) as e:
+            log.debug(f'IPC client {name} dropped: {e}')
+        finally:
+            if client:
+                self._drop(client)
+            else:
+                conn.close()
+
+    def _handle(self, client, msg):
+        method, params, rid = msg.get('method'), msg.get('params') or [], msg.get('id')
+        if method == 'subscribe':
+            topics = (params[0] if params else None) or ['ui']
+            if isinstance(topics, str):
+                topics = [topics]
+            unknown = [t for t in topics if t not in TOPICS]
+            if unknown:
+                reply = {'error': f'Unknown topic {unknown[0]!r}'}
+            else:
+                client.topics.update(topics)
+                reply = {'result': sorted(client.topics)}
+        else:
+            try:
+                reply = {'result': self._call(method, params)}
+            except Exception as e:
+                reply = {'error': str(e) or type(e).__name__}
+        if not client.offer(_encode({'id': rid, **reply}), event=False):
+            raise IpcError('client is not reading its replies')
+
+    def _call(self, method, params):
+        if not isinstance(method, str) or (method not in REMOTE_METHODS and method not in self._extra):
+            raise IpcError(f'Unknown method {method!r}')
+        fn = self._extra.get(method) or getattr(self._api, method, None)
+        if not callable(fn):
+            raise IpcError(f'Unknown method {method!r}')
+        return fn(*params) if isinstance(params, list) else fn(**params)
+
+    def _drop(self, client):
+        with self._lock:
+            self._clients.discard(client)
+        client.close()
+
+
+# ── Client ───────────────────────────────────────────────────────────────────
+
+class IpcClient:
+    """Blocking request/response client; on_events(batch, topic) runs on the reader thread."""
+
+    def __init__(self, endpoint=None, on_events=None, timeout=5.0):
+        ep = endpoint or read_endpoint()
+        if not ep:
+            raise IpcError('MacroPad is not running')
+        self._conn    = socket.create_connection(('127.0.0.1', ep['port']), timeout=timeout)
+        self._conn.settimeout(None)
+        self._lock    = threading.Lock()
+        self._waiting = {}           # id → [Event, reply]
+        self._next_id = 0
+        self._events  = on_events
+        self._closed  = threading.Event()
+        _send(self._conn, self._lock, {'auth': ep['token']})
+        self._messages = _lines(self._conn)
+        hello = next(self._messages, None)
+        if not isinstance(hello, dict) or not hello.get('ok'):
+            self._conn.close()
+            raise IpcError((hello or {}).get('error', 'handshake failed'))
+        self.methods = hello.get('methods', [])
+        self._reader = threading.Thread(target=self._read, name='ipc-reader', daemon=True)
+        self._reader.start()
+
+    def call(self, method, *params, timeout=60.0):
+        with self._lock:
+            self._next_id += 1
+            rid = self._next_id
+        slot = [threading.Event(), None]
+        self._waiting[rid] = slot
+        try:
+            _send(self._conn, self._lock, {'id': rid, 'method': method, 'params': list(params)})
+            if not slot[0].wait(timeout):
+                raise IpcError(f'{method} timed out')
+        except OSError as e:
+            raise IpcError(f'connection lost: {e}')
+        finally:
+            self._waiting.pop(rid, None)
+        reply = slot[1]
+        if reply is None:
+            raise IpcError('connection lost')
+        if 'error' in reply:
+            raise IpcError(reply['error'])
+        return reply.get('result')
+
+    def subscribe(self, topics=None):
+        """Start receiving events; topics is a subset of TOPICS (default: just "ui")."""
+        return self.call('subscribe', list(topics) if topics else None)
+
+    def close(self):
+        self._closed.set()
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+    def _read(self):
+        try:
+            for msg in self._messages:
+                if not isinstance(msg, dict):
+                    continue
+                if 'events' in msg:
+                    if self._events:
+                        try:
+                            self._events(msg['events'], msg.get('topic', 'ui'))
+                        except Exception as e:
+                            log.debug(f'IPC event handler failed: {e}')
+                    continue
+                slot = self._waiting.get(msg.get('id'))
+                if slot:
+                    slot[1] = msg
+                    slot[0].set()
+        except (OSError, IpcError):
+            pass
+        finally:
+            self._closed.set()
+            for slot in list(self._waiting.values()):
+                slot[0].set()
@@ -0,0 +1,333 @@
+"""
+Key press dispatch for the 8 keys and 4 encoder buttons.
+
+Resolution works off a compiled keymap.Keymap, rebuilt whenever a profile is
+activated or edited, so each event is one dict lookup into the active
+layer's table. A key whose binding has no hold, double-tap, chord, layer or
+shift role fires on KP:<key>:DOWN and carries no press-duration latency.
+The other keys go through a small timer-driven state machine:
+
+    chord window  → a second chord key pressed within chord_window_ms fires the chord
+    hold          → the hold macro fires the moment the threshold passes
+    release       → press macro, or wait double_window_ms for a double tap
+    shift key     → resolved on release, once we know whether it shifted an encoder
+
+Press macros with a repeat config keep firing while held, stopping on UP.
+All timers share one scheduler thread. Every action, whether it fires on
+DOWN or is resolved by a timer, runs on a single worker thread in the order
+it was resolved, so a slow macro never delays the timers and the serial
+thread (encoder path) never waits on either.
+"""
+import queue
+import threading
+import time
+import logging
+import scheduler
+from keymap import Keymap, compile_keymap
+
+log = logging.getLogger(__name__)
+
+CHORD_WINDOW_MS  = 50
+DOUBLE_WINDOW_MS = 250
+
+# Press states
+_CHORD = 0   # inside the chord window
+_HELD  = 1   # waiting for the hold threshold or release
+_DONE  = 2   # consumed — release is ignored
+
+
+class _Press:
+    __slots__ = ('binding', 't_down', 'timer', 'state')
+
+    def __init__(self, binding, t_down, state):
+        self.binding = binding
+        self.t_down  = t_down
+        self.timer   = None
+        self.state   = state
+
+
+class _Repeat:
+    __slots__ = ('command', 't_down', 'interval', 'accel', 'min_s', 'handle', 'busy')
+
+    def __init__(self, command, t_down, cfg):
+        _, self.interval, self.accel, self.min_s = cfg   # delay is used for the first tick only
+        self.command = command
+        self.t_down  = t_down
+        self.handle  = None
+        self.busy    = False
+
+
+class KeyDispatcher:
+    def __init__(self, fire, on_layer=None):
+        """
+        fire(key, macro_key, ms, repeat) is called once per resolved action, on the action worker;
+        repeat is True for auto-repeat ticks, which may be coalesced while one is still queued.
+        on_layer(index, name) is called on the action worker when the active layer changes.
+        """
+        self._fire      = fire
+        self._on_layer  = on_layer
+        self._lock      = threading.Lock()
+        self._sched     = scheduler.shared()
+        self._work      = queue.SimpleQueue()
+        self._worker    = None
+        self._keymap    = compile_keymap({})
+        self._pending   = {}      # key → _Press for deferred keys currently held
+        self._awaiting  = {}      # key → _Press released once, waiting for a double tap
+        self._repeating = {}      # key → _Repeat while an auto-repeat key is held
+        self._down      = set()   # immediate keys currently held
+        self._momentary = []      # stack of held momentary layers
+        self._toggled   = 0       # toggled layer, 0 = none
+        self.layer        = 0
+        self.shift_active = False
+        self.shift_turned = False
+        self.chord_window_ms  = CHORD_WINDOW_MS
+        self.double_window_ms = DOUBLE_WINDOW_MS
+
+    # ── compile ───────────────────────────────────────────────────────────────
+
+    def compile(self, macros, shift_key='', layers=None):
+        """Build the lookup tables for a profile's macro set. Called on activation and edits."""
+        self.load(compile_keymap(macros, layers, shift_key))
+
+    def load(self, keymap: Keymap):
+        with self._lock:
+            self._keymap = keymap
+            if self.layer >= len(keymap.tables):
+                self._momentary.clear()
+                self._toggled = 0
+                self._set_layer_locked()
+
+    def is_deferred(self, key):
+        b = self._keymap.tables[self.layer].get(key)
+        return b is not None and b.deferred
+
+    # ── events ────────────────────────────────────────────────────────────────
+
+    def on_down(self, key):
+        now   = time.monotonic()
+        fires = []
+        with self._lock:
+            b = self._keymap.tables[self.layer].get(key)
+            if b is None:
+                fires.append((key, f'KP:{key}', 0))          # key the keymap has never seen
+            elif b.layer:
+                self._layer_down(b)
+            elif key == self._keymap.shift_key:
+                self.shift_active = True
+                self.shift_turned = False
+                self._pending[key] = _Press(b, now, _HELD)
+            elif key in self._awaiting:
+                first = self._awaiting.pop(key)
+                first.timer.cancel()
+                self._pending[key] = _Press(first.binding, now, _DONE)
+                fires.append((key, first.binding.double, 0))
+            elif not b.deferred:
+                self._down.add(key)
+                fires.append((key, b.tap, 0))
+                if b.repeat:
+                    self._start_repeat(key, b, now)
+            else:
+                press = _Press(b, now, _CHORD)
+                self._pending[key] = press
+                if not self._try_chord(key, press, fires):
+                    if b.chords:
+                        self._start_timer(press, self.chord_window_ms, self._chord_elapsed, key)
+                    else:
+                        self._after_chord(key, press, fires)
+            self._queue_locked(fires)
+
+    def on_up(self, key, fw_ms=None):
+        """Resolve a release. fw_ms is the firmware-measured hold time, if it sent one."""
+        now   = time.monotonic()
+        fires = []
+        with self._lock:
+            b = self._keymap.tables[self.layer].get(key)
+            if b is not None and b.layer:
+                self._layer_up(b)
+                return
+            rep = self._repeating.pop(key, None)
+            if rep is not None:
+                rep.handle.cancel()
+            press = self._pending.pop(key, None)
+            if press is not None and press.timer is not None:
+                press.timer.cancel()
+            ms = fw_ms if fw_ms is not None else (
+                round((now - press.t_down) * 1000) if press else 0)
+
+            if key == self._keymap.shift_key:
+                self.shift_active = False
+                if self.shift_turned:
+                    self.shift_turned = False
+                    return  # key was used as shift — suppress its macro
+                sb = press.binding if press else b
+                if sb is not None:
+                    fires.append((key, sb.hold if sb.hold and ms >= sb.hold_ms else sb.tap, ms))
+            elif press is None:
+                if key in self._down:
+                    self._down.discard(key)
+                    return  # already fired on DOWN
+                if b is not None:                          # DOWN was missed — fire late rather than never
+                    fires.append((key, b.hold if b.hold and ms >= b.hold_ms else b.tap, ms))
+            elif press.state != _DONE:
+                press.state = _DONE
+                if press.binding.double:
+                    self._awaiting[key] = press
+                    self._start_timer(press, self.double_window_ms, self._double_elapsed, key)
+                else:
+                    fires.append((key, press.binding.tap, ms))
+            self._queue_locked(fires)
+
+    def mark_shift_used(self):
+        self.shift_turned = True
+
+    # ── state machine helpers (called with the lock held) ─────────────────────
+
+    def _try_chord(self, key, press, fires):
+        for partner, command in press.binding.chords.items():
+            other = self._pending.get(partner)
+            if other is not None and other.state == _CHORD:
+                if other.timer is not None:
+                    other.timer.cancel()
+                other.state = press.state = _DONE
+                fires.append((key, command, 0))
+                return True
+        return False
+
+    def _after_chord(self, key, press, fires):
+        b = press.binding
+        if b.hold:
+            press.state = _HELD
+            elapsed = (time.monotonic() - press.t_down) * 1000
+            self._start_timer(press, max(0, b.hold_ms - elapsed), self._hold_elapsed, key)
+        elif b.double:
+            press.state = _HELD            # resolved on release
+        else:
+            press.state = _DONE            # chord member whose window closed — fire now
+            fires.append((key, b.tap, 0))
+            if b.repeat:
+                self._start_repeat(key, b, press.t_down)
+
+    def _start_timer(self, press, ms, callback, key):
+        press.timer = self._sched.call_later(ms / 1000, callback, key, press)
+
+    def _start_repeat(self, key, b, t_down):
+        rep = _Repeat(b.tap, t_down, b.repeat)
+        rep.handle = self._sched.call_later(b.repeat[0], self._repeat_tick, key, rep)
+        self._repeating[key] = rep
+
+    def _layer_down(self, b):
+        if b.layer_mode == 'toggle':
+            self._toggled = 0 if self._toggled == b.layer else b.layer
+        elif b.layer not in self._momentary:
+            self._momentary.append(b.layer)
+        self._set_layer_locked()
+
+    def _layer_up(self, b):
+        if b.layer_mode == 'momentary' and b.layer in self._momentary:
+            self._momentary.remove(b.layer)
+            self._set_layer_locked()
+
+    def _set_layer_locked(self):
+        layer = self._momentary[-1] if self._momentary else self._toggled
+        if layer != self.layer:
+            self.layer = layer
+            if self._on_layer:
+                name = self._keymap.layer_names[layer] if layer < len(self._keymap.layer_names) else ''
+                self._work.put((self._notify_layer, (layer, name)))     # in order with the key actions
+                self._start_worker_locked()
+
+    # ── timer callbacks (scheduler thread) ────────────────────────────────────
+
+    def _chord_elapsed(self, key, press):
+        fires = []
+        with self._lock:
+            if self._pending.get(key) is not press or press.state != _CHORD:
+                return
+            self._after_chord(key, press, fires)
+            self._queue_locked(fires)
+
+    def _hold_elapsed(self, key, press):
+        with self._lock:
+            if self._pending.get(key) is not press or press.state != _HELD:
+                return
+            press.state = _DONE
+            ms = round((time.monotonic() - press.t_down) * 1000)
+            self._queue_locked([(key, press.binding.hold, ms)])
+
+    def _double_elapsed(self, key, press):
+        with self._lock:
+            if self._awaiting.get(key) is not press:
+                return
+            del self._awaiting[key]
+            self._queue_locked([(key, press.binding.tap, 0)])
+
+    def _repeat_tick(self, key, rep):
+        with self._lock:
+            if self._repeating.get(key) is not rep:
+                return                      # released — UP already cancelled us
+            rep.interval = max(rep.min_s, rep.interval * (1 - rep.accel))
+            rep.handle   = self._sched.call_later(rep.interval, self._repeat_tick, key, rep)
+            if rep.busy:
+                return                      # previous repeat still executing — coalesce
+            rep.busy = True
+            ms = round((time.monotonic() - rep.t_down) * 1000)
+            self._work.put((self._run_action, (key, rep.command, ms, rep)))
+            self._start_worker_locked()
+
+    # ── action worker ─────────────────────────────────────────────────────────
+
+    def _queue_locked(self, fires):
+        """Queue resolved actions under the lock, so the worker runs them in the order they were resolved."""
+        for key, command, ms in fires:
+            self._work.put((self._run_action, (key, command, ms, None)))
+        if fires:
+            self._start_worker_locked()
+
+    def _start_worker_locked(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work_loop, name='key-actions', daemon=True)
+            self._worker.start()
+
+    def _work_loop(self):
+        while True:
+            fn, args = self._work.get()
+            fn(*args)
+
+    def _run_action(self, key, command, ms, rep):
+        if rep is not None:
+            with self._lock:
+                released = self._repeating.get(key) is not rep
+            if released:                    # tick queued just before UP — don't fire after release
+                rep.busy = False
+                return
+        try:
+            self._fire(key, command, ms, rep is not None)
+        except Exception as e:
+            log.warning(f'Key action {command!r} failed: {e}')
+        finally:
+            if rep is not None:
+                rep.busy = False
+
+    def _notify_layer(self, layer, name):
+        try:
+            self._on_layer(layer, name)
+        except Exception as e:
+            log.warning(f'Layer change handler failed: {e}')
+
+    def reset(self):
+        """Drop all in-flight presses and layers (disconnect)."""
+        with self._lock:
+            for press in list(self._pending.values()) + list(self._awaiting.values()):
+                if press.timer is not None:
+                    press.timer.cancel()
+            for rep in self._repeating.values():
+                rep.handle.cancel()
+            self._pending.clear()
+            self._awaiting.clear()
+            self._repeating.clear()
+            self._down.clear()
+            self._momentary.clear()
+            self._toggled = 0
+            self._set_layer_locked()
+            self.shift_active = False
+            self.shift_turned = False
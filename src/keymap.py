@@ -0,0 +1,182 @@
+"""
+Keymap compiler — turns a profile's flat macro dict into per-layer lookup tables.
+
+Macro commands understood here (all stored in the profile's 'macros' dict):
+    KP:<key>            press
+    KP:<key>:HOLD       hold (entry carries hold_ms)
+    KP:<key>:DOUBLE     double tap
+    CH:<a>+<b>          two-key chord
+    L<n>:<any of above> same binding, only active on layer n (1-based)
+
+A press entry may carry 'repeat': {'delay_ms', 'rate_ms', 'accel'} to keep
+firing while the key is held. Such a key fires on DOWN and repeats until UP,
+so hold and double-tap bindings on the same key are ignored.
+
+Layers themselves are declared per profile:
+    'layers': [{'name': 'Fn', 'key': '8', 'mode': 'momentary'},
+               {'name': 'Media', 'key': '7', 'mode': 'toggle'}]
+
+compile_keymap() merges every layer over the base layer up front, so
+resolving a key at event time is a single dict lookup that returns a
+prebuilt Binding with its macro command strings already formatted.
+"""
+import re
+import logging
+
+log = logging.getLogger(__name__)
+
+KEYS          = ['1', '2', '3', '4', '5', '6', '7', '8', 'A', 'B', 'C', 'D']
+MAX_LAYERS    = 4
+LAYER_MODES   = ['momentary', 'toggle']
+_DEFAULT_HOLD_MS = 500
+
+REPEAT_DEFAULTS  = {'delay_ms': 400, 'rate_ms': 80, 'accel': 0.0}
+REPEAT_MIN_MS    = 20      # fastest repeat, also the floor acceleration converges to
+
+_COMMAND_RE = re.compile(r'^(?:L(\d+):)?(KP|CH):([^:]+)(?::(HOLD|DOUBLE))?$')
+
+
+class Binding:
+    """Everything the dispatcher needs to resolve one key on one layer."""
+    __slots__ = ('key', 'tap', 'hold', 'double', 'hold_ms', 'repeat', 'chords',
+                 'layer', 'layer_mode', 'deferred')
+
+    def __init__(self, key):
+        self.key        = key
+        self.tap        = f'KP:{key}'   # always set so unbound keys still report a press
+        self.hold       = None
+        self.double     = None
+        self.hold_ms    = _DEFAULT_HOLD_MS
+        self.repeat     = None          # (delay_s, rate_s, accel, min_s) for auto-repeat
+        self.chords     = {}            # partner key → chord command
+        self.layer      = 0             # > 0 if this key switches to that layer
+        self.layer_mode = ''
+        self.deferred   = False
+
+    def copy(self):
+        b = Binding(self.key)
+        b.tap, b.hold, b.double, b.hold_ms = self.tap, self.hold, self.double, self.hold_ms
+        b.repeat = self.repeat
+        b.chords = dict(self.chords)
+        b.layer, b.layer_mode = self.layer, self.layer_mode
+        return b
+
+
+class Keymap:
+    """Compiled, read-only keymap: tables[layer][key] → Binding."""
+    __slots__ = ('tables', 'layer_names', 'shift_key')
+
+    def __init__(self, tables, layer_names, shift_key):
+        self.tables      = tables
+        self.layer_names = layer_names
+        self.shift_key   = shift_key
+
+
+def _parse(command):
+    """Return (layer, kind, keys, suffix) for a keymap command, or None for anything else."""
+    m = _COMMAND_RE.match(command)
+    if not m:
+        return None
+    layer = int(m.group(1) or 0)
+    if layer > MAX_LAYERS:
+        return None
+    kind = m.group(2)
+    if kind == 'CH':
+        keys = tuple(k for k in m.group(3).split('+') if k)
+        if len(keys) != 2 or keys[0] == keys[1] or m.group(4):
+            return None
+    else:
+        keys = (m.group(3),)
+    return layer, kind, keys, m.group(4) or ''
+
+
+def compile_keymap(macros, layers=None, shift_key=''):
+    layers = list(layers or [])[:MAX_LAYERS]
+
+    # Per-layer overrides, gathered from the flat macro dict
+    overrides = [dict() for _ in range(len(layers) + 1)]
+    for command, entry in macros.items():
+        parsed = _parse(command)
+        if parsed is None:
+            continue
+        layer, kind, keys, suffix = parsed
+        if layer > len(layers):
+            continue
+        table = overrides[layer]
+        if kind == 'CH':
+            a, b = keys
+            table.setdefault(a, {}).setdefault('chords', {})[b] = command
+            table.setdefault(b, {}).setdefault('chords', {})[a] = command
+        elif suffix == 'HOLD':
+            table.setdefault(keys[0], {})['hold'] = command
+            table[keys[0]]['hold_ms'] = int(entry.get('hold_ms', _DEFAULT_HOLD_MS))
+        elif suffix == 'DOUBLE':
+            table.setdefault(keys[0], {})['double'] = command
+        else:
+            table.setdefault(keys[0], {})['tap'] = command
+            table[keys[0]]['repeat'] = repeat_config(entry.get('repeat'))
+
+    keys = list(KEYS)
+    for table in overrides:
+        keys.extend(k for k in table if k not in keys)
+
+    # Base layer
+    base = {}
+    for key in keys:
+        b = Binding(key)
+        _apply(b, overrides[0].get(key))
+        base[key] = b
+
+    # Higher layers inherit every field they do not override
+    tables = [base]
+    for n in range(1, len(layers) + 1):
+        table = {}
+        for key in keys:
+            b = base[key].copy()
+            _apply(b, overrides[n].get(key))
+            table[key] = b
+        tables.append(table)
+
+    # Layer switch keys are active on every layer so a momentary layer can be released
+    for n, layer in enumerate(layers, start=1):
+        key  = str(layer.get('key', ''))
+        mode = layer.get('mode', 'momentary')
+        if not key or mode not in LAYER_MODES:
+            log.warning(f'Ignoring layer {n} {layer.get("name", "")!r}: needs a key and a valid mode')
+            continue
+        for table in tables:
+            b = table.setdefault(key, Binding(key))
+            b.layer, b.layer_mode = n, mode
+
+    for table in tables:
+        for b in table.values():
+            if b.repeat:
+                b.hold = b.double = None
+            b.deferred = bool(b.hold or b.double or b.chords or b.layer or b.key == shift_key)
+
+    names = ('',) + tuple(str(layer.get('name', f'Layer {n}')) for n, layer in enumerate(layers, start=1))
+    return Keymap(tuple(tables), names, shift_key or '')
+
+
+def repeat_config(cfg):
+    """Normalise a macro's 'repeat' dict to (delay_s, rate_s, accel, min_s), or None if off."""
+    if not cfg:
+        return None
+    try:
+        delay = max(0, int(cfg.get('delay_ms', REPEAT_DEFAULTS['delay_ms'])))
+        rate  = max(REPEAT_MIN_MS, int(cfg.get('rate_ms', REPEAT_DEFAULTS['rate_ms'])))
+        accel = min(0.5, max(0.0, float(cfg.get('accel', REPEAT_DEFAULTS['accel']))))
+    except (TypeError, ValueError, AttributeError):
+        log.warning(f'Ignoring invalid repeat config {cfg!r}')
+        return None
+    return delay / 1000, rate / 1000, accel, REPEAT_MIN_MS / 1000
+
+
+def _apply(binding, fields):
+    if not fields:
+        return
+    for name in ('tap', 'hold', 'double', 'hold_ms', 'repeat'):
+        if name in fields:
+            setattr(binding, name, fields[name])
+    if 'chords' in fields:
+        binding.chords.update(fields['chords'])
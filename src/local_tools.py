@@ -0,0 +1,130 @@
+"""
+Tools that must run in the process that owns the window, never over IPC.
+
+Keystroke recording installs a global keyboard hook, firmware upload runs
+arduino-cli, and install_update downloads and starts an installer. MacroPadAPI
+and the attached RemoteAPI both mix this in, so the page can call them either
+way while the IPC server never exposes them. The host supplies:
+
+    _push(event, payload)   deliver an event to the page
+    _release_port()         free the pad's serial port for the uploader
+    _reclaim_port()         reconnect afterwards
+    _exit_for_update()      stop so the installer can replace the app
+"""
+import json
+import os
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+REPO = 'brimgit/MacroPad-Serial-To-Macros-GUI'
+
+
+class LocalTools:
+    _recording_buf = None
+
+    # ── Macro recording ───────────────────────────────────────────────────────
+    def start_recording(self):
+        try:
+            import keyboard as kb
+            self._recording_buf = kb.start_recording()
+            return {'ok': True}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+    def get_recording_status(self):
+        count = len(self._recording_buf) if self._recording_buf is not None else 0
+        return {'ok': True, 'count': count}
+
+    def stop_recording(self):
+        try:
+            import keyboard as kb
+            events = kb.stop_recording()
+            self._recording_buf = None
+            # Normalise timestamps so the first event starts at t=0
+            t0 = events[0].time if events else 0
+            data = [
+                {
+                    'event_type': e.event_type,
+                    'scan_code':  int(e.scan_code or 0),
+                    'name':       e.name,
+                    'time':       round(e.time - t0, 4),
+                }
+                for e in events
+            ]
+            return {'ok': True, 'events': json.dumps(data), 'count': len(data)}
+        except Exception as e:
+            self._recording_buf = None
+            return {'ok': False, 'error': str(e)}
+
+    # ── Firmware Upload ───────────────────────────────────────────────────────
+    def upload_firmware(self, ino_path: str, cli_path: str, action: str, board: str, port: str):
+        import subprocess
+
+        def _run():
+            try:
+                self._release_port()
+                # Argument lists, no shell — the paths and board come from the page
+                r = subprocess.run([cli_path, 'compile', '--fqbn', board, ino_path],
+                                   capture_output=True, text=True, timeout=120)
+                self._push('upload_log', {'line': r.stdout or r.stderr or 'Compile done', 'ok': r.returncode == 0})
+                if r.returncode != 0:
+                    self._push('upload_done', {'ok': False, 'error': 'Compilation failed'})
+                    return
+                if action == 'upload':
+                    r2 = subprocess.run([cli_path, 'upload', '--fqbn', board, '--port', port, ino_path],
+                                        capture_output=True, text=True, timeout=120)
+                    self._push('upload_log', {'line': r2.stdout or r2.stderr or 'Upload done', 'ok': r2.returncode == 0})
+                    self._push('upload_done', {'ok': r2.returncode == 0})
+                else:
+                    self._push('upload_done', {'ok': True})
+            except Exception as e:
+                self._push('upload_done', {'ok': False, 'error': str(e)})
+            finally:
+                self._reclaim_port()
+
+        threading.Thread(target=_run, daemon=True).start()
+        return {'ok': True, 'started': True}
+
+    # ── Update ────────────────────────────────────────────────────────────────
+    def install_update(self, version: str):
+        """Download the installer for *version* from GitHub Releases and run it."""
+        url  = (f'https://github.com/{REPO}/releases/download/'
+                f'v{version}/MacroPad_Setup_v{version}.exe')
+        import tempfile
+        import urllib.request
+        dest = os.path.join(tempfile.gettempdir(), f'MacroPad_Setup_v{version}.exe')
+
+        def _run():
+            try:
+                self._push('update_progress', {'state': 'downloading', 'pct': 0})
+                req = urllib.request.Request(
+                    url, headers={'User-Agent': 'MacroPad-updater/1.0'})
+                with urllib.request.urlopen(req, timeout=120) as r:
+                    total = int(r.headers.get('Content-Length') or 0)
+                    done  = 0
+                    with open(dest, 'wb') as f:
+                        while True:
+                            chunk = r.read(32768)
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                            done += len(chunk)
+                            if total:
+                                self._push('update_progress', {
+                                    'state': 'downloading',
+                                    'pct': int(done * 100 / total),
+                                })
+                self._push('update_progress', {'state': 'launching'})
+                import subprocess
+                subprocess.Popen([dest])
+                time.sleep(1)
+                self._exit_for_update()
+            except Exception as e:
+                log.warning(f'install_update failed: {e}')
+                self._push('update_progress', {'state': 'error', 'error': str(e)})
+
+        threading.Thread(target=_run, daemon=True).start()
+        return {'ok': True}
@@ -1,8 +1,9 @@
 import json
-import os
-import time
 import logging
-import keyboard
+import queue
+import threading
+import action_registry
+import persistence
 from utils import get_data_path
 
 log = logging.getLogger(__name__)
@@ -11,23 +12,46 @@ macros = {}
 
 SYSTEM_ACTIONS = ['lock', 'sleep', 'shutdown', 'restart']
 
+# Type Text delivery: 'type' synthesises one key event per character, 'paste'
+# goes through the clipboard, 'auto' pastes once the text reaches the threshold.
+TEXT_DELIVERY_MODES = ['auto', 'type', 'paste']
+PASTE_THRESHOLD     = 64      # default, overridden from settings_serial.json
 
-def set_macro(command, action_type, action, hold_ms=None):
+paste_threshold = PASTE_THRESHOLD
+
+
+def set_paste_threshold(chars):
+    """Set the Type Text length at which 'auto' delivery switches to paste (0 = never)."""
+    global paste_threshold
+    paste_threshold = max(0, int(chars))
+
+
+def set_macro(command, action_type, action, hold_ms=None, delivery=None, repeat=None):
     entry = {'type': action_type, 'action': action}
     if hold_ms is not None:
         entry['hold_ms'] = int(hold_ms)
+    if delivery in TEXT_DELIVERY_MODES and delivery != 'auto':
+        entry['delivery'] = delivery
+    if repeat:
+        entry['repeat'] = {
+            'delay_ms': int(repeat.get('delay_ms', 400)),
+            'rate_ms':  int(repeat.get('rate_ms', 80)),
+            'accel':    float(repeat.get('accel', 0.0)),
+        }
     macros[command] = entry
     log.info(f'Macro set: {command} → {action_type}: {action}')
 
 
+def replace_macros(new_macros):
+    """Swap in a whole macro set (profile switch) without clearing the dict readers may be using."""
+    global macros
+    macros = dict(new_macros)
+
+
 def save_macros():
-    path = get_data_path('macros.json')
-    try:
-        with open(path, 'w') as f:
-            json.dump(macros, f, indent=4)
-    except IOError as e:
-        log.error(f'Failed to save macros: {e}')
-        raise
+    """Queue macros.json for a debounced, atomic write."""
+    persistence.store.register('macros', get_data_path('macros.json'), lambda: macros, indent=4)
+    persistence.store.mark_dirty('macros')
 
 
 def reload_macros():
@@ -43,6 +67,7 @@ def reload_macros():
         return {}
     except json.JSONDecodeError as e:
         log.error(f'macros.json is corrupted: {e}')
+        persistence.quarantine(path)
         return {}
 
 
@@ -53,79 +78,98 @@ def delete_macro(command):
     save_macros()
 
 
-def _execute_system(action):
-    import ctypes
-    if action == 'lock':
-        ctypes.windll.user32.LockWorkStation()
-    elif action == 'sleep':
-        os.system('rundll32.exe powrprof.dll,SetSuspendState 0,1,0')
-    elif action == 'shutdown':
-        os.system('shutdown /s /t 0')
-    elif action == 'restart':
-        os.system('shutdown /r /t 0')
-    else:
-        log.warning(f'Unknown system action: {action!r}')
+class _MultiAction(action_registry.ActionHandler):
+    name     = 'Multi Action'
+    blocking = True     # steps may include Delay, Recorded, paste…
 
+    def run(self, action, macro):
+        for step in json.loads(action):
+            _execute_step(step.get('type', ''), step.get('action', ''), step)
 
-def _execute_step(mtype, action):
-    """Execute a single macro step — used by execute_macro and Multi Action."""
-    if mtype in ('Keyboard Key', 'Media Control', 'Function Key'):
-        keyboard.send(action)
-    elif mtype == 'Modifier Key':
-        keyboard.press_and_release(action)
-    elif mtype == 'Type Text':
-        keyboard.write(action)
-    elif mtype == 'Launch':
-        try:
-            os.startfile(action)
-        except Exception:
-            subprocess.Popen(action, shell=True)
-    elif mtype == 'System':
-        _execute_system(action)
-    elif mtype == 'Delay':
-        try:
-            time.sleep(max(0.0, min(10.0, float(action))))
-        except (ValueError, TypeError):
-            pass
-    elif mtype == 'Recorded':
-        events_data = json.loads(action)
-        events = [
-            keyboard.KeyboardEvent(
-                event_type=e['event_type'],
-                scan_code=e.get('scan_code') or 0,
-                name=e.get('name'),
-                time=e.get('time', 0),
-            )
-            for e in events_data
-        ]
-        keyboard.play(events, speed_factor=1)
-    elif mtype in ('Mute App', ''):
-        pass  # handled in api.py or intentionally empty
-    else:
-        log.warning(f'Unknown macro type {mtype!r}')
 
+class _NoOp(action_registry.ActionHandler):
+    blocking = False
 
-def execute_macro(command):
-    macro = macros.get(command)
-    if not macro:
-        log.debug(f'No macro assigned to {command!r}')
-        return
+    def __init__(self, name):
+        self.name = name
 
+    def run(self, action, macro):
+        pass    # Mute App is handled in api.py; '' is an intentionally empty slot
+
+
+action_registry.register(_MultiAction())
+action_registry.register(_NoOp('Mute App'))
+action_registry.register(_NoOp(''))
+
+
+def _execute_step(mtype, action, macro):
+    """Execute a single macro step — used by execute_macro and Multi Action."""
+    handler = action_registry.get(mtype)
+    if handler is None:
+        log.warning(f'Unknown macro type {mtype!r}')
+        return False
+    handler.run(action, macro)
+    return True
+
+
+# ── blocking worker ───────────────────────────────────────────────────────────
+# Handlers that declare blocking=True run here, in order, so the serial
+# thread that delivered the key press is never held up by them.
+_blocking_queue  = queue.SimpleQueue()
+_blocking_thread = None
+_blocking_lock   = threading.Lock()
+_coalescing      = set()     # commands with an auto-repeat run waiting in the queue
+
+
+def _blocking_loop():
+    while True:
+        command, macro, coalesce = _blocking_queue.get()
+        if coalesce:
+            with _blocking_lock:
+                _coalescing.discard(command)
+        _run(command, macro)
+
+
+def _submit_blocking(command, macro, coalesce):
+    global _blocking_thread
+    with _blocking_lock:
+        if coalesce:
+            if command in _coalescing:
+                log.debug(f'{command!r} repeat already queued — skipping')
+                return
+            _coalescing.add(command)
+        if _blocking_thread is None:
+            _blocking_thread = threading.Thread(target=_blocking_loop, name='macro-blocking', daemon=True)
+            _blocking_thread.start()
+    _blocking_queue.put((command, macro, coalesce))
+
+
+def _run(command, macro):
     mtype  = macro.get('type', '')
     action = macro.get('action', '')
-
     try:
-        if mtype == 'Multi Action':
-            steps = json.loads(action)
-            for step in steps:
-                _execute_step(step.get('type', ''), step.get('action', ''))
-        else:
-            _execute_step(mtype, action)
+        if not _execute_step(mtype, action, macro):
+            return
     except Exception as e:
         log.error(f'Failed to execute {mtype} macro for {command!r}: {e}')
         return
-
     log.info(f'Executed [{mtype}] {command!r}: {str(action)[:60]}')
 
 
-import subprocess  # noqa: E402 — after _execute_step definition to avoid circular use
+def execute_macro(command, macro=None, coalesce=False):
+    """Run the macro bound to command. Pass macro when the caller already resolved it from a snapshot.
+
+    Every call runs once. coalesce=True (auto-repeat ticks) skips the run if the same command's
+    previous repeat is still waiting on the blocking worker.
+    """
+    if macro is None:
+        macro = macros.get(command)
+    if not macro:
+        log.debug(f'No macro assigned to {command!r}')
+        return
+
+    handler = action_registry.get(macro.get('type', ''))
+    if handler is not None and handler.blocking and threading.current_thread() is not _blocking_thread:
+        _submit_blocking(command, macro, coalesce)
+    else:
+        _run(command, macro)
@@ -0,0 +1,106 @@
+"""
+Command-line client for a running MacroPad (window or daemon).
+
+    python src/macropad_cli.py send "BRIGHT:128" "1:color(255,0,0)" "1:75"
+    some-script | python src/macropad_cli.py send -        # one command per line
+    python src/macropad_cli.py listen                      # key and encoder events as JSON lines
+    python src/macropad_cli.py listen --ui                 # also the UI event stream
+    python src/macropad_cli.py call switch_profile '"Gaming"'
+    python src/macropad_cli.py stats
+
+Commands read from stdin are sent in batches, each batch as one write to
+the pad.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from ipc import ENDPOINT_FILE, IpcClient, IpcError, read_endpoint
+
+BATCH = 64      # stdin lines per send_commands call
+
+
+def _endpoint(path):
+    if not path and not getattr(sys, 'frozen', False):
+        path = os.path.join(ROOT, 'Data', ENDPOINT_FILE)     # source checkout: Data/ next to src/
+    ep = read_endpoint(path)
+    if not ep:
+        raise IpcError('MacroPad is not running')
+    return ep
+
+
+def _send(client, commands):
+    if commands != ['-']:
+        return client.call('send_commands', commands)
+    sent, batch = 0, []
+    for line in sys.stdin:
+        if line.strip():
+            batch.append(line.rstrip('\r\n'))
+        if len(batch) >= BATCH:
+            sent += client.call('send_commands', batch)['sent']
+            batch = []
+    if batch:
+        sent += client.call('send_commands', batch)['sent']
+    return {'ok': True, 'sent': sent}
+
+
+def _listen(args):
+    done = threading.Event()
+
+    def on_events(batch, topic):
+        for event, payload in batch:
+            print(json.dumps({'topic': topic, 'event': event, 'data': payload}), flush=True)
+
+    client = IpcClient(_endpoint(args.endpoint), on_events=on_events)
+    client.subscribe(['device', 'ui'] if args.ui else ['device'])
+    try:
+        while not client.closed:
+            done.wait(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='macropad_cli', description='Talk to a running MacroPad.')
+    parser.add_argument('--endpoint', help='path to ipc.json (default: the app\'s data directory)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('send', help='send device commands ("-" reads them from stdin)')
+    p.add_argument('commands', nargs='+')
+    p = sub.add_parser('listen', help='print device events as JSON lines')
+    p.add_argument('--ui', action='store_true', help='include UI events')
+    p = sub.add_parser('call', help='call an API method; params are JSON values')
+    p.add_argument('method')
+    p.add_argument('params', nargs='*')
+    sub.add_parser('stats', help='connected IPC clients and their queues')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'listen':
+            _listen(args)
+            return 0
+        client = IpcClient(_endpoint(args.endpoint))
+        try:
+            if args.command == 'send':
+                result = _send(client, args.commands)
+            elif args.command == 'call':
+                result = client.call(args.method, *[json.loads(p) for p in args.params])
+            else:
+                result = client.call('get_ipc_stats')
+        finally:
+            client.close()
+    except (IpcError, OSError, ValueError) as e:
+        print(f'macropad_cli: {e}', file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,11 +8,31 @@ logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(mes
 sys.path.insert(0, os.path.dirname(__file__))
 os.chdir(os.path.join(os.path.dirname(__file__), '..'))
 
-import webview
-from api import MacroPadAPI
+
+def _attach(required):
+    """RemoteAPI on the running daemon, so a second process never opens the pad's port."""
+    from ipc import IpcError
+    from remote_api import connect
+    try:
+        return connect()
+    except (IpcError, OSError):
+        if required:
+            raise
+        return None
+
 
 def main():
-    api = MacroPadAPI()
+    if '--daemon' in sys.argv:
+        # Headless: no pywebview in this process; the window is a separate --attach process
+        from daemon import main as run_daemon
+        run_daemon(sys.argv)
+        return
+
+    import webview
+    api = _attach(required='--attach' in sys.argv)
+    if api is None:
+        from api import MacroPadAPI
+        api = MacroPadAPI()
 
     dev_mode = '--dev' in sys.argv
     if getattr(sys, 'frozen', False):
@@ -37,6 +57,7 @@ def main():
     # Force Edge (WebView2) backend when running as a bundled exe — PyQt5 is not bundled
     gui = 'edgechromium' if getattr(sys, 'frozen', False) else None
     webview.start(debug=False, gui=gui)
+    api.shutdown()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,277 @@
+"""
+Write-behind persistence for the JSON data files.
+
+Stores are registered with a snapshot callable and marked dirty on every
+change; a background thread coalesces all marks that land within the
+debounce window into a single write. Every write is atomic — temp file in
+the same directory, fsync, then os.replace — so a crash leaves either the
+old or the new file, never a truncated one. A failed write leaves the store
+dirty and is retried with backoff. flush() writes synchronously and is
+called on shutdown.
+
+atomic_write() also remembers hashes of the last few writes to each path,
+so the data watcher can tell the app's own writes from external edits even
+when it reads the file a write or two late.
+"""
+import atexit
+from collections import deque
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+DEBOUNCE_S  = 0.5     # quiet period before a dirty store is written
+MAX_DELAY_S = 2.0     # upper bound on how long a continuously-edited store can stay dirty
+RETRY_S     = 1.0     # first retry after a failed write; doubles per consecutive failure
+RETRY_MAX_S = 60.0
+
+OWN_HISTORY = 8      # recent writes per path recognised as our own
+
+_own_lock = threading.Lock()
+_own      = {}        # absolute path → deque of sha1s of the bytes we recently wrote there
+
+
+def digest(data: bytes):
+    return hashlib.sha1(data).hexdigest()
+
+
+def is_own_write(path, data: bytes):
+    """True if data is exactly what one of the recent atomic_writes put at path."""
+    with _own_lock:
+        return digest(data) in _own.get(os.path.abspath(path), ())
+
+
+def atomic_write(path, data: bytes):
+    """Write bytes to path via temp file + fsync + rename."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    key, sha = os.path.abspath(path), digest(data)
+    with _own_lock:
+        # Before the rename, so a watcher never sees it as foreign
+        _own.setdefault(key, deque(maxlen=OWN_HISTORY)).append(sha)
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with _own_lock:
+            recent = _own.get(key)
+            if recent and sha in recent:
+                recent.remove(sha)            # the file on disk is not this write
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        raise
+    if hasattr(os, 'O_DIRECTORY'):     # make the rename itself durable (POSIX only)
+        try:
+            dfd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dfd)
+            finally:
+                os.close(dfd)
+        except OSError:
+            pass
+
+
+def atomic_write_json(path, obj, indent=None):
+    data = json.dumps(obj, indent=indent).encode('utf-8')
+    atomic_write(path, data)
+    return len(data)
+
+
+def quarantine(path):
+    """Move an unreadable data file aside so it is not overwritten. Returns the new path or None."""
+    dest = f'{path}.corrupt-{time.strftime("%Y%m%d-%H%M%S")}'
+    try:
+        os.replace(path, dest)
+        log.error(f'{os.path.basename(path)} was unreadable — kept as {os.path.basename(dest)}')
+        return dest
+    except OSError as e:
+        log.error(f'Could not move aside unreadable {path}: {e}')
+        return None
+
+
+class _Store:
+    __slots__ = ('path', 'snapshot', 'indent', 'after_write', 'dirty_since', 'last_mark',
+                 'marks', 'writes', 'bytes', 'errors', 'failures', 'retry_at', 'last_write')
+
+    def __init__(self, path, snapshot, indent, after_write):
+        self.path        = path
+        self.snapshot    = snapshot
+        self.indent      = indent
+        self.after_write = after_write
+        self.dirty_since = None
+        self.last_mark   = 0.0
+        self.marks       = 0
+        self.writes      = 0
+        self.bytes       = 0
+        self.errors      = 0
+        self.failures    = 0         # consecutive failed writes
+        self.retry_at    = 0.0       # monotonic time before which the thread won't retry
+        self.last_write  = None
+
+
+class WriteBehind:
+    def __init__(self, debounce_s=DEBOUNCE_S, max_delay_s=MAX_DELAY_S):
+        self._debounce  = debounce_s
+        self._max_delay = max_delay_s
+        self._stores    = {}
+        self._cv        = threading.Condition()
+        self._io_lock   = threading.Lock()    # one writer at a time (thread vs. flush())
+        self._thread    = None
+        self._running   = False
+
+    def register(self, name, path, snapshot, indent=None, after_write=None):
+        """Declare a store. snapshot() must return the JSON-serialisable object to write.
+
+        after_write(), if given, runs on the writer thread once a write has hit the disk.
+        """
+        with self._cv:
+            store = self._stores.get(name)
+            if store is None:
+                self._stores[name] = _Store(path, snapshot, indent, after_write)
+            else:
+                store.path, store.snapshot, store.indent = path, snapshot, indent
+                store.after_write = after_write
+
+    def unregister(self, name):
+        """Forget a store and any pending write for it (its file is being removed)."""
+        with self._io_lock:
+            with self._cv:
+                self._stores.pop(name, None)
+
+    def mark_dirty(self, name):
+        now = time.monotonic()
+        with self._cv:
+            store = self._stores[name]
+            store.marks    += 1
+            store.last_mark = now
+            if store.dirty_since is None:
+                store.dirty_since = now
+            if self._thread is None:
+                self._running = True
+                self._thread  = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._cv.notify()
+
+    def flush(self, names=None):
+        """Write dirty stores now, on the calling thread, ignoring any retry backoff.
+
+        Returns the names of the stores that could not be written (they stay dirty).
+        """
+        with self._cv:
+            due = [n for n, s in self._stores.items()
+                   if s.dirty_since is not None and (names is None or n in names)]
+        return [name for name in due if not self._write(name)]
+
+    def stop(self):
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        failed = self.flush()
+        if failed:
+            log.error(f'Unsaved changes could not be written: {", ".join(failed)}')
+
+    def stats(self):
+        with self._cv:
+            per = {
+                name: {
+                    'writes':    s.writes,
+                    'bytes':     s.bytes,
+                    'marks':     s.marks,
+                    'coalesced': max(0, s.marks - s.writes),
+                    'errors':    s.errors,
+                    'failures':  s.failures,
+                    'dirty':     s.dirty_since is not None,
+                }
+                for name, s in self._stores.items()
+            }
+        return {
+            'writes': sum(p['writes'] for p in per.values()),
+            'bytes':  sum(p['bytes'] for p in per.values()),
+            'stores': per,
+        }
+
+    # ── background thread ─────────────────────────────────────────────────────
+
+    def _next_due(self, now):
+        due, wait = [], None
+        for name, s in self._stores.items():
+            if s.dirty_since is None:
+                continue
+            at = max(min(s.last_mark + self._debounce, s.dirty_since + self._max_delay), s.retry_at)
+            if at <= now:
+                due.append(name)
+            else:
+                wait = at - now if wait is None else min(wait, at - now)
+        return due, wait
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while True:
+                    if not self._running:
+                        self._thread = None
+                        return
+                    due, wait = self._next_due(time.monotonic())
+                    if due:
+                        break
+                    self._cv.wait(wait)
+            for name in due:
+                self._write(name)
+
+    def _write(self, name):
+        with self._io_lock:
+            with self._cv:
+                store = self._stores.get(name)
+                if store is None or store.dirty_since is None:
+                    return True                  # unregistered, or already written by a concurrent flush
+                dirty_since, store.dirty_since = store.dirty_since, None
+                path, snapshot, indent = store.path, store.snapshot, store.indent
+                after_write = store.after_write
+            try:
+                data = json.dumps(snapshot(), indent=indent).encode('utf-8')
+                atomic_write(path, data)
+            except RuntimeError as e:
+                # The dict changed size mid-serialisation — it is being edited; try again shortly
+                log.debug(f'{name}: snapshot changed during write ({e}) — retrying')
+                self.mark_dirty(name)
+                return False
+            except Exception as e:
+                with self._cv:
+                    # Keep the store dirty (from when it first was) and back off before the next try
+                    store.errors   += 1
+                    store.failures += 1
+                    delay = min(RETRY_S * 2 ** (store.failures - 1), RETRY_MAX_S)
+                    store.retry_at    = time.monotonic() + delay
+                    store.dirty_since = dirty_since if store.dirty_since is None else min(dirty_since, store.dirty_since)
+                    self._cv.notify()
+                log.error(f'Failed to write {path}: {e} — retrying in {delay:.1f}s')
+                return False
+            with self._cv:
+                store.failures   = 0
+                store.retry_at   = 0.0
+                store.writes    += 1
+                store.bytes     += len(data)
+                store.last_write = time.time()
+            if after_write is not None:
+                try:
+                    after_write()
+                except Exception as e:
+                    log.warning(f'{name}: post-write hook failed: {e}')
+            return True
+
+
+store = WriteBehind()
+atexit.register(store.stop)
@@ -0,0 +1,30 @@
+# macro-types: Keyboard Key, Media Control, Function Key, Modifier Key
+"""Single keys, media keys and modifier chords sent through the keyboard package."""
+import keyboard
+from action_registry import ActionHandler
+
+
+class SendKey(ActionHandler):
+    blocking = False
+
+    def __init__(self, name):
+        self.name = name
+
+    def run(self, action, macro):
+        keyboard.send(action)
+
+
+class ModifierChord(ActionHandler):
+    name     = 'Modifier Key'
+    blocking = False
+
+    def run(self, action, macro):
+        keyboard.press_and_release(action)
+
+
+HANDLERS = [
+    SendKey('Keyboard Key'),
+    SendKey('Media Control'),
+    SendKey('Function Key'),
+    ModifierChord(),
+]
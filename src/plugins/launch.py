@@ -0,0 +1,28 @@
+# macro-types: Launch
+"""Open a file, folder, application or URL — without going through a shell."""
+import os
+import shlex
+import subprocess
+from action_registry import ActionHandler
+
+
+class Launch(ActionHandler):
+    name     = 'Launch'
+    blocking = True     # ShellExecute can stall while the target resolves
+
+    def run(self, action, macro):
+        target = action.strip()
+        if not target:
+            return
+        if hasattr(os, 'startfile'):
+            try:
+                os.startfile(target)
+                return
+            except OSError:
+                pass    # not a registered file/URL — treat as a command line
+            subprocess.Popen(target)    # Windows parses the command line itself
+        else:
+            subprocess.Popen(shlex.split(target))
+
+
+HANDLERS = [Launch()]
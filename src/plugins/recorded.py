@@ -0,0 +1,25 @@
+# macro-types: Recorded
+"""Replay a recorded keyboard sequence with its original timing."""
+import json
+import keyboard
+from action_registry import ActionHandler
+
+
+class Recorded(ActionHandler):
+    name     = 'Recorded'
+    blocking = True
+
+    def run(self, action, macro):
+        events = [
+            keyboard.KeyboardEvent(
+                event_type=e['event_type'],
+                scan_code=e.get('scan_code') or 0,
+                name=e.get('name'),
+                time=e.get('time', 0),
+            )
+            for e in json.loads(action)
+        ]
+        keyboard.play(events, speed_factor=1)
+
+
+HANDLERS = [Recorded()]
@@ -0,0 +1,28 @@
+# macro-types: System
+"""Lock, sleep, shut down or restart the machine."""
+import ctypes
+import logging
+import subprocess
+from action_registry import ActionHandler
+
+log = logging.getLogger(__name__)
+
+
+class System(ActionHandler):
+    name     = 'System'
+    blocking = False
+
+    def run(self, action, macro):
+        if action == 'lock':
+            ctypes.windll.user32.LockWorkStation()
+        elif action == 'sleep':
+            ctypes.windll.powrprof.SetSuspendState(0, 1, 0)
+        elif action == 'shutdown':
+            subprocess.Popen(['shutdown', '/s', '/t', '0'])
+        elif action == 'restart':
+            subprocess.Popen(['shutdown', '/r', '/t', '0'])
+        else:
+            log.warning(f'Unknown system action: {action!r}')
+
+
+HANDLERS = [System()]
@@ -0,0 +1,59 @@
+# macro-types: Type Text
+"""
+Type Text — typed key by key, or pasted through the clipboard.
+
+'auto' delivery pastes once the text reaches macro_manager.paste_threshold;
+a macro's 'delivery' field can force 'type' or 'paste'.
+"""
+import time
+import logging
+import keyboard
+import clipboard
+import macro_manager
+from action_registry import ActionHandler
+
+log = logging.getLogger(__name__)
+
+_PASTE_CHORD    = 'ctrl+v'
+_PASTE_SETTLE_S = 0.15    # time for the target app to read the clipboard before we restore it
+
+
+def paste_text(text):
+    """Deliver text via the clipboard: save, set, send the paste chord, restore.
+
+    Returns False (without touching the keyboard) if the clipboard could not be
+    written, or if its current content could not be saved (non-text data, or
+    unreadable) — pasting would leave the payload in place of it — so the
+    caller can fall back to typing. An empty clipboard is left empty again.
+    """
+    saved_ok, saved = clipboard.save()
+    if not saved_ok or not clipboard.set_text(text):
+        return False
+    try:
+        keyboard.send(_PASTE_CHORD)
+        time.sleep(_PASTE_SETTLE_S)
+    finally:
+        if not clipboard.restore(saved):
+            log.warning('Could not restore the clipboard after pasting')
+    return True
+
+
+def type_text(text, delivery='auto'):
+    threshold = macro_manager.paste_threshold
+    use_paste = delivery == 'paste' or (
+        delivery != 'type' and threshold > 0 and len(text) >= threshold
+    )
+    if use_paste and paste_text(text):
+        return
+    keyboard.write(text)
+
+
+class TypeText(ActionHandler):
+    name     = 'Type Text'
+    blocking = True     # the paste path waits for the target app before restoring the clipboard
+
+    def run(self, action, macro):
+        type_text(action, macro.get('delivery', 'auto'))
+
+
+HANDLERS = [TypeText()]
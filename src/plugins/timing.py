@@ -0,0 +1,18 @@
+# macro-types: Delay
+"""Pause between Multi Action steps (0–10 s)."""
+import time
+from action_registry import ActionHandler
+
+
+class Delay(ActionHandler):
+    name     = 'Delay'
+    blocking = True
+
+    def run(self, action, macro):
+        try:
+            time.sleep(max(0.0, min(10.0, float(action))))
+        except (ValueError, TypeError):
+            pass
+
+
+HANDLERS = [Delay()]
@@ -1,7 +1,18 @@
+import collections
+import copy
+import hashlib
 import json
+import logging
 import os
+import re
+import threading
+from collections.abc import MutableMapping
+import persistence
+from triggers import TriggerIndex
 from utils import get_data_path
 
+log = logging.getLogger(__name__)
+
 _DEFAULT_ENCODER = {
     'app': '',
     'mode': 'default',
@@ -11,10 +22,29 @@ _DEFAULT_ENCODER = {
 }
 
 
-def _path():
+_INDEX_VERSION = 1
+
+JOURNAL_COMPACT_BYTES = 256 * 1024   # fold the journal into the shards once it grows past this
+UNDO_DEPTH            = 100
+MAX_INHERIT_DEPTH     = 8
+
+
+def _legacy_path():
     return get_data_path('profiles.json')
 
 
+def _dir():
+    return get_data_path('profiles')
+
+
+def _index_path():
+    return os.path.join(_dir(), 'index.json')
+
+
+def _journal_path():
+    return os.path.join(_dir(), 'journal.jsonl')
+
+
 def _default_profile(macros=None):
     return {
         'macros': macros or {},
@@ -23,30 +53,347 @@ def _default_profile(macros=None):
     }
 
 
-def load(existing_macros=None):
-    """Load profiles.json. On first run, seed Default from existing_macros."""
+def _shard_filename(name, taken):
+    """A readable, filesystem-safe file name for a profile, unique within taken."""
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')[:40] or 'profile'
+    tag  = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+    filename, n = f'{slug}-{tag}.json', 1
+    while filename in taken:
+        filename, n = f'{slug}-{tag}-{n}.json', n + 1
+    return filename
+
+
+# ── Sharded profile storage ──────────────────────────────────────────────────
+
+class ProfileShards(MutableMapping):
+    """data['profiles'] backed by one file per profile under Data/profiles/.
+
+    The index (names, file names, trigger apps, active profile) is read at
+    startup; a profile's own file is parsed the first time it is accessed.
+    Each shard is its own write-behind store, so an edit rewrites only the
+    profile it touched plus the small index. A new profile's file is written
+    before the index can name it, and a removed profile's file is deleted
+    only after an index without it is on disk.
+    """
+
+    def __init__(self, directory, entries):
+        self._dir      = directory
+        self._lock     = threading.RLock()
+        self._files    = {}      # name → shard file name, in display order
+        self._triggers = {}      # name → trigger apps, for profiles not loaded yet
+        self._loaded   = {}      # name → profile dict
+        self._doomed   = set()   # files of removed profiles, deleted once the index is written
+        self._sweep    = ()      # doomed files covered by the index snapshot being written
+        self._parents  = {}      # name → parent name, for profiles not loaded yet
+        self._versions = {}      # name → change counter, checked by the flattened-profile cache
+        self._clock    = 0
+        self.flat      = {}      # name → (ancestor versions, flattened profile), see resolve()
+        self.triggers  = TriggerIndex()
+        for entry in entries:
+            name = entry['name']
+            self._files[name]    = entry.get('file') or _shard_filename(name, set(self._files.values()))
+            self._triggers[name] = list(entry.get('trigger_apps', []))
+            if entry.get('parent'):
+                self._parents[name] = entry['parent']
+            self.triggers.set(name, self._triggers[name])
+
+    def __len__(self):
+        return len(self._files)
+
+    def __iter__(self):
+        return iter(list(self._files))
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def __getitem__(self, name):
+        with self._lock:
+            profile = self._loaded.get(name)
+            if profile is None:
+                if name not in self._files:
+                    raise KeyError(name)
+                profile = self._read(name)
+                self._loaded[name] = profile
+                self._register(name)
+            return profile
+
+    def __setitem__(self, name, profile):
+        with self._lock:
+            new = name not in self._files
+            if new:
+                self._files[name] = _shard_filename(name, set(self._files.values()) | self._doomed)
+            self._loaded[name]   = profile
+            self._triggers[name] = list(profile.get('trigger_apps', []))
+            self.triggers.set(name, self._triggers[name])
+            self.touch([name])
+            self._register(name)
+            persistence.store.mark_dirty(self._store_name(name))
+            if new:
+                persistence.store.flush([self._store_name(name)])
+
+    def __delitem__(self, name):
+        with self._lock:
+            filename = self._files.pop(name)
+            self._loaded.pop(name, None)
+            self._triggers.pop(name, None)
+            self._parents.pop(name, None)
+            self._versions.pop(name, None)
+            self.flat.pop(name, None)
+            self.triggers.remove(name)
+            persistence.store.unregister(f'profile:{filename}')
+            self._doomed.add(filename)
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def path_of(self, name):
+        return os.path.join(self._dir, self._files[name])
+
+    def name_of_file(self, filename):
+        return next((n for n, f in self._files.items() if f == filename), None)
+
+    def adopt(self, name, profile):
+        """Take a profile whose shard was edited outside the app. Nothing is written back."""
+        with self._lock:
+            self._loaded[name]   = profile
+            self._triggers[name] = list(profile.get('trigger_apps', []))
+            if profile.get('parent'):
+                self._parents[name] = profile['parent']
+            else:
+                self._parents.pop(name, None)
+            self.triggers.set(name, self._triggers[name])
+            self.touch([name])
+            self._register(name)
+
+    def adopt_index(self, entries):
+        """Take an index edited outside the app. Returns the names that were added, dropped or changed.
+
+        A dropped profile's file is left on disk. Trigger apps and parents
+        changed in the index are copied into the profile so its shard agrees.
+        """
+        with self._lock:
+            wanted  = {e['name']: e for e in entries if e.get('name')}
+            changed = set()
+            for name in [n for n in self._files if n not in wanted]:
+                persistence.store.unregister(self._store_name(name))
+                del self._files[name]
+                for table in (self._loaded, self._triggers, self._parents, self._versions, self.flat):
+                    table.pop(name, None)
+                self.triggers.remove(name)
+                changed.add(name)
+            files = {}
+            for name, entry in wanted.items():
+                filename = entry.get('file') or self._files.get(name) \
+                           or _shard_filename(name, set(self._files.values()) | set(files.values()))
+                if self._files.get(name) != filename:
+                    if name in self._files:
+                        persistence.store.unregister(self._store_name(name))
+                    self._loaded.pop(name, None)           # re-read from the file the index names
+                    changed.add(name)
+                files[name] = filename
+            self._files = files                            # also takes the index's order
+            for name, entry in wanted.items():
+                apps   = list(entry.get('trigger_apps', []))
+                parent = entry.get('parent') or None
+                if apps == list(self.trigger_apps(name)) and parent == self.parent_of(name):
+                    continue
+                profile = self[name]
+                if apps == profile.get('trigger_apps', []) and parent == profile.get('parent'):
+                    self.adopt(name, profile)              # new in the index; its shard already agrees
+                    continue
+                profile['trigger_apps'] = apps
+                if parent:
+                    profile['parent'] = parent
+                else:
+                    profile.pop('parent', None)
+                self.adopt(name, profile)
+                persistence.store.mark_dirty(self._store_name(name))
+                changed.add(name)
+            self.touch(changed & set(files))
+            return changed
+
+    def trigger_apps(self, name):
+        """Trigger apps for a profile, without loading its shard."""
+        profile = self._loaded.get(name)
+        if profile is not None:
+            return profile.get('trigger_apps', [])
+        return self._triggers.get(name, [])
+
+    def parent_of(self, name):
+        """A profile's parent, without loading its shard."""
+        profile = self._loaded.get(name)
+        if profile is not None:
+            return profile.get('parent')
+        return self._parents.get(name)
+
+    def version(self, name):
+        return self._versions.get(name, 0)
+
+    def touch(self, names):
+        """Record that these profiles changed, invalidating flattened views built on them."""
+        with self._lock:
+            for name in names:
+                self._clock += 1
+                self._versions[name] = self._clock
+
+    def mark_dirty(self, names=None):
+        """Queue writes for the named profiles (default: every loaded profile)."""
+        with self._lock:
+            names = list(self._loaded) if names is None else [n for n in names if n in self._loaded]
+            self.touch(names)
+            for name in names:
+                persistence.store.mark_dirty(self._store_name(name))
+
+    def write_now(self, names):
+        """Write the named profiles synchronously. Returns False if any write failed."""
+        with self._lock:
+            stores = [self._store_name(n) for n in names if n in self._loaded]
+            for store in stores:
+                persistence.store.mark_dirty(store)
+        return not persistence.store.flush(stores)
+
+    def remove_deleted(self):
+        """Delete the files of removed profiles once an index without them has been written."""
+        with self._lock:
+            sweep, self._sweep = self._sweep, ()
+            self._doomed.difference_update(sweep)
+        for filename in sweep:
+            try:
+                os.remove(os.path.join(self._dir, filename))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.warning(f'Could not remove profile file {filename}: {e}')
+
+    def index_snapshot(self, active):
+        with self._lock:
+            self._sweep = tuple(self._doomed)
+            return {
+                'version':  _INDEX_VERSION,
+                'active':   active,
+                'profiles': [
+                    {'name': name, 'file': filename, 'trigger_apps': list(self.trigger_apps(name)),
+                     **({'parent': self.parent_of(name)} if self.parent_of(name) else {})}
+                    for name, filename in self._files.items()
+                ],
+            }
+
+    def _store_name(self, name):
+        return f'profile:{self._files[name]}'
+
+    def _register(self, name):
+        persistence.store.register(self._store_name(name), os.path.join(self._dir, self._files[name]),
+                                   lambda: self._loaded[name], indent=2)
+
+    def _read(self, name):
+        path = os.path.join(self._dir, self._files[name])
+        try:
+            with open(path, 'r') as f:
+                profile = json.load(f)
+            if not isinstance(profile, dict):
+                raise ValueError('not a profile object')
+            return profile
+        except FileNotFoundError:
+            log.warning(f'Profile file for {name!r} is missing — starting it empty')
+        except Exception as e:
+            log.warning(f'Profile file for {name!r} is unreadable ({e}) — starting it empty')
+            persistence.quarantine(path)
+        profile = _default_profile()
+        profile['trigger_apps'] = list(self._triggers.get(name, []))
+        return profile
+
+
+def _attach(data):
+    """Register the index store for a data dict whose 'profiles' is a ProfileShards."""
+    shards = data['profiles']
+    persistence.store.register('profiles', _index_path(),
+                               lambda: shards.index_snapshot(data.get('active', '')), indent=2,
+                               after_write=shards.remove_deleted)
+    return data
+
+
+def _migrate_legacy():
+    """Split a monolithic profiles.json into shards. Returns True if one was migrated."""
+    legacy = _legacy_path()
+    try:
+        with open(legacy, 'r') as f:
+            old = json.load(f)
+        profiles = old['profiles']
+        if not profiles:
+            raise ValueError('no profiles')
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        log.warning(f'Cannot migrate profiles.json: {e}')
+        persistence.quarantine(legacy)
+        return False
+
+    directory = _dir()
+    files     = {}
+    for name, profile in profiles.items():
+        files[name] = _shard_filename(name, set(files.values()))
+        persistence.atomic_write_json(os.path.join(directory, files[name]), profile, indent=2)
+    active = old.get('active') if old.get('active') in profiles else next(iter(profiles))
+    persistence.atomic_write_json(_index_path(), {
+        'version':  _INDEX_VERSION,
+        'active':   active,
+        'profiles': [{'name': n, 'file': files[n], 'trigger_apps': profiles[n].get('trigger_apps', [])}
+                     for n in profiles],
+    }, indent=2)
+    os.replace(legacy, legacy + '.bak')
+    log.info(f'Migrated {len(profiles)} profiles from profiles.json to {directory}')
+    return True
+
+
+def load(existing_macros=None, journaled=True):
+    """Load the profile index and the active profile. On first run, seed Default from existing_macros.
+
+    A legacy profiles.json is split into per-profile files first (kept as
+    profiles.json.bak). An unreadable index is moved aside rather than
+    silently replaced. In journaled mode, edits recorded since the last
+    compaction are replayed on top of the shards.
+    """
+    data = _load_shards(existing_macros)
+    _open_journal(data if journaled else None)
+    return data
+
+
+def _load_shards(existing_macros):
+    if not os.path.exists(_index_path()):
+        _migrate_legacy()
     try:
-        with open(_path(), 'r') as f:
-            data = json.load(f)
-        if 'profiles' not in data or not data['profiles']:
+        with open(_index_path(), 'r') as f:
+            index = json.load(f)
+        entries = [e for e in index.get('profiles', []) if e.get('name')]
+        if not entries:
             raise ValueError
-        if data.get('active') not in data['profiles']:
-            data['active'] = next(iter(data['profiles']))
+        data = _attach({'active': index.get('active'), 'profiles': ProfileShards(_dir(), entries)})
+        if data['active'] not in data['profiles']:
+            data['active'] = entries[0]['name']
+        get_active(data)    # parse the active shard now; the rest load on demand
         return data
-    except (FileNotFoundError, json.JSONDecodeError, ValueError, StopIteration):
-        data = {
-            'active': 'Default',
-            'profiles': {'Default': _default_profile(existing_macros)},
-        }
+    except (FileNotFoundError, json.JSONDecodeError, ValueError, AttributeError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            persistence.quarantine(_index_path())
+        data = _attach({'active': 'Default', 'profiles': ProfileShards(_dir(), [])})
+        data['profiles']['Default'] = _default_profile(existing_macros)
         save(data)
         return data
 
 
-def save(data):
-    path = _path()
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+def save(data, names=None):
+    """Queue a debounced, atomic write of the index and the named profiles.
+
+    names=None writes every profile loaded so far; pass the profiles an edit
+    touched (or () for index-only changes like switching) to write just those.
+    """
+    profiles = data['profiles']
+    if isinstance(profiles, ProfileShards):
+        profiles.mark_dirty(names)              # also invalidates flattened views built on them
+        persistence.store.mark_dirty('profiles')
+    else:
+        persistence.store.register('profiles', _legacy_path(), lambda: data, indent=2)
+        persistence.store.mark_dirty('profiles')
 
 
 def get_names(data):
@@ -67,9 +414,13 @@ def switch(data, name):
     return data
 
 
-def create(data, name):
+def create(data, name, parent=None):
+    """Create a profile. With a parent it starts empty and inherits everything it does not override."""
     if name and name not in data['profiles']:
-        data['profiles'][name] = _default_profile()
+        if parent and parent in data['profiles']:
+            data['profiles'][name] = {'parent': parent, 'macros': {}, 'trigger_apps': []}
+        else:
+            data['profiles'][name] = _default_profile()
         data['active'] = name
     return data
 
@@ -93,31 +444,52 @@ def update_profile(data, macros, encoder_states):
 def set_trigger_apps(data, name, apps):
     if name in data['profiles']:
         data['profiles'][name]['trigger_apps'] = list(apps)
+        _trigger_index(data).set(name, apps)
     return data
 
 
-def find_profile_for_app(data, app_name):
-    """Return the profile name whose trigger_apps contains app_name, or None."""
-    if not app_name:
+def find_profile_for_app(data, app_name, title=''):
+    """Return the profile whose triggers match the foreground app (and window title), or None."""
+    if not app_name and not title:
         return None
-    for name, profile in data['profiles'].items():
-        if app_name in profile.get('trigger_apps', []):
-            return name
-    return None
+    return _trigger_index(data).find(app_name, title)
+
+
+def _trigger_index(data):
+    profiles = data['profiles']
+    if isinstance(profiles, ProfileShards):
+        return profiles.triggers
+    index = TriggerIndex()                 # plain dict (tests, tools) — build one on the fly
+    for name, profile in profiles.items():
+        index.set(name, profile.get('trigger_apps', []))
+    return index
+
+
+def get_trigger_apps(data, name):
+    """Trigger apps for a profile, without loading a sharded profile's macros."""
+    profiles = data['profiles']
+    if isinstance(profiles, ProfileShards):
+        return profiles.trigger_apps(name)
+    return profiles.get(name, {}).get('trigger_apps', [])
 
 
 def duplicate(data, name):
     """Duplicate a profile, returning the new name."""
     if name not in data['profiles']:
         return None
-    import copy
+    new_name = copy_name(data, name)
+    data['profiles'][new_name] = copy.deepcopy(data['profiles'][name])
+    return new_name
+
+
+def copy_name(data, name):
+    """The name duplicate() would give a copy of name."""
     base     = f'{name} (copy)'
     new_name = base
     counter  = 1
     while new_name in data['profiles']:
         new_name = f'{base} {counter}'
         counter += 1
-    data['profiles'][new_name] = copy.deepcopy(data['profiles'][name])
     return new_name
 
 
@@ -126,21 +498,30 @@ def rename(data, old_name, new_name):
         return False
     if new_name in data['profiles']:
         return False
+    children = get_children(data, old_name)
     data['profiles'][new_name] = data['profiles'].pop(old_name)
+    for child in children:
+        data['profiles'][child]['parent'] = new_name
     if data['active'] == old_name:
         data['active'] = new_name
     return True
 
 
 def export_profile(data, name):
-    """Return a standalone dict for the named profile (for file export)."""
-    return {'name': name, 'profile': data['profiles'].get(name, {})}
+    """Return a standalone dict for the named profile (for file export), inherited settings included."""
+    if name not in data['profiles']:
+        return {'name': name, 'profile': {}}
+    profile = copy.deepcopy(resolve(data, name))
+    profile.pop('parent', None)
+    return {'name': name, 'profile': profile}
 
 
 def import_profile(data, exported):
     """Import an exported profile dict. Returns the new profile name."""
     name = exported.get('name', 'Imported')
     profile = exported.get('profile', {})
+    if profile.get('parent') not in data['profiles']:
+        profile.pop('parent', None)
     base = name
     counter = 1
     while name in data['profiles']:
@@ -148,3 +529,453 @@ def import_profile(data, exported):
         counter += 1
     data['profiles'][name] = profile
     return name
+
+
+# ── Inheritance ──────────────────────────────────────────────────────────────
+#
+# A profile with a 'parent' stores only what it overrides: its own macros
+# (None removes an inherited one), per-encoder fields, and 'layers' if it
+# replaces the parent's. resolve() merges the chain root-first and caches
+# the result, keyed on the version of every profile in the chain, so an
+# edit to any ancestor invalidates it and a switch between unchanged
+# profiles costs only the version check.
+
+def _parent_of(data, name):
+    profiles = data['profiles']
+    if isinstance(profiles, ProfileShards):
+        return profiles.parent_of(name)
+    return profiles.get(name, {}).get('parent')
+
+
+def get_parent(data, name):
+    return _parent_of(data, name)
+
+
+def lineage(data, name):
+    """name and its ancestors, nearest first."""
+    return _chain(data, name) if name in data['profiles'] else []
+
+
+def get_children(data, name):
+    """Profiles whose parent is name (reads the index only)."""
+    return [n for n in data['profiles'] if _parent_of(data, n) == name]
+
+
+def _chain(data, name):
+    """name followed by its ancestors, stopping at a missing parent, a cycle or MAX_INHERIT_DEPTH."""
+    chain = [name]
+    parent = _parent_of(data, name)
+    while parent and parent in data['profiles'] and parent not in chain and len(chain) < MAX_INHERIT_DEPTH:
+        chain.append(parent)
+        parent = _parent_of(data, parent)
+    return chain
+
+
+def _flatten(profiles):
+    """Merge a root-first list of profile dicts into one standalone profile."""
+    macros, encoders, layers = {}, [], None
+    for profile in profiles:
+        for command, entry in profile.get('macros', {}).items():
+            if entry is None:
+                macros.pop(command, None)
+            else:
+                macros[command] = entry
+        for i, enc in enumerate(profile.get('encoders') or []):
+            if i < len(encoders):
+                encoders[i] = {**encoders[i], **enc}
+            else:
+                encoders.append({**_DEFAULT_ENCODER, **enc})
+        if 'layers' in profile:
+            layers = profile['layers']
+    own  = profiles[-1]
+    flat = {
+        'macros':       macros,
+        'encoders':     encoders or [dict(_DEFAULT_ENCODER) for _ in range(4)],
+        'trigger_apps': own.get('trigger_apps', []),
+    }
+    if layers is not None:
+        flat['layers'] = layers
+    if own.get('parent'):
+        flat['parent'] = own['parent']
+    return flat
+
+
+def resolve(data, name):
+    """The flattened profile the engine runs: own overrides merged over every ancestor. Do not mutate."""
+    profiles = data['profiles']
+    if name not in profiles:
+        return {}
+    chain = _chain(data, name)
+    if len(chain) == 1 and not profiles[name].get('parent'):
+        return profiles[name]                      # no inheritance — the profile is already flat
+    if not isinstance(profiles, ProfileShards):
+        return _flatten([profiles[n] for n in reversed(chain)])
+    key = tuple((n, profiles.version(n)) for n in chain)
+    hit = profiles.flat.get(name)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    flat = _flatten([profiles[n] for n in reversed(chain)])
+    profiles.flat[name] = (key, flat)
+    return flat
+
+
+def get_resolved_active(data):
+    return resolve(data, data.get('active', ''))
+
+
+def encoder_overrides(data, name, encoders):
+    """Reduce a full encoder list to the fields that differ from what name would inherit."""
+    parent = _parent_of(data, name)
+    if not parent or parent not in data['profiles']:
+        return encoders
+    base = resolve(data, parent).get('encoders', [])
+    out  = []
+    for i, enc in enumerate(encoders):
+        inherited = base[i] if i < len(base) else _DEFAULT_ENCODER
+        out.append({k: v for k, v in enc.items() if inherited.get(k) != v})
+    return out
+
+
+def inherits_macro(data, name, command):
+    """True if name's parent chain provides a binding for command."""
+    parent = _parent_of(data, name)
+    return bool(parent and parent in data['profiles'] and resolve(data, parent)['macros'].get(command))
+
+
+def _touch(data, names):
+    profiles = data['profiles']
+    if isinstance(profiles, ProfileShards):
+        profiles.touch(names)
+
+
+# ── External edits ───────────────────────────────────────────────────────────
+#
+# The data watcher hands over files that changed on disk without the app
+# writing them. The new content replaces what is in memory — nothing is
+# written back — and the journal is compacted straight away, so its older
+# records cannot be replayed over the edit on the next start.
+
+def valid_profile(profile):
+    """True if profile has the shape of a stored profile (all fields optional)."""
+    return (isinstance(profile, dict)
+            and isinstance(profile.get('macros', {}), dict)
+            and isinstance(profile.get('encoders') or [], list)
+            and all(isinstance(e, dict) for e in profile.get('encoders') or [])
+            and isinstance(profile.get('layers', []), list)
+            and isinstance(profile.get('trigger_apps', []), list)
+            and isinstance(profile.get('parent') or '', str))
+
+
+def apply_external_shard(data, filename, profile):
+    """Adopt a profile file edited outside the app. Returns its name, or None if nothing changed."""
+    profiles = data['profiles']
+    if not isinstance(profiles, ProfileShards):
+        return None
+    name = profiles.name_of_file(filename)
+    if name is None or (profiles.is_loaded(name) and profiles[name] == profile):
+        return None
+    profiles.adopt(name, profile)
+    compact(data)
+    log.info(f'Reloaded profile {name!r} after an external edit')
+    return name
+
+
+def apply_external_index(data, index):
+    """Adopt an index.json edited outside the app. Returns the profile names that changed."""
+    profiles = data['profiles']
+    entries  = [e for e in index.get('profiles', []) if isinstance(e, dict) and e.get('name')]
+    if not isinstance(profiles, ProfileShards) or not entries:
+        return set()
+    changed = profiles.adopt_index(entries)
+    if index.get('active') in profiles and index['active'] != data.get('active'):
+        data['active'] = index['active']
+        changed.add(index['active'])
+    if data.get('active') not in profiles:
+        data['active'] = next(iter(profiles))
+        changed.add(data['active'])
+        persistence.store.mark_dirty('profiles')
+    if changed:
+        compact(data)
+        log.info(f'Reloaded the profile index after an external edit ({len(changed)} profiles changed)')
+    return changed
+
+
+# ── Change journal ───────────────────────────────────────────────────────────
+#
+# Content edits are appended to profiles/journal.jsonl as small absolute
+# records (set this macro, replace these encoders) instead of rewriting the
+# profile's shard. load() replays the journal over the shards; once it
+# passes JOURNAL_COMPACT_BYTES a background thread writes the touched shards
+# and drops the records they now contain. Because every content record sets
+# state rather than adjusting it, replaying one the shards already reflect
+# is harmless. Structural edits (rename, duplicate, delete) rewrite files
+# anyway, so they compact the journal on the spot and never need replaying.
+# Each applied record also yields its inverse, kept in memory as the undo
+# history.
+
+_STRUCTURAL = ('rename', 'duplicate', 'delete', 'restore')
+
+class _Journal:
+    def __init__(self, path):
+        self.path       = path
+        self.lock       = threading.RLock()
+        self.file       = None
+        self.seq        = 0
+        self.size       = 0
+        self.touched    = set()      # profiles whose shard is behind the journal
+        self.undo       = collections.deque(maxlen=UNDO_DEPTH)
+        self.compacting = False
+        self.torn       = False
+
+    def append(self, record):
+        self.seq += 1
+        line = json.dumps({'seq': self.seq, **record}, separators=(',', ':')) + '\n'
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(line)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.size += len(line.encode('utf-8'))
+
+    def read(self):
+        """Return the records on disk, stopping at a torn or unreadable line."""
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for n, line in enumerate(f, start=1):
+                    try:
+                        record = json.loads(line)
+                        if not isinstance(record, dict) or 'op' not in record:
+                            raise ValueError('not a journal record')
+                    except ValueError as e:
+                        log.warning(f'Journal line {n} is unreadable ({e}) — ignoring it and the rest')
+                        self.torn = True
+                        break
+                    records.append(record)
+        except FileNotFoundError:
+            pass
+        return records
+
+    def rewrite(self, records):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        data = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records).encode('utf-8')
+        persistence.atomic_write(self.path, data)
+        self.size = len(data)
+
+
+_journal = None
+
+
+def _open_journal(data):
+    global _journal
+    if data is None or not isinstance(data['profiles'], ProfileShards):
+        _journal = None
+        return
+    journal = _Journal(_journal_path())
+    records = journal.read()
+    for record in records:
+        _, touched = _apply(data, record)
+        journal.touched.update(touched)
+    journal.seq = max((r.get('seq', 0) for r in records), default=0)
+    if journal.torn:
+        journal.rewrite(records)     # drop the torn tail so appends start on a clean line
+    elif records:
+        journal.size = os.path.getsize(journal.path)
+    _journal = journal
+    if records:
+        log.info(f'Replayed {len(records)} profile edits from the journal')
+
+
+def record(data, op, **fields):
+    """Apply one edit to data and persist it. Returns False if it changed nothing.
+
+    ops: set_macro(profile, command, entry), delete_macro(profile, command),
+    set_encoders(profile, encoders), set_layers(profile, layers), set_trigger_apps(profile, apps),
+    set_parent(profile, parent), rename(old, new), duplicate(source, new),
+    delete(profile).
+    """
+    return _commit(data, {'op': op, **fields}, undoable=True)
+
+
+def undo(data):
+    """Revert the most recent recorded edit. Returns the record that was applied, or None."""
+    journal = _journal
+    if journal is None:
+        return None
+    with journal.lock:
+        while journal.undo:
+            inverse = journal.undo.pop()
+            if _commit(data, inverse, undoable=False):
+                return inverse
+    return None
+
+
+def can_undo():
+    return bool(_journal and _journal.undo)
+
+
+def _commit(data, rec, undoable):
+    journal = _journal
+    if journal is None:
+        inverse, touched = _apply(data, rec)
+        if inverse is None:
+            return False
+        save(data, touched)
+        return True
+    with journal.lock:
+        inverse, touched = _apply(data, rec)
+        if inverse is None:
+            return False
+        _touch(data, touched)
+        try:
+            journal.append(rec)
+        except OSError as e:
+            log.error(f'Cannot append to the profile journal ({e}) — writing the profile instead')
+            save(data, touched)
+        else:
+            journal.touched.update(touched)
+        if undoable:
+            journal.undo.append(inverse)
+        if rec['op'] in _STRUCTURAL:
+            _compact(data, journal, release=False)
+            return True
+        due = journal.size > JOURNAL_COMPACT_BYTES and not journal.compacting
+        if due:
+            journal.compacting = True
+    if rec['op'] in ('set_trigger_apps', 'set_parent'):
+        persistence.store.mark_dirty('profiles')      # the index carries trigger apps and parents
+    if due:
+        threading.Thread(target=_compact, args=(data, journal), name='journal-compact', daemon=True).start()
+    return True
+
+
+def compact(data):
+    """Fold the journal into the shards now (shutdown). Safe to call in any mode."""
+    journal = _journal
+    if journal is None:
+        return
+    with journal.lock:
+        if journal.compacting or (not journal.touched and not journal.size):
+            return
+        journal.compacting = True
+    _compact(data, journal)
+
+
+def _compact(data, journal, release=True):
+    """Write the touched shards and the index, then drop the records they cover.
+
+    release clears the compacting flag afterwards (the caller set it).
+    """
+    try:
+        with journal.lock:
+            upto    = journal.seq
+            touched = set(journal.touched)
+            journal.touched.clear()
+        profiles = data['profiles']
+        ok = profiles.write_now([n for n in touched if n in profiles])
+        persistence.store.mark_dirty('profiles')
+        ok = not persistence.store.flush(['profiles']) and ok
+        if not ok:
+            with journal.lock:
+                journal.touched.update(touched)
+            log.warning('Journal compaction failed to write profiles — keeping the journal')
+            return
+        with journal.lock:
+            tail = [r for r in journal.read() if r.get('seq', 0) > upto]
+            journal.rewrite(tail)
+        log.info(f'Compacted profile journal ({len(touched)} profiles written, {len(tail)} records kept)')
+    except Exception as e:
+        log.error(f'Journal compaction failed: {e}')
+    finally:
+        if release:
+            journal.compacting = False
+
+
+def _apply(data, rec):
+    """Apply a journal record. Returns (inverse record or None if nothing changed, touched names)."""
+    profiles = data['profiles']
+    op       = rec.get('op')
+    name     = rec.get('profile')
+
+    if op in ('set_macro', 'delete_macro', 'set_encoders', 'set_layers', 'set_trigger_apps'):
+        if name not in profiles:
+            return None, ()
+        profile = profiles[name]
+        if op == 'set_macro':
+            macros = profile.setdefault('macros', {})
+            had    = rec['command'] in macros            # a None entry hides an inherited macro
+            prev   = macros.get(rec['command'])
+            macros[rec['command']] = rec['entry']
+            inverse = ({'op': 'set_macro', 'profile': name, 'command': rec['command'], 'entry': prev} if had else
+                       {'op': 'delete_macro', 'profile': name, 'command': rec['command']})
+        elif op == 'delete_macro':
+            macros = profile.get('macros', {})
+            if rec['command'] not in macros:
+                return None, ()
+            prev = macros.pop(rec['command'])
+            inverse = {'op': 'set_macro', 'profile': name, 'command': rec['command'], 'entry': prev}
+        elif op == 'set_encoders':
+            prev = profile.get('encoders')
+            if rec['encoders'] is None:
+                profile.pop('encoders', None)            # back to inheriting every encoder field
+            else:
+                profile['encoders'] = copy.deepcopy(rec['encoders'])
+            inverse = {'op': 'set_encoders', 'profile': name, 'encoders': prev}
+        elif op == 'set_layers':
+            prev = profile.get('layers')
+            if prev == rec['layers']:
+                return None, ()
+            if rec['layers'] is None:
+                profile.pop('layers', None)              # back to the parent's layers
+            else:
+                profile['layers'] = copy.deepcopy(rec['layers'])
+            inverse = {'op': 'set_layers', 'profile': name, 'layers': prev}
+        else:
+            prev = profile.get('trigger_apps', [])
+            set_trigger_apps(data, name, rec['apps'])
+            inverse = {'op': 'set_trigger_apps', 'profile': name, 'apps': prev}
+        return inverse, (name,)
+
+    if op == 'set_parent':
+        parent = rec.get('parent') or None
+        if name not in profiles or (parent is not None and (parent not in profiles or name in _chain(data, parent))):
+            return None, ()                        # unknown profile, or the link would form a cycle
+        profile = profiles[name]
+        prev    = profile.get('parent')
+        if prev == parent:
+            return None, ()
+        if parent:
+            profile['parent'] = parent
+        else:
+            profile.pop('parent', None)
+        return {'op': 'set_parent', 'profile': name, 'parent': prev}, (name,)
+
+    if op == 'rename':
+        children = get_children(data, rec['old'])
+        if not rename(data, rec['old'], rec['new']):
+            return None, ()
+        return {'op': 'rename', 'old': rec['new'], 'new': rec['old']}, (rec['new'], *children)
+
+    if op == 'duplicate':
+        if rec['source'] not in profiles or rec['new'] in profiles:
+            return None, ()
+        profiles[rec['new']] = copy.deepcopy(profiles[rec['source']])
+        return {'op': 'delete', 'profile': rec['new']}, (rec['new'],)
+
+    if op == 'delete':
+        if name not in profiles or len(profiles) <= 1 or get_children(data, name):
+            return None, ()
+        content = profiles[name]
+        delete(data, name)
+        return {'op': 'restore', 'profile': name, 'content': content}, ()
+
+    if op == 'restore':
+        if name in profiles:
+            return None, ()
+        profiles[name] = rec['content']
+        return {'op': 'delete', 'profile': name}, (name,)
+
+    log.warning(f'Unknown journal op {op!r} — skipped')
+    return None, ()
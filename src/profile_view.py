@@ -0,0 +1,57 @@
+"""
+Immutable snapshot of the active profile for the serial and key-dispatch paths.
+
+Profile edits and switches happen on UI bridge threads and the foreground
+watcher thread, while key and encoder events are handled on the serial
+thread. Instead of those readers walking the live profile dict, writers
+build a complete ActiveProfileView — macro table, compiled keymap,
+resolved encoder targets, mute buttons — and swap it in with one attribute
+assignment. A reader takes the current view once per event and sees either
+the old profile or the new one, never a half-filled mix, without a lock.
+"""
+import copy
+from collections import namedtuple
+from types import MappingProxyType
+from keymap import compile_keymap
+
+# Encoder buttons A–D sit on encoders 0–3; a 'Mute App' macro on one mutes that encoder's app
+BUTTON_ENCODERS = MappingProxyType({'A': 0, 'B': 1, 'C': 2, 'D': 3})
+
+EncoderTarget = namedtuple('EncoderTarget', 'app app_shift config')
+
+
+class ActiveProfileView:
+    __slots__ = ('name', 'macros', 'keymap', 'encoders', 'mute_commands')
+
+    def __init__(self, name, macros, keymap, encoders, mute_commands):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'macros', macros)
+        object.__setattr__(self, 'keymap', keymap)
+        object.__setattr__(self, 'encoders', encoders)
+        object.__setattr__(self, 'mute_commands', mute_commands)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ActiveProfileView is immutable — build a new one')
+
+    def encoder(self, enc_id):
+        """EncoderTarget for an encoder index, or None if the profile does not configure it."""
+        return self.encoders[enc_id] if 0 <= enc_id < len(self.encoders) else None
+
+
+def build(name, profile, shift_key='', default_encoders=()):
+    """Precompute everything the hot paths need from one profile dict."""
+    macros   = copy.deepcopy(profile.get('macros', {}))
+    encoders = tuple(
+        EncoderTarget(enc.get('app', ''), enc.get('app_shift', ''), MappingProxyType(copy.deepcopy(enc)))
+        for enc in (profile.get('encoders') or default_encoders)
+    )
+    return ActiveProfileView(
+        name          = name,
+        macros        = MappingProxyType(macros),
+        keymap        = compile_keymap(macros, profile.get('layers', []), shift_key),
+        encoders      = encoders,
+        mute_commands = frozenset(c for c, m in macros.items() if m.get('type') == 'Mute App'),
+    )
+
+
+EMPTY = build('', {})
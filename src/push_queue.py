@@ -0,0 +1,110 @@
+"""
+Frame-batched event delivery to the webview.
+
+MacroPadAPI._push() only appends to this queue, so the serial thread never
+waits on the webview. A drain thread delivers whatever has accumulated at
+most once per FRAME_S as a single JS call. Events that only report the
+latest state are merged while they wait: a newer encoder_turn for the same
+encoder, or a newer update_progress, replaces the queued one and takes its
+place at the end of the queue, so it never overtakes events pushed before it.
+"""
+import json
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+FRAME_S = 0.016
+
+# event → merge key of a payload (None = keep every event of this kind)
+MERGE = {
+    'encoder_turn':    lambda p: p.get('id'),
+    'update_progress': lambda p: '',
+    'bundle_progress': lambda p: p.get('op') if p.get('state') == 'running' else None,
+}
+
+
+def deliver_to_window(window, batch):
+    """Hand one batch of [event, payload] pairs to the React app in a pywebview window."""
+    safe = json.dumps(batch).replace("'", "\\'")
+    window.evaluate_js(
+        f"window.__macropadBatch && window.__macropadBatch({safe})",
+        callback=lambda _: None,
+    )
+
+
+class PushQueue:
+    def __init__(self, deliver, frame_s=FRAME_S):
+        self._deliver = deliver        # deliver([[event, payload], ...]) — one call per frame
+        self._frame   = frame_s
+        self._cv      = threading.Condition()
+        self._pending = {}             # (event, merge key) or sequence number → [event, payload], in order
+        self._seq     = 0
+        self._thread  = None
+        self._running = False
+        self._stats   = {'pushed': 0, 'merged': 0, 'batches': 0, 'delivered': 0}
+
+    def push(self, event, payload):
+        with self._cv:
+            self._stats['pushed'] += 1
+            keyfn = MERGE.get(event)
+            key   = keyfn(payload) if keyfn else None
+            if key is None:
+                self._seq += 1
+                slot = self._seq
+            else:
+                slot = (event, key)
+                if self._pending.pop(slot, None) is not None:
+                    self._stats['merged'] += 1      # re-inserted below, at the end
+            self._pending[slot] = [event, payload]
+            if self._thread is None:
+                self._running = True
+                self._thread  = threading.Thread(target=self._run, name='ui-push', daemon=True)
+                self._thread.start()
+            self._cv.notify()
+
+    def stop(self):
+        """Deliver what is queued and stop the drain thread."""
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+            thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+        self._drain()
+
+    def stats(self):
+        with self._cv:
+            return {**self._stats, 'queued': len(self._pending)}
+
+    def _take(self):
+        with self._cv:
+            batch, self._pending = list(self._pending.values()), {}
+            return batch
+
+    def _drain(self):
+        batch = self._take()
+        if not batch:
+            return
+        try:
+            self._deliver(batch)
+        except Exception as e:
+            log.debug(f'UI push failed: {e}')
+        with self._cv:
+            self._stats['batches']   += 1
+            self._stats['delivered'] += len(batch)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while self._running and not self._pending:
+                    self._cv.wait()
+                if not self._running:
+                    self._thread = None
+                    return
+            started = time.monotonic()
+            self._drain()
+            rest = self._frame - (time.monotonic() - started)
+            if rest > 0:
+                time.sleep(rest)       # let the next frame's events accumulate (and merge)
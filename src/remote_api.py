@@ -0,0 +1,119 @@
+"""
+js_api for a window attached to the headless daemon (main_webview --attach).
+
+Every MacroPadAPI method the daemon serves is forwarded over IPC; window
+chrome (minimize, maximize, close), file dialogs and the local tools
+(recording, firmware upload, update — never served over IPC) run here, next
+to the window. UI events the daemon pushes arrive on the IPC reader thread and are
+handed to the page exactly as the in-process app does.
+"""
+import logging
+from ipc import IpcClient, IpcError
+from local_tools import LocalTools
+from push_queue import deliver_to_window
+
+log = logging.getLogger(__name__)
+
+
+class RemoteAPI(LocalTools):
+    def __init__(self, client):
+        self._client    = client
+        self._window    = None
+        self._maximized = False
+        self._resume    = None      # (port, baud) to reconnect the daemon to after a firmware upload
+
+    # ── window reference ──────────────────────────────────────────────────────
+    def set_window(self, window):
+        self._window = window
+
+    def minimize_window(self):
+        if self._window: self._window.minimize()
+        return {'ok': True}
+
+    def toggle_maximize_window(self):
+        if self._window:
+            if self._maximized:
+                self._window.restore()
+            else:
+                self._window.maximize()
+            self._maximized = not self._maximized
+        return {'ok': True, 'maximized': self._maximized}
+
+    def close_window(self):
+        """Close only the window — the daemon keeps the pad running."""
+        if self._window: self._window.destroy()
+        return {'ok': True}
+
+    def shutdown(self):
+        self._client.close()
+
+    # ── Calls that need the window ────────────────────────────────────────────
+    def startup(self):
+        """The daemon is already running — subscribe to its events and fetch the current state."""
+        self._client.subscribe()
+        return self._client.call('get_state', 0)
+
+    def export_bundle(self, names=None, include_settings=True, path=None):
+        from bundles import ask_path
+        path = path or ask_path(self._window, save=True)
+        if not path:
+            return {'ok': False, 'cancelled': True}
+        return self._client.call('export_bundle', names, include_settings, path)
+
+    def import_bundle(self, include_settings=False, path=None):
+        from bundles import ask_path
+        path = path or ask_path(self._window, save=False)
+        if not path:
+            return {'ok': False, 'cancelled': True}
+        return self._client.call('import_bundle', include_settings, path)
+
+    def _on_events(self, batch):
+        if self._window:
+            deliver_to_window(self._window, batch)
+
+    # ── LocalTools hooks ──────────────────────────────────────────────────────
+    def _push(self, event, payload):
+        self._on_events([[event, payload]])
+
+    def _release_port(self):
+        """Have the daemon let go of the pad so arduino-cli can open its port."""
+        info = self._client.call('get_device_info')
+        if info.get('connected'):
+            settings     = self._client.call('get_settings')
+            self._resume = (info.get('port') or settings.get('port'), settings.get('baud_rate'))
+        self._client.call('disconnect')
+
+    def _reclaim_port(self):
+        if self._resume:
+            try:
+                self._client.call('connect', *self._resume)
+            except IpcError as e:
+                log.warning(f'Could not reconnect the daemon to the pad: {e}')
+            self._resume = None
+
+    def _exit_for_update(self):
+        try:
+            self._client.call('quit')       # only the daemon serves quit; a windowed host closes itself
+        except IpcError:
+            pass
+        self.shutdown()
+        if self._window:
+            self._window.destroy()
+
+
+def _forward(name):
+    def call(self, *args):
+        return self._client.call(name, *args)
+    call.__name__ = name
+    return call
+
+
+def connect():
+    """Attach to the running daemon. Raises IpcError if there is none."""
+    holder = []
+    client = IpcClient(on_events=lambda batch, topic: holder and holder[0]._on_events(batch))
+    methods = {name: _forward(name) for name in client.methods if not hasattr(RemoteAPI, name)}
+    api = type('RemoteMacroPadAPI', (RemoteAPI,), methods)(client)
+    holder.append(api)
+    log.info(f'Attached to the MacroPad daemon ({len(client.methods)} methods)')
+    return api
@@ -0,0 +1,78 @@
+"""
+One shared timer thread for short deferred callbacks (hold thresholds, chord
+and double-tap windows, auto-repeat ticks).
+
+A heap of deadlines is served by a single daemon thread, so holding several
+keys never costs a thread per key. Callbacks run on that thread and must be
+quick — anything that may block (executing a macro) should be handed off.
+"""
+import heapq
+import itertools
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class Handle:
+    __slots__ = ('when', 'fn', 'args', 'cancelled')
+
+    def __init__(self, when, fn, args):
+        self.when      = when
+        self.fn        = fn
+        self.args      = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, name='scheduler'):
+        self._name   = name
+        self._heap   = []
+        self._seq    = itertools.count()
+        self._cv     = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay_s, fn, *args):
+        handle = Handle(time.monotonic() + max(0.0, delay_s), fn, args)
+        with self._cv:
+            heapq.heappush(self._heap, (handle.when, next(self._seq), handle))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cv.notify()
+        return handle
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._heap:
+                    self._cv.wait()
+                when, _, handle = self._heap[0]
+                delay = when - time.monotonic()
+                if delay > 0:
+                    self._cv.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+            if handle.cancelled:
+                continue
+            try:
+                handle.fn(*handle.args)
+            except Exception as e:
+                log.warning(f'Scheduled callback {getattr(handle.fn, "__name__", handle.fn)} failed: {e}')
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared():
+    """The process-wide scheduler, started on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Scheduler()
+        return _shared
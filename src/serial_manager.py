@@ -3,18 +3,51 @@ import threading
 import time
 import logging
 from serial.tools import list_ports as sp_list_ports
-from volume_manager import VolumeManager
 
 log = logging.getLogger(__name__)
 
 _DEVICE_ID  = 'MACROPAD_OK'
+_READY      = 'READY'
+_CAPS       = 'CAPS:'
 _PING_CMD   = b'PING\n'
+_CAPS_CMD   = b'CAPS?\n'
+
+HANDSHAKE_S   = 0.3    # a running pad answers PING within this; a later answer means it was booting
+VERIFY_S      = 10.0   # warm connect: give up on the trusted port if it never answers
+BOOT_WAIT_S   = 10.0   # longest a reset pad takes to report READY (first-boot EEPROM reinit included)
+LEGACY_LINE_S = 0.06   # pacing for firmware without a CAPS line: one command per write
 
 
 def list_ports():
     return [p.device for p in sp_list_ports.comports()]
 
 
+def parse_caps(line):
+    """'CAPS:v=1;fw=1.1;rate=200;cmds=PING,BRIGHT' → {'v': 1, 'fw': '1.1', 'rate': 200, 'cmds': [...]}"""
+    caps = {}
+    for field in line[len(_CAPS):].split(';'):
+        key, sep, value = field.partition('=')
+        if not sep:
+            continue
+        if key == 'cmds':
+            caps[key] = [c for c in value.split(',') if c]
+        else:
+            caps[key] = int(value) if value.isdigit() else value
+    return caps
+
+
+def port_fingerprint(port):
+    """USB identity of the device on port (VID:PID:serial), or None if unknown."""
+    if '://' in port:
+        return None
+    for info in sp_list_ports.comports():
+        if info.device == port:
+            if info.vid is None:
+                return None
+            return f'{info.vid:04X}:{info.pid:04X}:{info.serial_number or ""}'
+    return None
+
+
 def find_macropad_port(baud_rate=115200):
     """Scan all serial ports and return the one that identifies as our MacroPad."""
     for info in sp_list_ports.comports():
@@ -49,15 +82,22 @@ class SerialManager:
     _RECONNECT_DELAY = 3.0
 
     def __init__(self, data_callback, port='COM6', baud_rate=115200,
-                 connected_callback=None):
+                 connected_callback=None, fingerprint=None):
         self.data_callback      = data_callback
         self.connected_callback = connected_callback
         self.port               = port
         self.baud_rate          = baud_rate
+        self.fingerprint        = fingerprint   # last-known device identity — enables a warm connect
+        self.warm               = False         # current connection skipped the reset and boot wait
+        self._confirm_by        = None          # warm connect: deadline for MACROPAD_OK
+        self._opened_at         = 0.0
+        self._last_ping         = 0.0
+        self._ready             = threading.Event()   # booted and answering (READY or MACROPAD_OK seen)
+        self.caps               = {}                  # from the firmware's CAPS line; {} for older firmware
         self.serial_port        = None
         self.running            = False
         self.thread             = None
-        self.volume_manager     = VolumeManager()
+        self._volume_manager    = None
         self._connected         = False
         self._stop_event        = threading.Event()
         self.start()
@@ -66,6 +106,41 @@ class SerialManager:
     def is_connected(self):
         return self._connected
 
+    @property
+    def volume_manager(self):
+        """Created on first use, so pycaw/comtypes load with the first encoder turn, not at connect."""
+        if self._volume_manager is None:
+            from volume_manager import VolumeManager
+            self._volume_manager = VolumeManager()
+        return self._volume_manager
+
+    def wait_ready(self, timeout=BOOT_WAIT_S):
+        """Block until the pad has finished booting. False on timeout."""
+        return self._ready.wait(timeout)
+
+    def batches(self, commands):
+        """Split commands into writes the firmware can absorb: yields (batch, pause_s).
+
+        With a CAPS line each write fills at most half the pad's receive buffer
+        and is followed by the time the pad needs to work through it. Older
+        firmware gets one command per write, LEGACY_LINE_S apart.
+        """
+        rate, rx = self.caps.get('rate'), self.caps.get('rx')
+        if not (isinstance(rate, int) and rate > 0 and isinstance(rx, int) and rx > 0):
+            for cmd in commands:
+                yield [cmd], LEGACY_LINE_S
+            return
+        budget, batch, size = rx // 2, [], 0
+        for cmd in commands:
+            n = len(cmd) + 1
+            if batch and size + n > budget:
+                yield batch, len(batch) / rate
+                batch, size = [], 0
+            batch.append(cmd)
+            size += n
+        if batch:
+            yield batch, len(batch) / rate
+
     def start(self):
         self.stop()
         self._stop_event.clear()
@@ -96,14 +171,18 @@ class SerialManager:
             self.serial_port.reset_input_buffer()
             self.serial_port.write(_PING_CMD)
             self.serial_port.flush()
-            deadline  = time.monotonic() + 10.0  # covers full startup + first-boot EEPROM reinit
+            deadline  = time.monotonic() + BOOT_WAIT_S   # covers full startup + first-boot EEPROM reinit
             last_ping = time.monotonic()
             while time.monotonic() < deadline and self.running:
                 line = self.serial_port.readline()
-                if line and line.decode('utf-8', errors='replace').strip() == _DEVICE_ID:
+                decoded = line.decode('utf-8', errors='replace').strip() if line else ''
+                if decoded == _DEVICE_ID:
                     return True
-                # Re-ping every 2 s in case the first was swallowed during reset
-                if time.monotonic() - last_ping > 2.0:
+                if decoded.startswith(_CAPS):
+                    self.caps = parse_caps(decoded)
+                # Re-ping every 2 s in case the first was swallowed during reset,
+                # and at once when the firmware says it has finished booting
+                if decoded == _READY or time.monotonic() - last_ping > 2.0:
                     self.serial_port.write(_PING_CMD)
                     self.serial_port.flush()
                     last_ping = time.monotonic()
@@ -111,13 +190,86 @@ class SerialManager:
         except Exception:
             return False
 
+    def _open_without_reset(self):
+        ser = serial.serial_for_url(self.port, do_not_open=True)
+        ser.baudrate = self.baud_rate
+        ser.dtr      = False   # keep a running device running — no reset, no boot wait
+        ser.timeout  = 1
+        ser.open()
+        return ser
+
+    def _warm_connect(self):
+        """Trust the port if it still holds the last-known device; MACROPAD_OK is awaited in the background."""
+        if not self.fingerprint or port_fingerprint(self.port) != self.fingerprint:
+            return False
+        self.serial_port = self._open_without_reset()
+        self._ready.clear()
+        self._write(_PING_CMD)
+        self._opened_at  = time.monotonic()
+        self._last_ping  = self._opened_at
+        self._confirm_by = self._opened_at + VERIFY_S
+        self.warm        = True
+        return True
+
+    def _write(self, data):
+        self.serial_port.write(data)
+        self.serial_port.flush()
+
+    def _on_handshake_line(self, line):
+        """READY / MACROPAD_OK / CAPS lines from the firmware. True if line was one of them."""
+        if line.startswith(_CAPS):
+            self.caps = parse_caps(line)
+            log.info(f'MacroPad firmware {self.caps.get("fw", "?")} (protocol {self.caps.get("v", "?")}), '
+                     f'{self.caps.get("rate", "?")} lines/s, {self.caps.get("rx", "?")} byte buffer')
+            return True
+        if line not in (_READY, _DEVICE_ID):
+            return False
+        rebooted = line == _READY and self._ready.is_set()
+        self._ready.set()
+        if line == _READY or not self.caps:
+            self._write(_CAPS_CMD)
+        if self._confirm_by is not None:
+            now = time.monotonic()
+            self._confirm_by = None
+            log.info(f'MacroPad on {self.port} confirmed after {(now - self._opened_at) * 1000:.0f} ms')
+            if now - self._opened_at > HANDSHAKE_S and self.connected_callback:
+                self.connected_callback(True)    # it was booting — what we sent may be lost, so send again
+        elif rebooted:
+            log.info(f'MacroPad on {self.port} restarted — sending its state again')
+            if self.connected_callback:
+                self.connected_callback(True)
+        return True
+
+    def _tick(self):
+        """After every read (or read timeout) until the pad is ready. False if the warm connect failed."""
+        now = time.monotonic()
+        if self._confirm_by is not None and now > self._confirm_by:
+            log.warning(f'{self.port} no longer answers as MacroPad — running a full scan')
+            self.fingerprint = None
+            self._confirm_by = None
+            self._close_port()
+            if self.connected_callback:
+                self.connected_callback(False)
+            return False
+        if not self._ready.is_set() and now - self._last_ping > 1.0:
+            self._write(_PING_CMD)            # firmware without READY answers this once it has booted
+            self._last_ping = now
+        return True
+
     def _run(self):
         _logged_error = None
         _verified     = False   # only verify on the first connection this session
         while self.running:
             if not self._connected:
                 try:
-                    self.serial_port = serial.Serial(self.port, self.baud_rate, timeout=1)
+                    if not _verified and self._warm_connect():
+                        _verified = True
+                    else:
+                        self.warm        = False
+                        # serial_for_url also takes socket://host:port, e.g. the device simulator
+                        self.serial_port = serial.serial_for_url(self.port, self.baud_rate, timeout=1)
+                        self._ready.clear()           # opening resets the ESP32
+                        self._last_ping  = time.monotonic()
 
                     if not _verified:
                         if not self._verify_device():
@@ -131,10 +283,13 @@ class SerialManager:
                                 self._stop_event.wait(self._RECONNECT_DELAY)
                             continue
                         _verified = True
+                        self.fingerprint = port_fingerprint(self.port)
+                        self._ready.set()
+                        self._write(_CAPS_CMD)
 
                     self._connected = True
                     _logged_error   = None
-                    log.info(f'MacroPad identified on {self.port} @ {self.baud_rate}')
+                    log.info(f'MacroPad {"trusted" if self.warm else "identified"} on {self.port} @ {self.baud_rate}')
                     if self.connected_callback:
                         self.connected_callback(True)
                 except serial.SerialException as e:
@@ -150,10 +305,15 @@ class SerialManager:
                 if line and self.running:
                     try:
                         decoded = line.decode('utf-8', errors='replace').strip()
-                        if decoded:
+                        if decoded and not self._on_handshake_line(decoded):
                             self.data_callback(decoded)
+                    except serial.SerialException:
+                        raise
                     except Exception as e:
                         log.debug(f'Error dispatching serial data: {e}')
+                if self.running and not self._ready.is_set() and not self._tick():
+                    _verified = False
+                    continue
             except serial.SerialException as e:
                 log.warning(f'Serial read error: {e}')
                 self._close_port()
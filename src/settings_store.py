@@ -0,0 +1,107 @@
+"""
+In-memory settings store — the source of truth for settings_serial.json.
+
+The file is read once; after that every get() is a dict lookup and every
+set() updates memory, notifies subscribers and marks the file dirty for the
+debounced atomic writer, so dragging a slider costs no disk I/O per step.
+Known keys are coerced to their declared type; unknown keys are kept as-is.
+"""
+import json
+import threading
+import logging
+import persistence
+from utils import get_data_path
+
+log = logging.getLogger(__name__)
+
+_FILENAME = 'settings_serial.json'
+
+# key → (type, default)
+SCHEMA = {
+    'port':               (str, 'COM6'),
+    'baud_rate':          (str, '115200'),
+    'brightness_pct':     (int, 10),
+    'enc_led_timeout':    (int, 2),
+    'effect_speed_ms':    (int, 10),
+    'shift_key':          (str, ''),
+    'paste_threshold':    (int, 64),
+    'switch_dwell_ms':    (int, 150),
+    'chord_window_ms':    (int, 50),       # second chord key must land within this
+    'double_tap_ms':      (int, 250),      # wait for a second tap before firing the press
+    'device_fingerprint': (str, ''),     # USB VID:PID:serial of the last verified pad
+}
+
+
+def _coerce(key, value):
+    spec = SCHEMA.get(key)
+    if spec is None or value is None:
+        return value
+    typ, default = spec
+    try:
+        return typ(value)
+    except (TypeError, ValueError):
+        log.warning(f'Invalid value {value!r} for setting {key!r} — using {default!r}')
+        return default
+
+
+class SettingsStore:
+    def __init__(self, path=None):
+        self._path   = path or get_data_path(_FILENAME)
+        self._lock   = threading.Lock()
+        self._values = {}
+        self._subs   = []
+        persistence.store.register('settings', self._path, self.as_dict)
+
+    def load(self):
+        """Read the file once. Missing keys fall back to the schema defaults."""
+        values = {k: default for k, (_, default) in SCHEMA.items()}
+        try:
+            with open(self._path, 'r') as f:
+                stored = json.load(f)
+            values.update({k: _coerce(k, v) for k, v in stored.items()})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f'Failed to load settings, using defaults: {e}')
+            persistence.quarantine(self._path)
+        with self._lock:
+            self._values = values
+        return self
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._values)
+
+    def set(self, key, value):
+        """Set one value. Returns False if it was unchanged (nothing written or notified)."""
+        return self.update({key: value})
+
+    def update(self, changes: dict, persist=True):
+        """Apply several values at once. persist=False when they were read from the file (external edit)."""
+        changed = {}
+        with self._lock:
+            for key, value in changes.items():
+                value = _coerce(key, value)
+                if self._values.get(key) != value:
+                    self._values[key] = value
+                    changed[key] = value
+        if changed:
+            if persist:
+                persistence.store.mark_dirty('settings')
+            self._notify(changed)
+        return bool(changed)
+
+    def subscribe(self, callback):
+        """callback(changed: dict) runs after every effective change. Returns an unsubscribe function."""
+        self._subs.append(callback)
+        return lambda: self._subs.remove(callback)
+
+    def _notify(self, changed):
+        for callback in list(self._subs):
+            try:
+                callback(changed)
+            except Exception as e:
+                log.warning(f'Settings subscriber failed: {e}')
@@ -0,0 +1,84 @@
+"""
+Versioned copy of the state the UI renders, synced to the frontend as patches.
+
+publish(state) diffs the new state against the last one and, if anything
+changed, bumps the version and emits a patch:
+
+    {'from': 4, 'to': 5, 'ops': [[path, value], [path], ...]}
+
+An op with a value sets that path; an op without one deletes it. Paths go
+one level into dicts (['macros', 'KP:3']) and lists of equal length
+(['encoders', 2]), so editing one macro ships one macro, not the profile.
+Patches are emitted while the store's lock is held, so they reach the push
+queue in version order. A client that missed some asks since(version) and
+gets the patches it lacks, or a full snapshot once they have aged out.
+"""
+import collections
+import threading
+
+HISTORY = 256      # patches kept for clients catching up
+
+
+def diff(old, new):
+    """Ops turning the top-level dict old into new."""
+    ops = []
+    for key, value in new.items():
+        if key not in old:
+            ops.append([[key], value])
+            continue
+        prev = old[key]
+        if prev == value:
+            continue
+        if isinstance(prev, dict) and isinstance(value, dict):
+            ops += [[[key, k], v] for k, v in value.items() if k not in prev or prev[k] != v]
+            ops += [[[key, k]] for k in prev if k not in value]
+        elif isinstance(prev, list) and isinstance(value, list) and len(prev) == len(value):
+            ops += [[[key, i], v] for i, (p, v) in enumerate(zip(prev, value)) if p != v]
+        else:
+            ops.append([[key], value])
+    ops += [[[key]] for key in old if key not in new]
+    return ops
+
+
+class StateStore:
+    def __init__(self, on_patch=None):
+        self._on_patch = on_patch
+        self._lock     = threading.Lock()
+        self._version  = 0
+        self._state    = {}
+        self._history  = collections.deque(maxlen=HISTORY)
+
+    @property
+    def version(self):
+        return self._version
+
+    def publish(self, state):
+        """Adopt a new full state (the store keeps it; do not mutate it afterwards).
+
+        Returns the patch, or None if nothing changed.
+        """
+        with self._lock:
+            ops = diff(self._state, state)
+            if not ops:
+                return None
+            self._state   = state
+            self._version += 1
+            patch = {'from': self._version - 1, 'to': self._version, 'ops': ops}
+            self._history.append(patch)
+            if self._on_patch is not None:
+                self._on_patch(patch)
+            return patch
+
+    def snapshot(self):
+        with self._lock:
+            return {'version': self._version, 'state': self._state}
+
+    def since(self, version):
+        """What a client at version needs: {'version', 'patches'} or, if too far behind, {'version', 'state'}."""
+        with self._lock:
+            if version == self._version:
+                return {'version': self._version, 'patches': []}
+            if 0 < version < self._version and self._history and self._history[0]['from'] <= version:
+                return {'version': self._version,
+                        'patches': [p for p in self._history if p['from'] >= version]}
+        return self.snapshot()
@@ -0,0 +1,98 @@
+"""
+Debounced automatic profile switching.
+
+Foreground changes arrive in bursts — alt-tabbing past five windows is five
+changes in a second. SwitchController.request() only records the latest
+target; a switch is committed once that target has stayed put for dwell_s,
+so the windows passed on the way cost nothing. request(None) (a window no
+profile claims) also counts as a target, and cancels a pending switch.
+
+Device resyncs go through resync(), which hands each one a cancel token
+(a threading.Event) and sets the token of any resync still in flight, so
+a newer switch stops an older one between commands instead of
+interleaving with it.
+"""
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+DWELL_S = 0.15
+
+
+class SwitchController:
+    def __init__(self, commit, dwell_s=DWELL_S):
+        self.dwell_s  = dwell_s
+        self._commit  = commit        # commit(target) → True if it switched
+        self._cv      = threading.Condition()
+        self._pending = None          # (target, due) — only the latest request is kept
+        self._token   = None          # cancel token of the resync in flight
+        self._thread  = None
+        self._stats   = {'requests': 0, 'superseded': 0, 'switches': 0, 'resyncs': 0, 'cancelled': 0}
+
+    def request(self, target):
+        """Ask for target to become active once it has been in front for dwell_s."""
+        with self._cv:
+            self._stats['requests'] += 1
+            if self._pending is not None:
+                self._stats['superseded'] += 1
+            self._pending = (target, time.monotonic() + self.dwell_s)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-switch', daemon=True)
+                self._thread.start()
+            self._cv.notify()
+
+    def cancel_pending(self):
+        """Drop a switch that has not been committed yet (e.g. the user switched by hand)."""
+        with self._cv:
+            if self._pending is not None:
+                self._stats['superseded'] += 1
+                self._pending = None
+
+    def resync(self, send):
+        """Run send(token) on a new thread, cancelling the resync it supersedes."""
+        token = threading.Event()
+        with self._cv:
+            if self._token is not None:
+                self._token.set()
+                self._stats['cancelled'] += 1
+            self._token = token
+            self._stats['resyncs'] += 1
+
+        def _run():
+            try:
+                send(token)
+            finally:
+                with self._cv:
+                    if self._token is token:
+                        self._token = None
+
+        threading.Thread(target=_run, name='device-resync', daemon=True).start()
+
+    def stats(self):
+        with self._cv:
+            return {**self._stats, 'dwell_ms': round(self.dwell_s * 1000),
+                    'pending': self._pending[0] if self._pending else None}
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while True:
+                    if self._pending is None:
+                        self._thread = None
+                        return
+                    target, due = self._pending
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        self._pending = None
+                        break
+                    self._cv.wait(wait)
+            if target is None:
+                continue
+            try:
+                if self._commit(target):
+                    with self._cv:
+                        self._stats['switches'] += 1
+            except Exception as e:
+                log.warning(f'Profile switch to {target!r} failed: {e}')
@@ -0,0 +1,141 @@
+"""
+Trigger-app index for automatic profile switching.
+
+A profile's trigger_apps entries take these forms:
+    spotify.exe         exact process name (case-insensitive)
+    chrome*.exe         wildcard on the process name (* ? [..])
+    re:^code.*\\.exe$    regular expression searched in the process name
+    title:*YouTube*     wildcard on the foreground window title
+    title:re:Jira|Confluence   regular expression searched in the window title
+
+Lookups follow an explicit priority: a title trigger beats an exact name,
+which beats a name pattern. Within one kind, the profile listed first wins.
+Exact names are a dict lookup; each pattern kind is compiled into one
+alternation regex, so a foreground change costs one dict hit and at most
+two regex passes however many profiles there are.
+"""
+import fnmatch
+import re
+import threading
+import logging
+
+log = logging.getLogger(__name__)
+
+PRIORITY = ('title', 'exact', 'pattern')
+
+_WILDCARD = re.compile(r'[*?\[]')
+
+
+def parse(trigger):
+    """Return (kind, key) for a trigger string; kind is 'exact', 'pattern' or 'title', or None if invalid."""
+    trigger = str(trigger).strip()
+    kind    = 'pattern'
+    if trigger.lower().startswith('title:'):
+        kind, trigger = 'title', trigger[6:].strip()
+    if not trigger:
+        return None
+    if trigger.startswith('re:'):
+        source = trigger[3:]
+        try:
+            re.compile(source)
+        except re.error as e:
+            log.warning(f'Ignoring trigger {trigger!r}: {e}')
+            return None
+        return kind, f'.*?(?:{source}).*'
+    if _WILDCARD.search(trigger):
+        return kind, fnmatch.translate(trigger)
+    if kind == 'title':
+        return kind, f'.*?{re.escape(trigger)}.*'      # plain title text matches as a substring
+    return 'exact', trigger.casefold()
+
+
+class _Matcher:
+    """Several (profile, regex) entries compiled into one alternation, in priority order."""
+
+    def __init__(self, entries):
+        self._profiles = [profile for profile, _ in entries]
+        self._rx       = None
+        self._each     = None
+        if not entries:
+            return
+        source = '|'.join(f'(?P<_t{i}>{rx})' for i, (_, rx) in enumerate(entries))
+        try:
+            self._rx = re.compile(source, re.IGNORECASE | re.DOTALL)
+        except re.error:
+            # e.g. two user regexes defining the same group name — match them one by one
+            self._each = [re.compile(rx, re.IGNORECASE | re.DOTALL) for _, rx in entries]
+
+    def match(self, text):
+        if self._rx is not None:
+            m = self._rx.fullmatch(text)
+            return self._profiles[int(m.lastgroup[2:])] if m else None
+        for profile, rx in zip(self._profiles, self._each or ()):
+            if rx.fullmatch(text):
+                return profile
+        return None
+
+
+class TriggerIndex:
+    def __init__(self):
+        self._position = {}      # profile → order, for tie-breaking
+        self._triggers = {}      # profile → [(kind, key)]
+        self._exact    = {}      # casefolded app name → [profiles]
+        self._matchers = None    # {'pattern': _Matcher, 'title': _Matcher}, rebuilt lazily
+        self._next     = 0
+        self._lock     = threading.Lock()
+
+    def set(self, profile, triggers):
+        """Replace a profile's triggers."""
+        parsed = [p for p in (parse(t) for t in triggers or ()) if p]
+        with self._lock:
+            self._drop_exact(profile)
+            if profile not in self._position:
+                self._position[profile] = self._next
+                self._next += 1
+            self._triggers[profile] = parsed
+            for kind, key in parsed:
+                if kind == 'exact':
+                    owners = self._exact.setdefault(key, [])
+                    if profile not in owners:
+                        owners.append(profile)
+            self._matchers = None
+
+    def remove(self, profile):
+        with self._lock:
+            self._drop_exact(profile)
+            self._triggers.pop(profile, None)
+            self._position.pop(profile, None)
+            self._matchers = None
+
+    def find(self, app_name, title=''):
+        """Return the profile that should be active for this foreground window, or None."""
+        with self._lock:
+            matchers = self._matchers or self._compile()
+            owners   = self._exact.get((app_name or '').casefold())
+            exact    = min(owners, key=self._position.__getitem__) if owners else None
+        for kind in PRIORITY:
+            if kind == 'exact':
+                found = exact
+            else:
+                text  = title if kind == 'title' else app_name
+                found = matchers[kind].match(text) if text else None
+            if found:
+                return found
+        return None
+
+    def _drop_exact(self, profile):
+        for kind, key in self._triggers.get(profile, ()):
+            if kind == 'exact':
+                owners = self._exact.get(key)
+                if owners and profile in owners:
+                    owners.remove(profile)
+                    if not owners:
+                        del self._exact[key]
+
+    def _compile(self):
+        profiles = sorted(self._triggers, key=self._position.__getitem__)
+        self._matchers = {
+            kind: _Matcher([(p, key) for p in profiles for k, key in self._triggers[p] if k == kind])
+            for kind in ('pattern', 'title')
+        }
+        return self._matchers
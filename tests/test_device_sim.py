@@ -0,0 +1,246 @@
+"""
+Handshake and resync against the device simulator
+-------------------------------------------------
+DeviceSim stands in for the pad and FakeSource for the foreground window, so
+these run anywhere pyserial is installed:
+
+    python -m pytest tests
+
+The simulator and watcher checks need nothing beyond the standard library;
+the MacroPadAPI ones connect over socket:// and are skipped without pyserial.
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from device_sim import DeviceSim, serve_socket                       # noqa: E402
+from foreground_watcher import FakeSource, ForegroundWatcher         # noqa: E402
+
+DEFAULT_LED = '1:colorfade(0,200,0,200,0,0,0)'
+RED_LED     = '1:color(255,0,0)'
+
+
+def _wait(cond, timeout=5.0):
+    """Poll cond() until it is true; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return cond()
+
+
+def _lines(chunks):
+    return b''.join(chunks).decode().splitlines()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# ── Simulator ────────────────────────────────────────────────────────────────
+
+def test_sim_boots_and_answers_handshake():
+    out = []
+    sim = DeviceSim(out.append, caps={'rate': 0, 'rx': 256})
+    try:
+        sim.feed(b'PING\n')                   # still "booting": lost, as on the pad
+        assert sim.stats['rx_dropped_bytes'] == 5
+        sim.boot()
+        assert _lines(out)[0] == 'READY'
+        assert _lines(out)[1].startswith('CAPS:')
+        sim.feed(b'PING\nCAPS?\n')
+        assert _wait(lambda: len(_lines(out)) == 4)
+        assert _lines(out)[2] == 'MACROPAD_OK'
+        assert _lines(out)[3] == _lines(out)[1]
+    finally:
+        sim.stop()
+
+
+def test_sim_models_led_commands():
+    sim = DeviceSim(lambda data: None, caps={'rate': 0, 'rx': 256})
+    try:
+        sim.boot()
+        sim.feed(b'BRIGHT:128\n2:color(255,0,0)\n2:40\n3:rgbpointer(0,0,255,4)\nEFFECT:1:3\nbogus\n')
+        assert _wait(lambda: sim.stats['rx_lines'] == 6)
+        leds = sim.leds()
+        assert leds['brightness'] == 128
+        assert leds['strips'][1]['mode'] == 'solid' and leds['strips'][1]['color'] == (255, 0, 0)
+        assert leds['strips'][1]['percentage'] == 40
+        assert leds['strips'][2]['mode'] == 'pointer' and leds['strips'][2]['pointer_pos'] == 4
+        assert leds['strips'][0]['effect'] == 3
+        assert sim.stats['unknown'] == 1
+    finally:
+        sim.stop()
+
+
+def test_sim_drops_what_overflows_its_buffer():
+    sim = DeviceSim(lambda data: None, caps={'rate': 1, 'rx': 16})
+    try:
+        sim.boot()
+        sim.feed(b'BRIGHT:1\n' * 4)
+        assert sim.stats['rx_dropped_bytes'] == 36 - 16
+    finally:
+        sim.stop()
+
+
+# ── Foreground watcher ───────────────────────────────────────────────────────
+
+@pytest.mark.parametrize('live', [True, False])
+def test_watcher_follows_fake_source(live):
+    seen   = []
+    source = FakeSource(live=live)
+    fw     = ForegroundWatcher(lambda app, title: seen.append((app, title)), source=source)
+    fw.start()
+    try:
+        source.emit('code.exe', 'main.py')
+        assert _wait(lambda: seen == [('code.exe', 'main.py')])
+        source.emit('code.exe', 'main.py')   # unchanged: no second call
+        source.emit('chrome.exe')
+        assert _wait(lambda: len(seen) == 2)
+        assert seen[1] == ('chrome.exe', '')
+    finally:
+        fw.stop()
+
+
+# ── MacroPadAPI over socket:// ───────────────────────────────────────────────
+
+@pytest.fixture
+def pad(tmp_path, monkeypatch):
+    """A started MacroPadAPI connected to a simulated pad, with a FakeSource foreground."""
+    pytest.importorskip('serial')
+    import foreground_watcher
+    import persistence
+    from api import MacroPadAPI
+    from push_queue import PushQueue
+
+    port = _free_port()
+    os.makedirs(tmp_path / 'Data')
+    with open(tmp_path / 'Data' / 'settings_serial.json', 'w') as f:
+        json.dump({'port': f'socket://127.0.0.1:{port}', 'switch_dwell_ms': 0}, f)
+    monkeypatch.chdir(tmp_path)
+
+    sims = []
+
+    def _serve():
+        for sim in serve_socket(lambda write: DeviceSim(write, boot_s=0.1), port):
+            sims.append(sim)
+    threading.Thread(target=_serve, daemon=True).start()
+
+    source = FakeSource(live=True)
+    monkeypatch.setattr(foreground_watcher, 'default_source', lambda: source)
+
+    api = MacroPadAPI()
+    api.events  = []
+    api._events = PushQueue(api.events.extend)
+    api.source  = source
+    api.sims    = sims
+    api.startup()
+    yield api
+    api.disconnect()
+    api.shutdown()
+    for sim in sims:
+        sim.stop()
+    persistence.store.flush()
+
+
+def _settled(sim, quiet_s=0.3, timeout=5.0):
+    """Wait until the sim has received nothing new for quiet_s."""
+    deadline = time.monotonic() + timeout
+    last = -1
+    while time.monotonic() < deadline:
+        n = len(sim.log)
+        if n == last:
+            return True
+        last = n
+        time.sleep(quiet_s)
+    return False
+
+
+def _start(pad):
+    assert _wait(lambda: pad.sims and 'EFFECT:4:0' in pad.sims[0].log)
+    sim = pad.sims[0]
+    assert _settled(sim)
+    return sim
+
+
+def test_startup_sends_full_state_after_ready(pad):
+    sim = _start(pad)
+    assert sim.stats['boots'] == 1
+    assert sim.log[0] == 'PING'
+    state = [line for line in sim.log if line not in ('PING', 'CAPS?')]
+    assert state[0] == 'BRIGHT:26'
+    assert state.count(DEFAULT_LED) == 1
+    assert sim.stats['rx_dropped_bytes'] <= len(b'PING\n')     # at most the PING sent while it booted
+    assert sim.stats['unknown'] == 0
+    assert sim.leds()['brightness'] == 26
+    assert [s['mode'] for s in sim.leds()['strips']] == ['fade'] * 4
+    assert pad.get_device_info()['connected']
+
+
+def test_profile_switch_resyncs_only_the_difference(pad):
+    sim = _start(pad)
+    assert pad.new_profile('Work')['ok']
+
+    sent = len(sim.log)
+    pad.switch_profile('Work')               # same encoder setup: nothing to send
+    assert _settled(sim)
+    assert sim.log[sent:] == []
+
+    pad.set_encoder(0, {'mode': 'solid', 'color': [255, 0, 0]})
+    assert _wait(lambda: RED_LED in sim.log[sent:])
+    assert _settled(sim)
+
+    sent = len(sim.log)
+    pad.switch_profile('Default')
+    assert _wait(lambda: DEFAULT_LED in sim.log[sent:])
+    assert _settled(sim)
+    assert sim.log[sent:] == [DEFAULT_LED]
+    assert sim.leds()['strips'][0]['mode'] == 'fade'
+
+
+def test_foreground_switch_resyncs_only_the_difference(pad):
+    sim = _start(pad)
+    pad.new_profile('Work')
+    pad.switch_profile('Work')
+    pad.set_encoder(0, {'mode': 'solid', 'color': [255, 0, 0]})
+    pad.switch_profile('Default')
+    pad.set_trigger_apps('Work', ['code.exe'])
+    assert _settled(sim)
+
+    sent = len(sim.log)
+    pad.source.emit('code.exe', 'main.py')
+    assert _wait(lambda: pad.get_profiles()['active'] == 'Work')
+    assert _wait(lambda: RED_LED in sim.log[sent:])
+    assert _settled(sim)
+    assert sim.log[sent:] == [RED_LED]
+    assert sim.leds()['strips'][0]['color'] == (255, 0, 0)
+    assert _wait(lambda: ['profile_switch', {'active': 'Work'}] in pad.events)
+
+
+def test_encoder_updates(pad):
+    sim = _start(pad)
+    sim.turn(1, 2)
+    sim.turn(1, -1)
+    assert _wait(lambda: any(event == 'encoder_turn' and payload['id'] == 1 for event, payload in pad.events))
+    turn = [payload for event, payload in pad.events if event == 'encoder_turn'][-1]
+    assert turn['app'] == '' and turn['pct'] == -1           # no app on encoder 2: nothing to adjust
+
+    pad.set_encoder(2, {'mode': 'fade', 'color': [0, 0, 255], 'color2': [0, 255, 0],
+                        'blend_start': 30, 'effect': 'Wave'})
+    assert _wait(lambda: sim.leds()['strips'][2]['effect'] == 2)
+    strip = sim.leds()['strips'][2]
+    assert strip['mode'] == 'fade'
+    assert strip['color'] == (0, 0, 255) and strip['fade_color'] == (0, 255, 0)
+    assert strip['blend_start'] == 30
+    assert pad.get_encoders()[2]['effect'] == 'Wave'